@@ -0,0 +1,153 @@
+"""Benchmark upstream balancing strategies against several local mock upstreams.
+
+Starts three copies of the bundled mock upstream (``claude_proxy.mock_upstream``)
+under Hypercorn. One of them is degraded: it is slower and serves only a few requests at once, queueing
+the rest, like an overloaded replica. The same concurrent streaming workload is
+driven through ``OpenAIProvider`` with an ``UpstreamPool`` once per strategy,
+reporting how the requests were spread and the p50/p99 end-to-end latency.
+
+Requires the ``bench`` extra:
+
+    pip install -e ".[bench]"
+    python benchmarks/bench_balance.py --concurrency 30 --requests 1200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from claude_proxy.config import Settings  # noqa: E402
+from claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest  # noqa: E402
+from claude_proxy.pool import UpstreamClientPool  # noqa: E402
+from claude_proxy.providers.openai import OpenAIProvider  # noqa: E402
+from claude_proxy.upstream import STRATEGIES, Upstream, UpstreamPool  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_upstream(port: int, chunks: int, delay: float, latency: float, concurrency: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT / "src"),
+        MOCK_CHUNKS=str(chunks),
+        MOCK_CHUNK_DELAY=str(delay),
+        MOCK_LATENCY=str(latency),
+        MOCK_CONCURRENCY=str(concurrency),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "claude_proxy.mock_upstream:app",
+         "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("mock upstream did not start")
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def _run(base_urls: List[str], strategy: str, concurrency: int, total: int) -> dict:
+    settings = Settings(
+        CLAUDE_PROXY_POOL_MAX_CONNECTIONS=concurrency,
+        CLAUDE_PROXY_POOL_MAX_KEEPALIVE_CONNECTIONS=concurrency,
+    )
+    client_pool = UpstreamClientPool(settings)
+    upstreams = UpstreamPool([Upstream(url) for url in base_urls], client_pool.get_client, strategy=strategy)
+    provider = OpenAIProvider("sk-bench", base_urls[0], client=client_pool.get_client(base_urls[0]), upstreams=upstreams)
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=100,
+        stream=True,
+        messages=[ClaudeMessage(role="user", content="hi")],
+    )
+    remaining = total
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            async for _ in provider.stream_complete(request, "bench"):
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    spread = Counter({url: upstreams.stats()["upstreams"][url]["requests"] for url in base_urls})
+    await client_pool.aclose()
+    return {
+        "rps": total / elapsed,
+        "p50": _percentile(latencies, 0.50),
+        "p99": _percentile(latencies, 0.99),
+        "spread": [spread[url] for url in base_urls],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=1200)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    parser.add_argument("--latency", type=float, default=0.01, help="time to headers of the healthy upstreams")
+    parser.add_argument("--slowdown", type=float, default=2.0, help="how much slower the degraded upstream is")
+    parser.add_argument("--capacity", type=int, default=4, help="requests the degraded upstream serves at once")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    profiles = [
+        (args.chunk_delay, args.latency, 0),
+        (args.chunk_delay, args.latency, 0),
+        (args.chunk_delay * args.slowdown, args.latency * args.slowdown, args.capacity),
+    ]
+    procs = []
+    base_urls = []
+    try:
+        for delay, latency, capacity in profiles:
+            port = _free_port()
+            procs.append(_start_upstream(port, args.chunks, delay, latency, capacity))
+            base_urls.append(f"http://127.0.0.1:{port}/v1")
+        print(
+            f"upstreams: 2 healthy + 1 degraded ({args.slowdown}x slower, {args.capacity} at once); "
+            f"spread is healthy, healthy, degraded"
+        )
+        for strategy in STRATEGIES:
+            result = asyncio.run(_run(base_urls, strategy, args.concurrency, args.requests))
+            print(
+                f"{strategy:<18} {result['rps']:7.1f} req/s  p50 {result['p50'] * 1000:7.1f} ms  "
+                f"p99 {result['p99'] * 1000:7.1f} ms  spread {result['spread']}"
+            )
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
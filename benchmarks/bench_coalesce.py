@@ -0,0 +1,103 @@
+"""Benchmark streaming delta coalescing: SSE events sent vs latency added.
+
+Simulates a fast upstream model that delivers ``--burst`` one-token deltas per
+network read every ``--interval-ms`` milliseconds, and runs the encoded event
+stream through ``coalesce_deltas`` for several window sizes. Each output chunk is
+written to a loopback TCP socket, standing in for an ASGI send. For each window
+it reports the number of sends per stream, CPU per token, the time-to-first-token
+penalty, and the mean / p99 latency added per token.
+
+    python benchmarks/bench_coalesce.py --tokens 2000 --burst 4 --interval-ms 2
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from claude_proxy import sse  # noqa: E402
+from claude_proxy.coalesce import coalesce_deltas  # noqa: E402
+
+TOKEN = "tok "  # fixed width, so merged payload length counts tokens
+
+
+async def upstream(tokens: int, burst: int, interval: float, produced: list):
+    """Yield encoded events, recording when each token was produced."""
+    yield sse.message_start({"id": "msg_bench", "type": "message", "role": "assistant", "content": []})
+    yield sse.text_block_start(0)
+    for i in range(tokens):
+        if i and i % burst == 0:
+            await asyncio.sleep(interval)
+        produced.append(time.perf_counter())
+        yield sse.text_delta(0, TOKEN)
+    yield sse.block_stop(0)
+    yield sse.message_delta("end_turn", tokens)
+    yield sse.MESSAGE_STOP
+
+
+async def run(window_ms: float, args: argparse.Namespace) -> dict:
+    """Stream once through the coalescer (or not, for window 0)."""
+    produced: list = []
+    delivered: list = []
+    events = upstream(args.tokens, args.burst, args.interval_ms / 1000, produced)
+    if window_ms > 0:
+        events = coalesce_deltas(events, window_ms / 1000, args.max_bytes)
+
+    async def discard(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while await reader.read(65536):
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(discard, "127.0.0.1", 0)
+    _, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    sends = 0
+    cpu_start = time.process_time()
+    async for chunk in events:
+        sends += 1
+        writer.write(chunk)
+        await writer.drain()
+        now = time.perf_counter()
+        split = sse.split_delta(chunk.split(b"\n\n", 1)[0] + b"\n\n")
+        if split is not None:
+            delivered.extend([now] * (len(split[1]) // len(TOKEN)))
+    cpu = time.process_time() - cpu_start
+    writer.close()
+    server.close()
+    added = sorted(d - p for d, p in zip(delivered, produced))
+    return {
+        "window_ms": window_ms,
+        "sends": sends,
+        "cpu_us_per_token": cpu / args.tokens * 1e6,
+        "ttft_penalty_ms": (delivered[0] - produced[0]) * 1e3,
+        "mean_added_ms": statistics.mean(added) * 1e3,
+        "p99_added_ms": added[int(len(added) * 0.99) - 1] * 1e3,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=4, help="tokens per upstream network read")
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="time between upstream reads")
+    parser.add_argument("--max-bytes", type=int, default=4096)
+    parser.add_argument("--windows", default="0,5,10,20")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'window':>8} {'sends':>7} {'CPU us/tok':>11} {'TTFT +ms':>9} {'mean +ms':>9} {'p99 +ms':>8}")
+    for window in (float(w) for w in args.windows.split(",")):
+        r = asyncio.run(run(window, args))
+        print(
+            f"{r['window_ms']:>6.0f}ms {r['sends']:>7} {r['cpu_us_per_token']:>11.2f} "
+            f"{r['ttft_penalty_ms']:>9.3f} {r['mean_added_ms']:>9.2f} {r['p99_added_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Microbenchmark: Claude -> OpenAI request conversion cost for agentic transcripts.
+
+Builds a Claude Code style transcript (user prompt, assistant text + tool_use,
+user tool_result blocks with multi-KB outputs, repeated) and times
+``OpenAIProvider.convert_request`` on it. It also times the whole body -> OpenAI
+request path for the validated (Pydantic) mode and the raw-JSON fast path.
+
+    python benchmarks/bench_convert.py --messages 200 --iterations 500
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from claude_proxy.models.claude import (  # noqa: E402
+    ClaudeMessagesRequest,
+    RawMessagesRequest,
+    check_raw_messages_request,
+)
+from claude_proxy.providers.openai import OpenAIProvider  # noqa: E402
+from claude_proxy.utils import json_loads  # noqa: E402
+
+
+def build_transcript(messages: int, tool_result_bytes: int) -> dict:
+    """Build a raw Claude request body with ``messages`` agentic turns."""
+    output = ("line of tool output\n" * (tool_result_bytes // 20 + 1))[:tool_result_bytes]
+    turns = [{"role": "user", "content": "Refactor the parser and run the tests."}]
+    i = 0
+    while len(turns) < messages:
+        tool_id = f"toolu_{i:04d}"
+        turns.append({"role": "assistant", "content": [
+            {"type": "text", "text": f"Step {i}: reading the next file."},
+            {"type": "tool_use", "id": tool_id, "name": "Read", "input": {"file_path": f"/src/module_{i}.py"}},
+        ]})
+        turns.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": [
+                {"type": "text", "text": output},
+                {"type": "text", "text": "(truncated)"},
+            ]},
+        ]})
+        i += 1
+    return {
+        "model": "claude-sonnet-4-20250514",
+        "max_tokens": 4096,
+        "system": [{"type": "text", "text": "You are Claude Code."}, {"type": "text", "text": " Be concise."}],
+        "messages": turns[:messages],
+        "tools": [
+            {"name": name, "description": f"{name} tool", "input_schema": {"type": "object", "properties": {}}}
+            for name in ("Read", "Write", "Edit", "Bash", "Grep", "Glob")
+        ],
+        "stream": True,
+    }
+
+
+def bench(request, iterations: int) -> float:
+    """Return mean seconds per ``convert_request`` call."""
+    provider = OpenAIProvider(api_key="bench", base_url="http://localhost/v1")
+    provider.convert_request(request)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        provider.convert_request(request)
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_body_path(body: bytes, iterations: int) -> dict:
+    """Return mean seconds per request for parse + validate + convert, per mode."""
+    provider = OpenAIProvider(api_key="bench", base_url="http://localhost/v1")
+
+    def validated() -> None:
+        provider.convert_request(ClaudeMessagesRequest.model_validate_json(body))
+
+    def fast_path() -> None:
+        payload = json_loads(body)
+        assert not check_raw_messages_request(payload)
+        provider.convert_request(RawMessagesRequest(payload))
+
+    results = {}
+    for name, fn in (("validated", validated), ("fast_path", fast_path)):
+        fn()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        results[name] = (time.perf_counter() - start) / iterations
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--tool-result-bytes", type=int, default=4096)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    body = build_transcript(args.messages, args.tool_result_bytes)
+    request = ClaudeMessagesRequest(**body)
+    per_call = bench(request, args.iterations)
+    print(
+        f"convert_request: {args.messages} messages, {args.tool_result_bytes} B tool results -> "
+        f"{per_call * 1e6:9.1f} us/request ({1 / per_call:8.0f} req/s)"
+    )
+
+    raw = json.dumps(body).encode()
+    for name, seconds in bench_body_path(raw, args.iterations).items():
+        print(f"body -> OpenAI request [{name:>9}] ({len(raw) / 1024:.0f} KB): {seconds * 1e6:9.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark hedged requests against local mock upstreams with occasional stalls.
+
+Starts two copies of the bundled mock upstream (``claude_proxy.mock_upstream``)
+under Hypercorn. Each answers non-streaming requests quickly but stalls on a
+small fraction of them, the kind of tail latency hedging is meant to cut. The
+same concurrent workload of small-model ``complete()`` calls is driven through
+``OpenAIProvider`` with hedging off and on, reporting p50/p99 latency and the
+extra upstream requests the hedges cost.
+
+Requires the ``bench`` extra:
+
+    pip install -e ".[bench]"
+    python benchmarks/bench_hedge.py --concurrency 20 --requests 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from claude_proxy.config import Settings  # noqa: E402
+from claude_proxy.hedge import HEDGES, Hedger  # noqa: E402
+from claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest  # noqa: E402
+from claude_proxy.pool import UpstreamClientPool  # noqa: E402
+from claude_proxy.providers.openai import OpenAIProvider  # noqa: E402
+from claude_proxy.upstream import Upstream, UpstreamPool  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_upstream(port: int, latency: float, stall_rate: float, stall_latency: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT / "src"),
+        MOCK_CHUNKS="20",
+        MOCK_LATENCY=str(latency),
+        MOCK_STALL_RATE=str(stall_rate),
+        MOCK_STALL_LATENCY=str(stall_latency),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "claude_proxy.mock_upstream:app",
+         "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("mock upstream did not start")
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def _run(base_urls: List[str], hedge: bool, concurrency: int, total: int, budget: float) -> dict:
+    settings = Settings(
+        CLAUDE_PROXY_POOL_MAX_CONNECTIONS=concurrency * 2,
+        CLAUDE_PROXY_POOL_MAX_KEEPALIVE_CONNECTIONS=concurrency * 2,
+    )
+    client_pool = UpstreamClientPool(settings)
+    upstreams = UpstreamPool([Upstream(url) for url in base_urls], client_pool.get_client)
+    hedger = Hedger(["small"] if hedge else [], budget_ratio=budget)
+    provider = OpenAIProvider(
+        "sk-bench", base_urls[0], client=client_pool.get_client(base_urls[0]), upstreams=upstreams, hedger=hedger
+    )
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-haiku-20241022",
+        max_tokens=100,
+        messages=[ClaudeMessage(role="user", content="hi")],
+    )
+
+    def hedges() -> float:
+        return sum(HEDGES.value(route="small", winner=winner) for winner in ("primary", "hedge", "none"))
+
+    hedges_before = hedges()
+    remaining = total
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await provider.complete(request, "bench")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await client_pool.aclose()
+    # Skip the warm-up requests that fill the latency window before hedging starts
+    measured = latencies[hedger.min_samples:]
+    return {
+        "p50": _percentile(measured, 0.50),
+        "p99": _percentile(measured, 0.99),
+        "extra": (hedges() - hedges_before) / total,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02, help="normal time to respond")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="fraction of requests that stall")
+    parser.add_argument("--stall-latency", type=float, default=0.5, help="extra seconds a stalled request takes")
+    parser.add_argument("--budget", type=float, default=0.05, help="hedges allowed per request")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    procs = []
+    base_urls = []
+    try:
+        for _ in range(2):
+            port = _free_port()
+            procs.append(_start_upstream(port, args.latency, args.stall_rate, args.stall_latency))
+            base_urls.append(f"http://127.0.0.1:{port}/v1")
+        print(
+            f"upstreams: 2, {args.latency * 1000:.0f} ms normally, "
+            f"{args.stall_rate:.0%} of requests stall for {args.stall_latency * 1000:.0f} ms"
+        )
+        for hedge in (False, True):
+            result = asyncio.run(_run(base_urls, hedge, args.concurrency, args.requests, args.budget))
+            print(
+                f"hedging {'on ' if hedge else 'off'}  p50 {result['p50'] * 1000:7.1f} ms  "
+                f"p99 {result['p99'] * 1000:7.1f} ms  extra upstream requests {result['extra']:.1%}"
+            )
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
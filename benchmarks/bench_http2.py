@@ -0,0 +1,122 @@
+"""Benchmark HTTP/1.1 vs HTTP/2 upstream throughput against a local mock upstream.
+
+Starts the bundled mock upstream (``claude_proxy.mock_upstream``) under Hypercorn
+(cleartext, HTTP/1.1 + h2c), then drives the same concurrent streaming workload through ``UpstreamClientPool``
+once per transport mode and reports throughput and connection usage.
+
+Requires the ``bench`` and ``http2`` extras:
+
+    pip install -e ".[bench,http2]"
+    python benchmarks/bench_http2.py --concurrency 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from claude_proxy.config import Settings  # noqa: E402
+from claude_proxy.pool import UpstreamClientPool  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_upstream(port: int, chunks: int, delay: float) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"), MOCK_CHUNKS=str(chunks), MOCK_CHUNK_DELAY=str(delay))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "claude_proxy.mock_upstream:app",
+         "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("mock upstream did not start")
+
+
+async def _run(base_url: str, http2: bool, concurrency: int, total: int) -> dict:
+    settings = Settings(
+        CLAUDE_PROXY_HTTP2=http2,
+        CLAUDE_PROXY_HTTP2_PRIOR_KNOWLEDGE=http2,
+        CLAUDE_PROXY_POOL_MAX_CONNECTIONS=concurrency,
+        CLAUDE_PROXY_POOL_MAX_KEEPALIVE_CONNECTIONS=concurrency,
+        CLAUDE_PROXY_HTTP2_MAX_CONCURRENT_STREAMS=concurrency,
+    )
+    pool = UpstreamClientPool(settings)
+    client = pool.get_client(base_url)
+    body = {"model": "mock", "stream": True, "messages": [{"role": "user", "content": "hi"}]}
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+    received = 0
+    peak_connections = 0
+
+    async def worker() -> None:
+        nonlocal received, peak_connections
+        while not queue.empty():
+            queue.get_nowait()
+            async with client.stream("POST", f"{base_url}/chat/completions", json=body) as response:
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+            peak_connections = max(peak_connections, pool.stats()["hosts"][pool.host_key(base_url)].get("connections", 0))
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    await pool.aclose()
+    return {
+        "mode": "HTTP/2" if pool.http2 else "HTTP/1.1",
+        "seconds": elapsed,
+        "rps": total / elapsed,
+        "mb_per_s": received / elapsed / 1e6,
+        "client_cpu_ms_per_req": cpu * 1000 / total,
+        "peak_connections": peak_connections,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    port = _free_port()
+    proc = _start_upstream(port, args.chunks, args.chunk_delay)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        for http2 in (False, True):
+            result = asyncio.run(_run(base_url, http2, args.concurrency, args.requests))
+            print(
+                f"{result['mode']:<9} {result['rps']:8.1f} req/s  {result['mb_per_s']:6.2f} MB/s  "
+                f"{result['client_cpu_ms_per_req']:6.3f} ms CPU/req  "
+                f"peak connections: {result['peak_connections']}"
+            )
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark the CPU cost of request/response payload logging in the provider hot path.
+
+Runs ``OpenAIProvider.complete`` and ``stream_complete`` against an in-process mock
+transport with logging configured at INFO into a handler that formats records but
+discards the output, so only formatting cost is measured (no I/O). Compare
+payload capture disabled (the default) with full capture (sample rate 1.0):
+
+    python benchmarks/bench_logging.py --chunks 500 --iterations 200
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import httpx  # noqa: E402
+
+from claude_proxy.models.claude import ClaudeMessagesRequest  # noqa: E402
+from claude_proxy.providers.openai import OpenAIProvider  # noqa: E402
+
+sys.path.insert(0, str(ROOT / "benchmarks"))
+from bench_convert import build_transcript  # noqa: E402
+
+
+def make_client(chunks: int) -> httpx.AsyncClient:
+    """Mock upstream returning a fixed completion or a ``chunks``-long stream."""
+    def chunk(delta: dict, finish_reason=None) -> bytes:
+        return b"data: " + json.dumps({
+            "id": "chatcmpl-bench", "model": "gpt-4o",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }).encode() + b"\n\n"
+
+    stream_body = b"".join(
+        [chunk({"role": "assistant", "content": ""})]
+        + [chunk({"content": "token "}) for _ in range(chunks)]
+        + [chunk({}, "stop"), b"data: [DONE]\n\n"]
+    )
+    completion = {
+        "id": "chatcmpl-bench", "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "token " * chunks}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": chunks, "total_tokens": 100 + chunks},
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(200, content=stream_body, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json=completion)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def run(provider: OpenAIProvider, request: ClaudeMessagesRequest, stream: bool, iterations: int) -> float:
+    """Return CPU seconds per request."""
+    start = time.process_time()
+    for i in range(iterations):
+        if stream:
+            async for _ in provider.stream_complete(request, f"bench-{i}"):
+                pass
+        else:
+            await provider.complete(request, f"bench-{i}")
+    return (time.process_time() - start) / iterations
+
+
+def configure(sample_rate: float) -> None:
+    """Log at INFO into a formatting, discarding handler; toggle payload capture."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    handler.stream.write = lambda text: len(text)  # format, then drop
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        from claude_proxy import capture
+    except ImportError:
+        return  # tree without payload capture: legacy INFO logging always on
+    capture.configure_capture(sample_rate=sample_rate, max_chars=1 << 30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    body = build_transcript(args.messages, 2048)
+    body["stream"] = False  # stream_complete forces streaming on its own
+    request = ClaudeMessagesRequest(**body)
+    for sample_rate in (0.0, 1.0):
+        configure(sample_rate)
+        provider = OpenAIProvider(api_key="bench", base_url="http://mock/v1", client=make_client(args.chunks))
+        for stream in (False, True):
+            cpu = asyncio.run(run(provider, request, stream, args.iterations))
+            label = "capture on " if sample_rate else "capture off"
+            kind = "stream_complete" if stream else "complete       "
+            print(f"{label} {kind}: {cpu * 1e3:8.3f} ms CPU/request")
+
+
+if __name__ == "__main__":
+    main()
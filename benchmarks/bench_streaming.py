@@ -0,0 +1,137 @@
+"""Benchmark the per-token CPU cost of the streaming conversion hot loop.
+
+Times encoding a ``text_delta`` SSE event (dict + ``json.dumps`` + f-string vs the
+pre-serialized byte templates in ``claude_proxy.sse``), parsing the upstream
+stream (``aiter_lines`` + ``json.loads`` vs ``SSEParser`` over ``aiter_bytes``,
+with the stdlib decoder and orjson when installed), then the per-chunk cost of
+``OpenAIProvider.stream_complete`` end to end over a synthetic upstream stream.
+
+    python benchmarks/bench_streaming.py --chunks 10000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import httpx  # noqa: E402
+
+from claude_proxy import sse  # noqa: E402
+from claude_proxy.utils import orjson  # noqa: E402
+from claude_proxy.models.claude import ClaudeMessagesRequest  # noqa: E402
+from claude_proxy.providers.openai import OpenAIProvider  # noqa: E402
+
+TOKEN = " token"
+
+
+def build_stream(chunks: int) -> bytes:
+    """Build an OpenAI streaming body with ``chunks`` one-token content deltas."""
+    def chunk(delta: dict, finish_reason=None) -> bytes:
+        return b"data: " + json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion.chunk", "model": "gpt-4o",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }).encode() + b"\n\n"
+
+    return b"".join(
+        [chunk({"role": "assistant", "content": ""})]
+        + [chunk({"content": TOKEN}) for _ in range(chunks)]
+        + [chunk({}, "stop"), b"data: [DONE]\n\n"]
+    )
+
+
+def bench_encode(iterations: int) -> dict:
+    """Return seconds per text_delta event for each encoding."""
+    def legacy() -> bytes:
+        event = {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": TOKEN}}
+        return f"event: content_block_delta\ndata: {json.dumps(event)}\n\n".encode()
+
+    results = {}
+    for name, fn in (("dict + json.dumps", legacy), ("byte template", lambda: sse.text_delta(0, TOKEN))):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        results[name] = (time.perf_counter() - start) / iterations
+    return results
+
+
+def mock_transport(body: bytes) -> httpx.MockTransport:
+    """Transport streaming ``body`` in 4 KB reads, like a socket would."""
+    async def stream_body():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=stream_body()))
+
+
+async def bench_parse(chunks: int, iterations: int) -> dict:
+    """Return CPU seconds per upstream chunk for each parsing strategy."""
+    body = build_stream(chunks)
+
+    async def lines_json(response: httpx.Response) -> None:
+        async for line in response.aiter_lines():
+            if line.startswith("data: ") and line[6:] != "[DONE]":
+                json.loads(line[6:])
+
+    def parser_with(loads):
+        async def parse(response: httpx.Response) -> None:
+            async for data in sse.aiter_sse_data(response.aiter_bytes()):
+                if data != b"[DONE]":
+                    loads(data)
+        return parse
+
+    strategies = {
+        "aiter_lines + json.loads": lines_json,
+        "SSEParser + json.loads": parser_with(lambda data: json.loads(data.decode("utf-8"))),
+    }
+    if orjson is not None:
+        strategies["SSEParser + orjson"] = parser_with(orjson.loads)
+
+    results = {}
+    async with httpx.AsyncClient(transport=mock_transport(body)) as client:
+        for name, parse in strategies.items():
+            start = time.process_time()
+            for _ in range(iterations):
+                async with client.stream("POST", "http://mock/v1/chat/completions") as response:
+                    await parse(response)
+            results[name] = (time.process_time() - start) / (iterations * chunks)
+    return results
+
+
+async def bench_stream(chunks: int, iterations: int) -> float:
+    """Return CPU seconds per upstream chunk through ``stream_complete``."""
+    transport = mock_transport(build_stream(chunks))
+    provider = OpenAIProvider(api_key="bench", base_url="http://mock/v1", client=httpx.AsyncClient(transport=transport))
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-sonnet-20241022", max_tokens=1024, stream=True,
+        messages=[{"role": "user", "content": "Write a long story."}],
+    )
+    start = time.process_time()
+    for i in range(iterations):
+        async for _ in provider.stream_complete(request, f"bench-{i}"):
+            pass
+    return (time.process_time() - start) / (iterations * chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for name, seconds in bench_encode(200000).items():
+        print(f"encode text_delta [{name:>17}]: {seconds * 1e9:7.0f} ns/event")
+    for name, seconds in asyncio.run(bench_parse(args.chunks, args.iterations)).items():
+        print(f"parse upstream [{name:>25}]: {seconds * 1e6:7.2f} us CPU/chunk")
+    per_chunk = asyncio.run(bench_stream(args.chunks, args.iterations))
+    print(f"stream_complete ({args.chunks} chunks): {per_chunk * 1e6:7.2f} us CPU/chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Gunicorn hooks for Claude API Proxy (loaded automatically from the working directory).
+
+The master gives each start a fresh ``CLAUDE_PROXY_SHARED_STATE_TOKEN`` before
+forking workers, so the workers share one set of state files and a restart
+never picks up the counters or rate-limit buckets of the previous run.
+"""
+
+import glob
+import os
+import uuid
+
+
+def on_starting(server):
+    """Create the shared state token inherited by every worker."""
+    os.environ.setdefault("CLAUDE_PROXY_SHARED_STATE_TOKEN", uuid.uuid4().hex)
+
+
+def on_exit(server):
+    """Remove this deployment's shared state files."""
+    directory = os.environ.get("CLAUDE_PROXY_SHARED_STATE_DIR")
+    token = os.environ.get("CLAUDE_PROXY_SHARED_STATE_TOKEN")
+    if not directory or not token:
+        return
+    for path in glob.glob(os.path.join(directory, f"*-{token}.*")):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
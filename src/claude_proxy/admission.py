@@ -0,0 +1,308 @@
+"""Admission control for Claude API Proxy.
+
+Limits how many ``/v1/messages`` requests are in flight, globally and per
+route ("big"/"small"). A request over the limit waits in a bounded FIFO queue
+until a slot frees up or its queue deadline passes; when the queue is full or
+the deadline passes, it is shed at once with a Claude ``overloaded_error``
+(HTTP 529) instead of piling more sockets and timeouts onto a saturated
+upstream. A streaming request holds its slot until the stream ends.
+
+The global queue is first come, first served by default. With the ``wfq``
+scheduler, freed global slots are instead handed out by weighted fair queuing
+across routes, so interactive big-model requests do not wait behind a backlog
+of bulk small-model ones, while the small route still gets its weighted share
+and is never starved. Optionally, requests of one route are also served
+round-robin across client API keys.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .config import Settings
+from .metrics import REGISTRY
+
+SCHEDULERS = ("fifo", "wfq")
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "claude_proxy_admission_in_flight",
+    "Admitted requests in flight per limiter",
+    ("scope",),
+)
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "claude_proxy_admission_queued",
+    "Requests waiting for admission per limiter",
+    ("scope",),
+)
+ADMISSION_SHED = REGISTRY.counter(
+    "claude_proxy_admission_shed_total",
+    "Requests rejected by admission control",
+    ("scope", "reason"),
+)
+
+
+class OverloadedError(Exception):
+    """A request was shed by admission control."""
+
+
+class ConcurrencyLimiter:
+    """Concurrency limit with a bounded FIFO queue of waiting requests.
+
+    Subclasses change the order in which waiters are admitted by overriding
+    ``_enqueue``, ``_dequeue`` and ``_discard``.
+    """
+
+    def __init__(self, scope: str, limit: int, queue_size: int):
+        """Initialize the limiter; ``queue_size`` of 0 sheds every request over the limit."""
+        self.scope = scope
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.queued = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    def _enqueue(self, waiter: "asyncio.Future[None]", route: str, key: Optional[str]) -> None:
+        self._waiters.append(waiter)
+
+    def _dequeue(self) -> "Optional[asyncio.Future[None]]":
+        return self._waiters.popleft() if self._waiters else None
+
+    def _discard(self, waiter: "asyncio.Future[None]") -> bool:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return False
+        return True
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self.active, scope=self.scope)
+        ADMISSION_QUEUED.set(self.queued, scope=self.scope)
+
+    def _shed(self, reason: str, message: str) -> OverloadedError:
+        ADMISSION_SHED.inc(scope=self.scope, reason=reason)
+        return OverloadedError(message)
+
+    async def acquire(self, timeout: float, route: str = "", key: Optional[str] = None) -> None:
+        """Take a slot for a request on ``route`` from client ``key``, waiting up to ``timeout`` seconds.
+
+        Raises ``OverloadedError`` if the request is shed.
+        """
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            self._update_gauges()
+            return
+        if self.queued >= self.queue_size or timeout <= 0:
+            raise self._shed("queue_full", f"Too many concurrent {self.scope} requests, please retry later")
+        waiter = asyncio.get_running_loop().create_future()
+        self._enqueue(waiter, route, key)
+        self.queued += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the request gave up
+                self.release()
+            else:
+                if self._discard(waiter):
+                    self.queued -= 1
+                self._update_gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("timeout", f"Timed out waiting for a {self.scope} request slot, please retry later")
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the oldest waiting request if there is one."""
+        while True:
+            waiter = self._dequeue()
+            if waiter is None:
+                self.active -= 1
+                break
+            self.queued -= 1
+            # Skip waiters that gave up but have not left the queue yet
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the limit and current load."""
+        return {"limit": self.limit, "in_flight": self.active, "queued": self.queued}
+
+
+class FairQueueLimiter(ConcurrencyLimiter):
+    """Concurrency limit whose queue is served by weighted fair queuing across routes.
+
+    Each backlogged route has a virtual finish time that advances by
+    ``1 / weight`` per admitted request, and the route with the earliest next
+    finish time is served first. A route that was idle restarts from the
+    current virtual time, so it cannot bank credit while it has no requests.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        limit: int,
+        queue_size: int,
+        weights: Dict[str, float],
+        per_key: bool = False,
+    ):
+        """Initialize the limiter; routes missing from ``weights`` get weight 1."""
+        super().__init__(scope, limit, queue_size)
+        self.weights = weights
+        self.per_key = per_key
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {}
+        # Waiters per route, then per client key (a single None key unless per_key)
+        self._queues: Dict[str, "OrderedDict[Optional[str], Deque[asyncio.Future[None]]]"] = {}
+
+    def _enqueue(self, waiter: "asyncio.Future[None]", route: str, key: Optional[str]) -> None:
+        queues = self._queues.setdefault(route, OrderedDict())
+        if not queues:
+            self._finish[route] = max(self._finish.get(route, 0.0), self._virtual_time)
+        queues.setdefault(key if self.per_key else None, deque()).append(waiter)
+
+    def _dequeue(self) -> "Optional[asyncio.Future[None]]":
+        backlogged = [route for route, queues in self._queues.items() if queues]
+        if not backlogged:
+            return None
+        route = min(backlogged, key=lambda r: self._finish[r] + 1 / self.weights.get(r, 1.0))
+        self._virtual_time = self._finish[route]
+        self._finish[route] += 1 / self.weights.get(route, 1.0)
+        # Serve the route's client keys round-robin: take the first key's oldest waiter, move the key last
+        queues = self._queues[route]
+        key, waiters = next(iter(queues.items()))
+        waiter = waiters.popleft()
+        del queues[key]
+        if waiters:
+            queues[key] = waiters
+        return waiter
+
+    def _discard(self, waiter: "asyncio.Future[None]") -> bool:
+        for queues in self._queues.values():
+            for key, waiters in queues.items():
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del queues[key]
+                    return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the limit, current load and queued requests per route."""
+        stats = super().stats()
+        stats["queued_by_route"] = {
+            route: sum(len(waiters) for waiters in queues.values()) for route, queues in self._queues.items()
+        }
+        return stats
+
+
+class Permit:
+    """Slots held by one admitted request; releasing is idempotent."""
+
+    __slots__ = ("_limiters",)
+
+    def __init__(self, limiters: List[ConcurrencyLimiter]):
+        self._limiters = limiters
+
+    def release(self) -> None:
+        """Give the slots back."""
+        limiters, self._limiters = self._limiters, []
+        for limiter in limiters:
+            limiter.release()
+
+
+class AdmissionController:
+    """Global and per-route concurrency limits sharing one queue deadline per request."""
+
+    def __init__(
+        self,
+        global_limiter: Optional[ConcurrencyLimiter],
+        route_limiters: Dict[str, ConcurrencyLimiter],
+        queue_timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the controller; missing limiters do not limit."""
+        self.global_limiter = global_limiter
+        self.route_limiters = route_limiters
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured."""
+        return self.global_limiter is not None or bool(self.route_limiters)
+
+    async def admit(self, route: str, key: Optional[str] = None) -> Permit:
+        """Wait for a route slot and then a global slot for client ``key``; raise ``OverloadedError`` if shed."""
+        deadline = self._clock() + self.queue_timeout
+        # Route first, so a request queued behind its own route does not hold a global slot
+        limiters = [
+            limiter for limiter in (self.route_limiters.get(route), self.global_limiter) if limiter is not None
+        ]
+        acquired: List[ConcurrencyLimiter] = []
+        try:
+            for limiter in limiters:
+                await limiter.acquire(deadline - self._clock(), route, key)
+                acquired.append(limiter)
+        except BaseException:
+            for limiter in acquired:
+                limiter.release()
+            raise
+        return Permit(acquired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the load of every limiter for the health endpoint."""
+        stats = {route: limiter.stats() for route, limiter in self.route_limiters.items()}
+        if self.global_limiter is not None:
+            stats["global"] = self.global_limiter.stats()
+        return stats
+
+
+class ReleasingResponse(Response):
+    """Response that releases ``permit`` once ``response`` has been sent, however sending ends.
+
+    Releasing around the whole ASGI call, rather than when the body iterator
+    finishes, also covers responses that fail or are cancelled before their
+    body is first read (the client disconnecting before the first send).
+    """
+
+    def __init__(self, response: Response, permit: Permit):
+        # Same status, headers and body for anything inspecting the response before it is sent
+        self.__dict__.update(response.__dict__)
+        self._response = response
+        self._permit = permit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._response.background = self.background
+        try:
+            await self._response(scope, receive, send)
+        finally:
+            self._permit.release()
+
+
+def build_admission(settings: Settings) -> AdmissionController:
+    """Build the admission controller from application settings (limits of 0 are disabled)."""
+    if settings.scheduler not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler {settings.scheduler!r}, expected one of {SCHEDULERS}")
+    global_limiter: Optional[ConcurrencyLimiter] = None
+    if settings.max_concurrency > 0 and settings.scheduler == "wfq":
+        global_limiter = FairQueueLimiter(
+            "global",
+            settings.max_concurrency,
+            settings.queue_size,
+            {"big": settings.big_weight, "small": settings.small_weight},
+            per_key=settings.scheduler_per_key,
+        )
+    elif settings.max_concurrency > 0:
+        global_limiter = ConcurrencyLimiter("global", settings.max_concurrency, settings.queue_size)
+    route_limiters = {
+        route: ConcurrencyLimiter(route, limit, settings.queue_size)
+        for route, limit in (("big", settings.big_max_concurrency), ("small", settings.small_max_concurrency))
+        if limit > 0
+    }
+    return AdmissionController(global_limiter, route_limiters, settings.queue_timeout)
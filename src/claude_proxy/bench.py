@@ -0,0 +1,477 @@
+"""Load-generation benchmark for Claude API Proxy.
+
+Drives ``POST /v1/messages`` at a fixed concurrency with a Claude Code style
+mix of requests and reports throughput, latency and time-to-first-token
+percentiles per scenario, plus the proxy's CPU time per request and the
+resident memory of each worker. The scenarios are:
+
+- ``agentic``: streaming Sonnet requests with a system prompt, a tool-use
+  history and the full tool list, like Claude Code's main loop.
+- ``transcript``: streaming Sonnet requests carrying a long transcript with
+  multi-KB tool results.
+- ``background``: short non-streaming Haiku requests, like Claude Code's
+  title and topic calls.
+
+By default the command starts its own mock upstream and proxy (uvicorn
+with ``--workers`` processes) on free local ports, so runs are reproducible
+without network access; ``--url`` benchmarks a running proxy instead, and
+``--pid`` names its main process for CPU and memory figures. CPU and memory
+are read from ``/proc`` and reported as null where it is not available.
+
+    claude-proxy-bench --concurrency 32 --duration 30 --workers 4 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+SCENARIOS = ("agentic", "transcript", "background")
+DEFAULT_MIX = "agentic=6,transcript=1,background=3"
+
+TOOL_NAMES = (
+    "Task", "Bash", "Glob", "Grep", "LS", "Read", "Edit", "MultiEdit",
+    "Write", "NotebookEdit", "WebFetch", "TodoWrite", "WebSearch",
+)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse ``"scenario=weight,..."`` into weights by scenario."""
+    mix: Dict[str, float] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {SCENARIOS}")
+        mix[name] = float(weight) if weight.strip() else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The request mix needs at least one scenario with a positive weight")
+    return mix
+
+
+def _tools() -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": name,
+            "description": f"{name} tool. " + "Detailed usage notes for the model. " * 20,
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Absolute path"},
+                    "content": {"type": "string", "description": "Content to use"},
+                },
+                "required": ["path"],
+            },
+        }
+        for name in TOOL_NAMES
+    ]
+
+
+def _history(rng: random.Random, turns: int, tool_result_bytes: int) -> List[Dict[str, Any]]:
+    line = "    result = process(item)  # tool output line\n"
+    messages: List[Dict[str, Any]] = [{"role": "user", "content": "Fix the failing tests in the parser module."}]
+    for i in range(turns):
+        tool_id = f"toolu_{rng.randrange(16 ** 8):08x}{i}"
+        output = (line * (tool_result_bytes // len(line) + 1))[:tool_result_bytes]
+        messages.append({"role": "assistant", "content": [
+            {"type": "text", "text": f"Let me look at step {i}."},
+            {"type": "tool_use", "id": tool_id, "name": rng.choice(TOOL_NAMES[:8]),
+             "input": {"path": f"/repo/src/module_{i}.py"}},
+        ]})
+        messages.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": output},
+        ]})
+    return messages
+
+
+def build_request(scenario: str, rng: random.Random) -> Dict[str, Any]:
+    """Build a /v1/messages request body for ``scenario``."""
+    if scenario == "background":
+        return {
+            "model": "claude-3-5-haiku-20241022",
+            "max_tokens": 512,
+            "system": "Analyze if this message indicates a new conversation topic. Respond in JSON.",
+            "messages": [{"role": "user", "content": "Can you also add a retry to the upload step?"}],
+        }
+    turns, result_bytes = (rng.randint(4, 12), 2000) if scenario == "agentic" else (rng.randint(80, 120), 6000)
+    return {
+        "model": "claude-sonnet-4-20250514",
+        "max_tokens": 8192,
+        "stream": True,
+        "system": [
+            {"type": "text", "text": "You are Claude Code, an interactive CLI tool that helps with software engineering."},
+            {"type": "text", "text": "Follow the repository conventions. " * 200},
+        ],
+        "messages": _history(rng, turns, result_bytes),
+        "tools": _tools(),
+    }
+
+
+def percentiles(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99/mean/max of ``values`` in milliseconds, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "p50": round(at(0.50) * 1000, 2),
+        "p95": round(at(0.95) * 1000, 2),
+        "p99": round(at(0.99) * 1000, 2),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+class Result:
+    """Outcome of one benchmark request."""
+
+    __slots__ = ("scenario", "status", "latency", "ttft", "error")
+
+    def __init__(self, scenario: str, status: int, latency: float, ttft: Optional[float], error: Optional[str] = None):
+        self.scenario = scenario
+        self.status = status
+        self.latency = latency
+        self.ttft = ttft
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request succeeded, including a stream without an error event."""
+        return self.status == 200 and self.error is None
+
+
+async def send_request(client: httpx.AsyncClient, url: str, scenario: str, body: bytes) -> Result:
+    """Send one request and time it to the first text delta and to the end of the response."""
+    start = time.perf_counter()
+    ttft: Optional[float] = None
+    error: Optional[str] = None
+    try:
+        async with client.stream("POST", url, content=body, headers={"content-type": "application/json"}) as response:
+            async for chunk in response.aiter_bytes():
+                if ttft is None and b"content_block_delta" in chunk:
+                    ttft = time.perf_counter() - start
+                if b"event: error" in chunk:
+                    error = "stream error event"
+            status = response.status_code
+    except httpx.HTTPError as e:
+        status, error = 0, type(e).__name__
+    return Result(scenario, status, time.perf_counter() - start, ttft, error)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    url: str,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float = 0.0,
+    requests: int = 0,
+    seed: int = 0,
+) -> Tuple[List[Result], float]:
+    """Send the mix from ``concurrency`` workers for ``duration`` seconds or ``requests`` requests.
+
+    Returns the results and the elapsed seconds.
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    # A few pre-built bodies per scenario, so building requests does not load the client
+    bodies = {name: [json.dumps(build_request(name, rng)).encode() for _ in range(8)] for name in names}
+    results: List[Result] = []
+    remaining = requests
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal remaining
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if deadline is None:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            scenario = rng.choices(names, weights)[0]
+            results.append(await send_request(client, url, scenario, rng.choice(bodies[scenario])))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+class ProcessSampler:
+    """CPU time and peak resident memory of a process and its children, read from ``/proc``."""
+
+    def __init__(self, pid: Optional[int]):
+        """Watch ``pid`` and its child processes (None disables sampling)."""
+        self.pid = pid
+        self.available = pid is not None and os.path.exists(f"/proc/{pid}/stat")
+        self.peak_rss: Dict[int, int] = {}
+        self._ticks = os.sysconf("SC_CLK_TCK") if self.available else 100
+
+    def pids(self) -> List[int]:
+        """The watched process and its direct children (the workers)."""
+        if not self.available:
+            return []
+        children = []
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        fields = f.read().rsplit(")", 1)[1].split()
+                except OSError:
+                    continue
+                if int(fields[1]) == self.pid:
+                    children.append(int(entry))
+        return [self.pid] + children  # type: ignore[list-item]
+
+    def cpu_seconds(self) -> float:
+        """User plus system CPU seconds used so far by the watched processes."""
+        total = 0
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            total += int(fields[11]) + int(fields[12])
+        return total / self._ticks
+
+    def sample_rss(self) -> None:
+        """Record the current resident memory of every watched process."""
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            rss = int(line.split()[1]) * 1024
+                            self.peak_rss[pid] = max(self.peak_rss.get(pid, 0), rss)
+                            break
+            except OSError:
+                continue
+
+    async def sample_until(self, done: asyncio.Event, interval: float = 0.5) -> None:
+        """Sample memory every ``interval`` seconds until ``done`` is set."""
+        while self.available and not done.is_set():
+            self.sample_rss()
+            try:
+                await asyncio.wait_for(done.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def summarize(results: List[Result], elapsed: float) -> Dict[str, Any]:
+    """Aggregate results into throughput, error and latency figures, overall and per scenario."""
+    def figures(subset: List[Result]) -> Dict[str, Any]:
+        ok = [result for result in subset if result.ok]
+        return {
+            "requests": len(subset),
+            "errors": len(subset) - len(ok),
+            "rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": percentiles([result.latency for result in ok]),
+            "ttft_ms": percentiles([result.ttft for result in ok if result.ttft is not None]),
+        }
+
+    summary = figures(results)
+    summary["duration_s"] = round(elapsed, 3)
+    summary["scenarios"] = {
+        name: figures([result for result in results if result.scenario == name])
+        for name in SCENARIOS if any(result.scenario == name for result in results)
+    }
+    statuses: Dict[str, int] = {}
+    for result in results:
+        key = str(result.status) if result.error is None or result.status != 200 else "200 (stream error)"
+        statuses[key] = statuses.get(key, 0) + 1
+    summary["statuses"] = statuses
+    return summary
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{' '.join(proc.args)} exited with status {proc.returncode}")  # type: ignore[arg-type]
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout:g}s")
+
+
+def start_servers(args: argparse.Namespace, workdir: str) -> Tuple[str, List[subprocess.Popen]]:
+    """Start a mock upstream and a proxy in front of it; return the proxy URL and the processes."""
+    source_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [source_root, os.environ.get("PYTHONPATH")])))
+    mock_port, proxy_port = _free_port(), _free_port()
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "claude_proxy.mock_upstream", "--port", str(mock_port),
+         "--ttft", str(args.mock_ttft), "--tokens-per-second", str(args.mock_tokens_per_second),
+         "--chunks", str(args.mock_chunks), "--tool-calls", "1"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+    )
+    processes = [mock]
+    try:
+        _wait_for_port(mock_port, mock)
+        proxy_env = dict(
+            env,
+            OPENAI_API_KEY="sk-bench",
+            OPENAI_BASE_URL=f"http://127.0.0.1:{mock_port}/v1",
+            CLAUDE_PROXY_LOG_LEVEL="WARNING",
+        )
+        # Run from an empty directory so a local .env does not change the configuration under test
+        proxy = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "claude_proxy.main:app", "--host", "127.0.0.1",
+             "--port", str(proxy_port), "--workers", str(args.workers), "--log-level", "warning",
+             "--no-access-log"],
+            cwd=workdir, env=proxy_env,
+        )
+        processes.append(proxy)
+        _wait_for_port(proxy_port, proxy)
+    except BaseException:
+        stop_servers(processes)
+        raise
+    return f"http://127.0.0.1:{proxy_port}", processes
+
+
+def stop_servers(processes: List[subprocess.Popen]) -> None:
+    """Stop processes started by ``start_servers``."""
+    for proc in reversed(processes):
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def benchmark(url: str, args: argparse.Namespace, pid: Optional[int]) -> Dict[str, Any]:
+    """Warm up, run the load against ``url`` and return the report."""
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"x-api-key": args.api_key} if args.api_key else {}
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits, headers=headers) as client:
+        endpoint = f"{url.rstrip('/')}/v1/messages"
+        if args.warmup:
+            await run_load(client, endpoint, mix, args.concurrency, requests=args.warmup, seed=args.seed + 1)
+
+        sampler = ProcessSampler(pid)
+        cpu_before = sampler.cpu_seconds()
+        done = asyncio.Event()
+        sampling = asyncio.ensure_future(sampler.sample_until(done))
+        results, elapsed = await run_load(
+            client, endpoint, mix, args.concurrency,
+            duration=0.0 if args.requests else args.duration, requests=args.requests, seed=args.seed,
+        )
+        done.set()
+        await sampling
+        cpu = sampler.cpu_seconds() - cpu_before
+
+    report: Dict[str, Any] = {
+        "config": {
+            "url": url,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": None if args.requests else args.duration,
+            "requests": args.requests or None,
+            "workers": args.workers if args.url is None else None,
+            "seed": args.seed,
+        },
+        **summarize(results, elapsed),
+    }
+    report["cpu_ms_per_request"] = round(cpu / len(results) * 1000, 3) if sampler.available and results else None
+    report["rss_mb"] = {
+        str(pid): round(rss / 2 ** 20, 1) for pid, rss in sorted(sampler.peak_rss.items())
+    } if sampler.available else None
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable summary of a report."""
+    def row(name: str, figures: Dict[str, Any]) -> str:
+        latency = figures["latency_ms"] or {}
+        ttft = figures["ttft_ms"] or {}
+        return (
+            f"{name:<11} {figures['requests']:>7} {figures['errors']:>6} {figures['rps']:>8.1f}  "
+            f"{latency.get('p50', 0):>8.1f} {latency.get('p95', 0):>8.1f} {latency.get('p99', 0):>8.1f}  "
+            f"{ttft.get('p50', 0):>8.1f} {ttft.get('p99', 0):>8.1f}"
+        )
+
+    lines = [
+        f"{'scenario':<11} {'requests':>7} {'errors':>6} {'req/s':>8}  "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  {'ttft p50':>8} {'ttft p99':>8}",
+        row("all", report),
+    ]
+    lines += [row(name, figures) for name, figures in report["scenarios"].items()]
+    lines.append(f"statuses: {report['statuses']}")
+    if report["cpu_ms_per_request"] is not None:
+        lines.append(f"proxy CPU: {report['cpu_ms_per_request']:.2f} ms/request")
+    if report["rss_mb"]:
+        lines.append("peak RSS: " + ", ".join(f"pid {pid} {mb} MB" for pid, mb in report["rss_mb"].items()))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running proxy instead of starting one")
+    parser.add_argument("--pid", type=int, help="main process of the proxy at --url, for CPU and memory figures")
+    parser.add_argument("--api-key", help="x-api-key header to send (default: none)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="send this many requests instead of running for --duration")
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request mix")
+    parser.add_argument("--workers", type=int, default=1, help="proxy worker processes to start")
+    parser.add_argument("--mock-ttft", type=float, default=0.2, help="mock upstream time to first token")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=100.0, help="mock upstream output rate")
+    parser.add_argument("--mock-chunks", type=int, default=50, help="mock upstream content chunks per response")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.requests:
+        parser.error("either --duration or --requests must be set")
+    parse_mix(args.mix)
+    # Importing the package configures proxy logging; per-request client logs would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.url:
+        report = asyncio.run(benchmark(args.url, args, args.pid))
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            url, processes = start_servers(args, workdir)
+            try:
+                report = asyncio.run(benchmark(url, args, processes[-1].pid))
+            finally:
+                stop_servers(processes)
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+        return
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
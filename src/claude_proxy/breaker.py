@@ -0,0 +1,190 @@
+"""Per-upstream circuit breakers for Claude API Proxy.
+
+A breaker watches the outcomes of requests to one upstream and stops sending
+it traffic once it looks unhealthy, so requests fail over to another upstream
+(or fail fast) instead of each waiting for the full request timeout.
+
+- **closed**: requests flow. The breaker opens when the last ``window``
+  requests contain at least ``error_rate`` failures (after ``min_requests``),
+  or after ``consecutive_failures`` failures in a row. Connection errors,
+  timeouts, 5xx responses and responses slower than ``slow_call_seconds`` to
+  their headers count as failures.
+- **open**: no requests for ``open_seconds``.
+- **half-open**: up to ``half_open_probes`` requests are let through; the
+  first one to finish closes the breaker on success or re-opens it on failure.
+  A probe cancelled before its outcome is known gives its slot back.
+
+With a shared table (``CLAUDE_PROXY_SHARED_STATE_DIR``) the state is shared
+by all gunicorn workers: a worker that opens, half-opens or closes a breaker
+publishes the change with a generation number, and the other workers adopt it
+before their next request. The outcome window that decides when to open
+stays per worker.
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import REGISTRY
+from .shared import SharedTable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Gauge values for claude_proxy_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+STATES = {value: state for state, value in STATE_VALUES.items()}
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "claude_proxy_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+    ("upstream",),
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "claude_proxy_circuit_transitions_total",
+    "Circuit breaker state changes per upstream",
+    ("upstream", "state"),
+)
+
+
+class CircuitOpenError(Exception):
+    """No upstream circuit admits the request."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """Initialize with the seconds until a circuit may admit requests again."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        window: int = 20,
+        min_requests: int = 10,
+        consecutive_failures: int = 3,
+        slow_call_seconds: float = 0.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        table: Optional[SharedTable] = None,
+    ):
+        """Initialize a closed breaker; ``slow_call_seconds`` of 0 disables the latency check.
+
+        With a shared ``table`` the state is shared by every worker mapping it.
+        """
+        self.name = name
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.consecutive_failures = consecutive_failures
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._failures_in_row = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._table = table
+        self._generation = 0.0
+        self.state = CLOSED
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], upstream=name)
+        self._sync()
+
+    def _apply(self, state: str, opened_at: float, generation: float) -> None:
+        self.state = state
+        self._opened_at = opened_at
+        self._generation = generation
+        self._outcomes.clear()
+        self._failures_in_row = 0
+        self._probes = 0
+        CIRCUIT_STATE.set(STATE_VALUES[state], upstream=self.name)
+
+    def _sync(self) -> None:
+        """Adopt a state change published by another worker."""
+        if self._table is None:
+            return
+        record = self._table.get(self.name)
+        if record is not None and record[2] > self._generation:
+            self._apply(STATES[int(record[0])], record[1], record[2])
+
+    def _transition(self, state: str) -> None:
+        opened_at = self._clock() if state == OPEN else self._opened_at
+        if self._table is None:
+            self._apply(state, opened_at, self._generation + 1)
+            CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+            return
+
+        def publish(record: Optional[Tuple[float, ...]]) -> Tuple[Tuple[float, ...], Optional[Tuple[float, ...]]]:
+            if record is not None and record[2] != self._generation:
+                # Another worker changed the state first; keep and adopt its change
+                return record, record
+            return (STATE_VALUES[state], opened_at, self._generation + 1), None
+
+        newer = self._table.update(self.name, publish)
+        if newer is not None:
+            self._apply(STATES[int(newer[0])], newer[1], newer[2])
+            return
+        self._apply(state, opened_at, self._generation + 1)
+        CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - self._clock(), 0.0)
+
+    def available(self) -> bool:
+        """Whether a request may be sent now (moves open to half-open once the wait is over)."""
+        self._sync()
+        if self.state == OPEN and self.retry_after() == 0.0:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            return self._probes < self.half_open_probes
+        return self.state == CLOSED
+
+    def on_start(self) -> bool:
+        """Record that an admitted request was sent; return whether it took a half-open probe slot."""
+        if self.state == HALF_OPEN:
+            self._probes += 1
+            return True
+        return False
+
+    def on_cancel(self, probe: bool) -> None:
+        """Give back the probe slot of a request cancelled before its outcome was known."""
+        if probe and self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        """Record the outcome of a request; ``latency`` is the time to response headers."""
+        if ok and latency is not None and self.slow_call_seconds and latency >= self.slow_call_seconds:
+            ok = False
+        self._sync()
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED if ok else OPEN)
+            return
+        if self.state == OPEN:
+            # A request admitted before the breaker opened; nothing to decide
+            return
+        self._outcomes.append(ok)
+        self._failures_in_row = 0 if ok else self._failures_in_row + 1
+        if self._failures_in_row >= self.consecutive_failures:
+            self._transition(OPEN)
+            return
+        if len(self._outcomes) >= self.min_requests:
+            failures = len(self._outcomes) - sum(self._outcomes)
+            if failures / len(self._outcomes) >= self.error_rate:
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state for the health endpoint."""
+        stats: Dict[str, Any] = {"state": self.state}
+        if self.state == OPEN:
+            stats["retry_after"] = round(self.retry_after(), 1)
+        elif self.state == CLOSED and self._outcomes:
+            stats["error_rate"] = round(1 - sum(self._outcomes) / len(self._outcomes), 3)
+        return stats
@@ -0,0 +1,98 @@
+"""Bounded LRU cache with idle-time eviction."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """Size-bounded LRU cache whose entries also expire after ``ttl`` idle seconds.
+
+    Lookups and insertions are O(1). Expired entries are dropped lazily when they
+    are looked up and from the cold end of the LRU order on every insert.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[str, V], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.clock = clock
+        # key -> (value, last access time), ordered from least to most recently used
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _expired(self, last_used: float, now: float) -> bool:
+        return self.ttl is not None and now - last_used > self.ttl
+
+    def _evict(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value and mark it as recently used."""
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is None or self._expired(entry[1], now):
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+        self._entries[key] = (entry[0], now)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, value: V) -> None:
+        """Insert or replace a value, evicting idle and least recently used entries."""
+        now = self.clock()
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        self.prune(now)
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)))
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Drop expired entries from the cold end of the LRU order."""
+        if self.ttl is None:
+            return
+        now = self.clock() if now is None else now
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if not self._expired(last_used, now):
+                break
+            self._evict(key)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for key in list(self._entries):
+            self._evict(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
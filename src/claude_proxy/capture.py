@@ -0,0 +1,96 @@
+"""Sampled debug capture of request/response payloads for Claude API Proxy."""
+
+import json
+import logging
+import random
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCapture:
+    """Payload capture for one sampled request, bounded by a size budget."""
+
+    __slots__ = ("request_id", "remaining", "dropped")
+
+    def __init__(self, request_id: str, max_chars: int):
+        """Initialize a capture with ``max_chars`` characters of budget."""
+        self.request_id = request_id
+        self.remaining = max_chars
+        self.dropped = 0
+
+    def record(self, stage: str, payload: Any) -> None:
+        """Log one payload at DEBUG, truncated to the remaining budget.
+
+        ``payload`` may be a string, UTF-8 bytes, a JSON-serializable value, or a
+        zero-argument callable producing one, so expensive dumps only run for
+        captured requests.
+        """
+        if self.remaining <= 0:
+            self.dropped += 1
+            return
+        if callable(payload):
+            payload = payload()
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8", "replace")
+        text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+        size = len(text)
+        truncated = size > self.remaining
+        if truncated:
+            text = text[:self.remaining]
+        self.remaining -= len(text)
+        logger.debug(
+            "[%s] %s%s: %s",
+            self.request_id, stage, " (truncated)" if truncated else "", text,
+            extra={"capture": {"request_id": self.request_id, "stage": stage, "size": size, "truncated": truncated}},
+        )
+
+
+class PayloadCapture:
+    """Capture policy: which requests get their payloads logged, and how much of them.
+
+    Capture is off unless the sample rate is positive *and* the capture logger is
+    enabled for DEBUG. ``start`` returns ``None`` for unsampled requests, so the
+    hot path only pays for a ``None`` check and payloads are never formatted.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, max_chars: int = 8192, rng: Callable[[], float] = random.random):
+        """Initialize the policy."""
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.max_chars = max_chars
+        self.rng = rng
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request can be captured."""
+        return self.sample_rate > 0 and logger.isEnabledFor(logging.DEBUG)
+
+    def start(self, request_id: str) -> Optional[RequestCapture]:
+        """Decide whether to capture ``request_id``; return its capture or ``None``."""
+        if not self.enabled:
+            return None
+        if self.sample_rate < 1.0 and self.rng() >= self.sample_rate:
+            return None
+        return RequestCapture(request_id, self.max_chars)
+
+
+# Global capture policy, disabled until configured
+_capture = PayloadCapture()
+
+
+def configure_capture(sample_rate: float, max_chars: int) -> PayloadCapture:
+    """Install the global capture policy.
+
+    A positive sample rate lowers the capture logger to DEBUG so sampled payloads
+    are emitted without switching the whole application to DEBUG.
+    """
+    global _capture
+    _capture = PayloadCapture(sample_rate, max_chars)
+    if _capture.sample_rate > 0:
+        logger.setLevel(logging.DEBUG)
+    return _capture
+
+
+def start_capture(request_id: str) -> Optional[RequestCapture]:
+    """Start capturing ``request_id`` under the global policy (``None`` if not sampled)."""
+    return _capture.start(request_id)
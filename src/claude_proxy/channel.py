@@ -0,0 +1,109 @@
+"""Background reading of async event streams for Claude API Proxy.
+
+``StreamChannel`` drains an async iterator in its own task into a bounded
+buffer. The consumer can wait for the next item with a timeout and do other
+work (flush a partial batch, check the client connection) without cancelling
+the upstream read in progress, and can stop the upstream at any time.
+"""
+
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class _Failure:
+    """Exception raised by the source iterator, handed to the consumer."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class StreamChannel(Generic[T]):
+    """Bounded single-consumer buffer fed by a producer task reading ``source``.
+
+    Unlike ``asyncio.wait_for(queue.get(), timeout)``, a timed ``wait`` costs one
+    future and one timer handle rather than a task, and a timeout never loses
+    or cancels anything.
+    """
+
+    def __init__(self, source: AsyncIterator[T], maxsize: int = 256):
+        """Start reading ``source`` in a background task."""
+        self._source = source
+        self._items: Deque[object] = deque()
+        self._maxsize = maxsize
+        self._reader: "Optional[asyncio.Future[None]]" = None
+        self._writer: "Optional[asyncio.Future[None]]" = None
+        self._producer = asyncio.ensure_future(self._produce())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def _wake(waiter: "Optional[asyncio.Future[None]]") -> None:
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _put(self, item: object) -> None:
+        while len(self._items) >= self._maxsize:
+            self._writer = asyncio.get_running_loop().create_future()
+            try:
+                await self._writer
+            finally:
+                self._writer = None
+        self._items.append(item)
+        self._wake(self._reader)
+
+    async def _produce(self) -> None:
+        try:
+            async for item in self._source:
+                await self._put(item)
+        except Exception as e:
+            await self._put(_Failure(e))
+            return
+        await self._put(_END)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until an item is available or ``timeout`` elapses; return availability."""
+        if not self._items:
+            loop = asyncio.get_running_loop()
+            self._reader = loop.create_future()
+            timer = loop.call_later(timeout, self._wake, self._reader) if timeout is not None else None
+            try:
+                await self._reader
+            finally:
+                self._reader = None
+                if timer is not None:
+                    timer.cancel()
+        return bool(self._items)
+
+    def get_nowait(self) -> T:
+        """Pop the next item; raise ``StopAsyncIteration`` at the end or the source's error.
+
+        The buffer must not be empty (check ``len`` or ``wait`` first).
+        """
+        item = self._items.popleft()
+        self._wake(self._writer)
+        if item is _END:
+            self._items.appendleft(item)
+            raise StopAsyncIteration
+        if isinstance(item, _Failure):
+            self._items.appendleft(_END)
+            raise item.error
+        return item  # type: ignore[return-value]
+
+    async def aclose(self) -> None:
+        """Stop the producer and close the source iterator."""
+        self._producer.cancel()
+        try:
+            await self._producer
+        except (asyncio.CancelledError, Exception):
+            pass
+        aclose = getattr(self._source, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,93 @@
+"""Delta coalescing for high-rate streaming responses.
+
+Fast upstream models send one chunk per token, which becomes one SSE event and
+one ASGI send per token. ``coalesce_deltas`` merges consecutive ``text_delta``
+and ``input_json_delta`` events for the same content block into a single event,
+flushing at most once per time window or when a byte budget is reached.
+
+The first delta after an idle period (including the very first token) is sent
+immediately, so time-to-first-token is unchanged; later deltas wait at most one
+window. Upstream events are read by a ``StreamChannel`` producer task, so
+waiting for the flush deadline never cancels an upstream read.
+"""
+
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from . import sse
+from .channel import StreamChannel
+
+
+async def coalesce_deltas(
+    events: AsyncIterator[bytes],
+    window: float,
+    max_bytes: int,
+    clock: Callable[[], float] = time.monotonic,
+    queue_size: int = 256,
+) -> AsyncIterator[bytes]:
+    """Re-yield encoded SSE ``events`` with consecutive deltas merged.
+
+    ``window`` is in seconds; ``max_bytes`` bounds the escaped payload of one
+    merged delta. Non-delta events flush pending deltas first and are sent in the
+    same chunk, so event order is preserved.
+    """
+    channel: StreamChannel[bytes] = StreamChannel(events, queue_size)
+    head: Optional[bytes] = None
+    payloads: List[bytes] = []
+    size = 0
+    deadline = 0.0
+    last_flush = float("-inf")
+    try:
+        while True:
+            if not len(channel):
+                if head is None:
+                    await channel.wait()
+                else:
+                    remaining = deadline - clock()
+                    if remaining <= 0 or not await channel.wait(remaining):
+                        # Window elapsed with no new upstream events
+                        yield sse.merge_deltas(head, payloads)
+                        head, payloads, size = None, [], 0
+                        last_flush = clock()
+                        continue
+            try:
+                event = channel.get_nowait()
+            except StopAsyncIteration:
+                break
+
+            split = sse.split_delta(event)
+            if split is None:
+                if head is not None:
+                    event = sse.merge_deltas(head, payloads) + event
+                    head, payloads, size = None, [], 0
+                yield event
+                continue
+
+            item_head, payload = split
+            flushed = b""
+            if head is not None and item_head != head:
+                # Different block or delta type: close out the pending merge
+                flushed = sse.merge_deltas(head, payloads)
+                head, payloads, size = None, [], 0
+                last_flush = clock()
+            if head is None:
+                now = clock()
+                if now - last_flush >= window:
+                    # Leading edge after an idle period goes out immediately
+                    last_flush = now
+                    yield flushed + event
+                    continue
+                head, deadline = item_head, last_flush + window
+            payloads.append(payload)
+            size += len(payload)
+            if size >= max_bytes or clock() >= deadline:
+                flushed += sse.merge_deltas(head, payloads)
+                head, payloads, size = None, [], 0
+                last_flush = clock()
+            if flushed:
+                yield flushed
+
+        if head is not None:
+            yield sse.merge_deltas(head, payloads)
+    finally:
+        await channel.aclose()
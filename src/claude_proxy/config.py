@@ -15,6 +15,12 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", description="Server host", alias="CLAUDE_PROXY_HOST")
     port: int = Field(default=8085, description="Server port", alias="CLAUDE_PROXY_PORT")
     log_level: str = Field(default="INFO", description="Log level", alias="CLAUDE_PROXY_LOG_LEVEL")
+    log_format: str = Field(default="text", description="Log line format: text or json", alias="CLAUDE_PROXY_LOG_FORMAT")
+    log_queue_size: int = Field(default=10000, description="Buffered log records before dropping (0 writes synchronously)", alias="CLAUDE_PROXY_LOG_QUEUE_SIZE")
+    
+    # Debug payload capture (request/response bodies logged at DEBUG for sampled requests)
+    capture_sample_rate: float = Field(default=0.0, description="Fraction of requests whose payloads are captured (0 disables)", alias="CLAUDE_PROXY_CAPTURE_SAMPLE_RATE")
+    capture_max_chars: int = Field(default=8192, description="Maximum captured payload characters per request", alias="CLAUDE_PROXY_CAPTURE_MAX_CHARS")
     
     # Model mapping
     big_model: str = Field(default="gpt-4o", description="Model for Claude Opus/Sonnet", alias="CLAUDE_PROXY_BIG_MODEL")
@@ -26,10 +32,89 @@ class Settings(BaseSettings):
         default="https://api.openai.com/v1", 
         description="Target provider API base URL"
     )
+    openai_base_urls: Optional[str] = Field(
+        default=None,
+        description="Comma-separated 'url|weight' upstreams to balance across (overrides OPENAI_BASE_URL)"
+    )
+    
+    # Upstream load balancing (only matters when OPENAI_BASE_URLS lists several upstreams)
+    balance_strategy: str = Field(default="least_outstanding", description="Upstream choice: round_robin, least_outstanding or ewma", alias="CLAUDE_PROXY_BALANCE_STRATEGY")
+    
+    # Per-upstream circuit breakers (open circuits fail over to other upstreams or fail fast)
+    circuit_error_rate: float = Field(default=0.5, description="Failure rate over the window that opens a circuit", alias="CLAUDE_PROXY_CIRCUIT_ERROR_RATE")
+    circuit_window: int = Field(default=20, description="Recent requests per upstream the failure rate is computed over", alias="CLAUDE_PROXY_CIRCUIT_WINDOW")
+    circuit_min_requests: int = Field(default=10, description="Requests in the window before the failure rate is considered", alias="CLAUDE_PROXY_CIRCUIT_MIN_REQUESTS")
+    circuit_consecutive_failures: int = Field(default=5, description="Failures in a row that open a circuit", alias="CLAUDE_PROXY_CIRCUIT_CONSECUTIVE_FAILURES")
+    circuit_slow_call_seconds: float = Field(default=0.0, description="Time to response headers counted as a failure (0 disables)", alias="CLAUDE_PROXY_CIRCUIT_SLOW_CALL_SECONDS")
+    circuit_open_seconds: float = Field(default=15.0, description="Seconds a circuit stays open before probing the upstream", alias="CLAUDE_PROXY_CIRCUIT_OPEN_SECONDS")
+    circuit_half_open_probes: int = Field(default=1, description="Concurrent probe requests allowed while half-open", alias="CLAUDE_PROXY_CIRCUIT_HALF_OPEN_PROBES")
+    
+    # Anthropic passthrough settings (raw bytes forwarded, no conversion)
+    anthropic_api_key: Optional[str] = Field(default=None, description="Anthropic API key for passthrough routes")
+    anthropic_base_url: str = Field(default="https://api.anthropic.com", description="Anthropic-compatible API base URL")
+    big_model_backend: str = Field(default="openai", description="Backend for Claude Opus/Sonnet: openai or anthropic", alias="CLAUDE_PROXY_BIG_MODEL_BACKEND")
+    small_model_backend: str = Field(default="openai", description="Backend for Claude Haiku: openai or anthropic", alias="CLAUDE_PROXY_SMALL_MODEL_BACKEND")
     
     # Request settings
     max_tokens_limit: int = Field(default=4096, description="Maximum tokens limit", alias="CLAUDE_PROXY_MAX_TOKENS_LIMIT")
     request_timeout: int = Field(default=90, description="Request timeout in seconds", alias="CLAUDE_PROXY_REQUEST_TIMEOUT")
+    fast_path: bool = Field(default=False, description="Skip Pydantic models for /v1/messages and convert the parsed JSON directly", alias="CLAUDE_PROXY_FAST_PATH")
+    
+    # Upstream retries (connection errors, 408/409/429/5xx; streams only before the first byte)
+    retry_max_retries: int = Field(default=2, description="Retries per upstream request (0 disables)", alias="CLAUDE_PROXY_RETRY_MAX_RETRIES")
+    big_retry_max_retries: Optional[int] = Field(default=None, description="Retries for Claude Opus/Sonnet requests (defaults to CLAUDE_PROXY_RETRY_MAX_RETRIES)", alias="CLAUDE_PROXY_BIG_RETRY_MAX_RETRIES")
+    small_retry_max_retries: Optional[int] = Field(default=None, description="Retries for Claude Haiku requests (defaults to CLAUDE_PROXY_RETRY_MAX_RETRIES)", alias="CLAUDE_PROXY_SMALL_RETRY_MAX_RETRIES")
+    retry_base_delay: float = Field(default=0.5, description="Initial backoff in seconds, doubled per retry with full jitter", alias="CLAUDE_PROXY_RETRY_BASE_DELAY")
+    retry_max_delay: float = Field(default=8.0, description="Maximum backoff in seconds; longer Retry-After hints are not waited for", alias="CLAUDE_PROXY_RETRY_MAX_DELAY")
+    retry_budget_ratio: float = Field(default=0.2, description="Retries allowed per request on a route, averaged over time", alias="CLAUDE_PROXY_RETRY_BUDGET_RATIO")
+    retry_budget_min_per_second: float = Field(default=1.0, description="Retries per second allowed on a route regardless of traffic", alias="CLAUDE_PROXY_RETRY_BUDGET_MIN_PER_SECOND")
+    retry_read_errors: bool = Field(default=False, description="Also retry read errors after the request was sent (may duplicate upstream requests)", alias="CLAUDE_PROXY_RETRY_READ_ERRORS")
+    
+    # Hedged requests (non-streaming only; a slow request is duplicated to another upstream)
+    hedge_routes: str = Field(default="", description="Comma-separated routes (big, small) whose non-streaming requests are hedged", alias="CLAUDE_PROXY_HEDGE_ROUTES")
+    hedge_quantile: float = Field(default=0.95, description="Recent latency quantile after which a request is hedged", alias="CLAUDE_PROXY_HEDGE_QUANTILE")
+    hedge_min_delay: float = Field(default=0.05, description="Minimum seconds to wait before hedging", alias="CLAUDE_PROXY_HEDGE_MIN_DELAY")
+    hedge_min_samples: int = Field(default=20, description="Latencies observed on a route before hedging starts", alias="CLAUDE_PROXY_HEDGE_MIN_SAMPLES")
+    hedge_budget_ratio: float = Field(default=0.05, description="Hedges allowed per request on a route, averaged over time", alias="CLAUDE_PROXY_HEDGE_BUDGET_RATIO")
+    
+    # Admission control (limits in-flight /v1/messages requests; excess requests get 529 overloaded_error)
+    max_concurrency: int = Field(default=0, description="Maximum in-flight requests across all routes (0 disables)", alias="CLAUDE_PROXY_MAX_CONCURRENCY")
+    big_max_concurrency: int = Field(default=0, description="Maximum in-flight Claude Opus/Sonnet requests (0 disables)", alias="CLAUDE_PROXY_BIG_MAX_CONCURRENCY")
+    small_max_concurrency: int = Field(default=0, description="Maximum in-flight Claude Haiku requests (0 disables)", alias="CLAUDE_PROXY_SMALL_MAX_CONCURRENCY")
+    queue_size: int = Field(default=100, description="Requests that may wait for a slot per limit before new ones are shed", alias="CLAUDE_PROXY_QUEUE_SIZE")
+    queue_timeout: float = Field(default=5.0, description="Seconds a request may wait for admission before it is shed", alias="CLAUDE_PROXY_QUEUE_TIMEOUT")
+    scheduler: str = Field(default="fifo", description="Order of the global admission queue: fifo or wfq (weighted fair queuing across routes)", alias="CLAUDE_PROXY_SCHEDULER")
+    big_weight: float = Field(default=4.0, description="WFQ share of freed slots for Claude Opus/Sonnet requests", alias="CLAUDE_PROXY_BIG_WEIGHT")
+    small_weight: float = Field(default=1.0, description="WFQ share of freed slots for Claude Haiku requests", alias="CLAUDE_PROXY_SMALL_WEIGHT")
+    scheduler_per_key: bool = Field(default=False, description="With wfq, also share each route's slots fairly across client API keys", alias="CLAUDE_PROXY_SCHEDULER_PER_KEY")
+    
+    # Per-client-key rate limits (checked before the request body is parsed; excess requests get 429)
+    rate_limit_requests_per_second: float = Field(default=0.0, description="Requests per second allowed per client key (0 disables)", alias="CLAUDE_PROXY_RATE_LIMIT_REQUESTS_PER_SECOND")
+    rate_limit_burst: float = Field(default=10.0, description="Requests a client key may send at once before the per-second rate applies", alias="CLAUDE_PROXY_RATE_LIMIT_BURST")
+    rate_limit_tokens_per_minute: float = Field(default=0.0, description="Estimated input tokens per minute allowed per client key (0 disables)", alias="CLAUDE_PROXY_RATE_LIMIT_TOKENS_PER_MINUTE")
+    rate_limit_max_keys: int = Field(default=100000, description="Client keys tracked at once; idle keys are evicted once their buckets are full", alias="CLAUDE_PROXY_RATE_LIMIT_MAX_KEYS")
+    
+    # Cross-worker shared state (rate-limit buckets, circuit breakers and counters shared by gunicorn workers)
+    shared_state_dir: Optional[str] = Field(default=None, description="Directory for memory-mapped state shared by all workers, ideally on tmpfs such as /dev/shm (unset keeps state per worker)", alias="CLAUDE_PROXY_SHARED_STATE_DIR")
+    shared_state_token: Optional[str] = Field(default=None, description="Names this deployment's shared state files; set per start by gunicorn.conf.py (unset uses the parent process id)", alias="CLAUDE_PROXY_SHARED_STATE_TOKEN")
+    shared_state_flush_interval: float = Field(default=1.0, description="Seconds between writes of buffered counter increments to the shared table", alias="CLAUDE_PROXY_SHARED_STATE_FLUSH_INTERVAL")
+    
+    # Streaming delta coalescing (merges per-token deltas; first token is never delayed)
+    stream_coalesce_ms: float = Field(default=0.0, description="Window in milliseconds for merging consecutive streaming deltas (0 disables)", alias="CLAUDE_PROXY_STREAM_COALESCE_MS")
+    stream_coalesce_bytes: int = Field(default=4096, description="Flush a merged delta once its payload reaches this many bytes", alias="CLAUDE_PROXY_STREAM_COALESCE_BYTES")
+    
+    # Client disconnect watchdog (cancels the upstream stream when the client goes away)
+    disconnect_check_interval: float = Field(default=0.5, description="Seconds between client disconnect checks while streaming (0 disables)", alias="CLAUDE_PROXY_DISCONNECT_CHECK_INTERVAL")
+    
+    # Upstream connection pool settings (limits apply per upstream host)
+    pool_max_connections: int = Field(default=100, description="Maximum upstream connections per host", alias="CLAUDE_PROXY_POOL_MAX_CONNECTIONS")
+    pool_max_keepalive_connections: int = Field(default=20, description="Maximum idle keep-alive connections per host", alias="CLAUDE_PROXY_POOL_MAX_KEEPALIVE_CONNECTIONS")
+    pool_keepalive_expiry: float = Field(default=30.0, description="Seconds an idle keep-alive connection is kept open", alias="CLAUDE_PROXY_POOL_KEEPALIVE_EXPIRY")
+    
+    # HTTP/2 upstream transport (requires the optional 'h2' package)
+    http2: bool = Field(default=False, description="Use multiplexed HTTP/2 connections to the upstream", alias="CLAUDE_PROXY_HTTP2")
+    http2_max_concurrent_streams: int = Field(default=100, description="Maximum concurrent HTTP/2 streams per upstream host, across its connections", alias="CLAUDE_PROXY_HTTP2_MAX_CONCURRENT_STREAMS")
+    http2_prior_knowledge: bool = Field(default=False, description="Speak HTTP/2 without negotiation (needed for cleartext h2c upstreams)", alias="CLAUDE_PROXY_HTTP2_PRIOR_KNOWLEDGE")
     
     # Authentication settings
     auth_key: Optional[str] = Field(
@@ -55,6 +140,12 @@ def map_claude_model(claude_model: str) -> str:
     return BaseProvider.map_claude_model(claude_model, settings.big_model, settings.small_model)
 
 
+def get_model_route(claude_model: str) -> str:
+    """Get the route ("big" or "small") serving a Claude model name."""
+    from .providers.base import BaseProvider
+    return BaseProvider.get_model_route(claude_model)
+
+
 # Global settings instance
 _settings: Optional[Settings] = None
 
@@ -0,0 +1,62 @@
+"""Client disconnect watchdog for streaming responses.
+
+ASGI servers do not always surface a client disconnect to a streaming response
+(a send to a closed connection may silently succeed), so without a check the
+proxy keeps pulling tokens from the upstream until ``finish_reason``. The
+watchdog reads the upstream through a ``StreamChannel`` and polls the client
+connection; on disconnect it cancels the producer, which exits the provider's
+``client.stream`` context and releases the upstream connection.
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from .channel import StreamChannel
+from .metrics import STREAM_CANCELLATIONS
+
+logger = logging.getLogger(__name__)
+
+
+async def watch_disconnect(
+    events: AsyncIterator[bytes],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    interval: float,
+    request_id: str = "",
+    clock: Callable[[], float] = time.monotonic,
+) -> AsyncIterator[bytes]:
+    """Re-yield ``events`` until they end or the client disconnects.
+
+    The connection is checked whenever the upstream has been silent for
+    ``interval`` seconds, and at least every ``interval`` seconds while events
+    are flowing.
+    """
+    channel: StreamChannel[bytes] = StreamChannel(events)
+    cancelled: Optional[str] = None
+    next_check = clock() + interval
+    try:
+        while True:
+            if not len(channel):
+                await channel.wait(max(next_check - clock(), 0.0))
+            if clock() >= next_check:
+                if await is_disconnected():
+                    cancelled = "client_disconnect"
+                    logger.info(f"Client disconnected, cancelling upstream stream {request_id}")
+                    return
+                next_check = clock() + interval
+            if not len(channel):
+                continue
+            try:
+                event = channel.get_nowait()
+            except StopAsyncIteration:
+                return
+            yield event
+    except (GeneratorExit, asyncio.CancelledError):
+        # The server closed the response (e.g. it noticed the disconnect itself)
+        cancelled = "response_closed"
+        raise
+    finally:
+        if cancelled is not None:
+            STREAM_CANCELLATIONS.inc(reason=cancelled)
+        await channel.aclose()
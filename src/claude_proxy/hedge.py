@@ -0,0 +1,197 @@
+"""Hedged upstream requests for Claude API Proxy.
+
+A hedged request sends a duplicate of a slow non-streaming request to another
+upstream and uses whichever answers first, cutting the tail latency caused by
+an upstream that stalls on a few requests. The duplicate is sent once the
+original has been waiting longer than the route's recent ``quantile`` latency
+(p95 by default), so only the slowest few percent of requests are hedged.
+
+Hedges are limited by a token bucket per route: every request deposits
+``budget_ratio`` tokens and every hedge spends one, so hedging adds at most
+that fraction of extra upstream load even when the whole upstream is slow.
+Streaming requests are never hedged.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional
+
+import httpx
+
+from .config import Settings
+from .metrics import REGISTRY
+from .retry import RetryBudget, is_retryable_status
+
+logger = logging.getLogger(__name__)
+
+HEDGES = REGISTRY.counter(
+    "claude_proxy_upstream_hedges_total",
+    "Hedged upstream requests by the attempt whose response was used",
+    ("route", "winner"),
+)
+HEDGES_SUPPRESSED = REGISTRY.counter(
+    "claude_proxy_upstream_hedges_suppressed_total",
+    "Slow upstream requests that were not hedged because the budget was spent",
+    ("route",),
+)
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful requests on one route."""
+
+    def __init__(self, size: int = 200):
+        """Initialize an empty window holding up to ``size`` samples."""
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        """Record a request latency in seconds."""
+        self._samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile of the window, or None if it is empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _succeeded(task: "asyncio.Future[httpx.Response]") -> bool:
+    return task.exception() is None and not is_retryable_status(task.result().status_code)
+
+
+async def _discard(task: "asyncio.Future[httpx.Response]") -> None:
+    """Cancel an attempt that lost the race and close its response if it has one."""
+    task.cancel()
+    try:
+        response = await task
+    except BaseException:
+        return
+    await response.aclose()
+
+
+class Hedger:
+    """Sends non-streaming requests on hedged routes with a latency-derived hedge delay."""
+
+    def __init__(
+        self,
+        routes: Iterable[str],
+        quantile: float = 0.95,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200,
+        budget_ratio: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the hedger; routes not listed are never hedged."""
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._clock = clock
+        self.windows: Dict[str, LatencyWindow] = {route: LatencyWindow(window) for route in routes}
+        # Hedges are budgeted like retries, but without an allowance for quiet routes
+        self.budgets: Dict[str, RetryBudget] = {
+            route: RetryBudget(budget_ratio, min_per_second=0.0, capacity=10.0, clock=clock)
+            for route in self.windows
+        }
+
+    def enabled(self, route: str) -> bool:
+        """Whether requests on ``route`` may be hedged."""
+        return route in self.windows
+
+    def delay(self, route: str) -> Optional[float]:
+        """Seconds to wait before hedging on ``route``, or None until enough latencies were seen."""
+        window = self.windows.get(route)
+        if window is None or len(window) < self.min_samples:
+            return None
+        return max(window.quantile(self.quantile) or 0.0, self.min_delay)
+
+    async def send(
+        self,
+        route: str,
+        primary: Callable[[], Awaitable[httpx.Response]],
+        hedge: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """Call ``primary`` and, if it is slower than the hedge delay, also ``hedge``.
+
+        The first successful response is returned and the other attempt is
+        cancelled. If both fail, the primary's outcome is returned or raised.
+        """
+        delay = self.delay(route)
+        budget = self.budgets.get(route)
+        if budget is not None:
+            budget.deposit()
+        start = self._clock()
+        first = asyncio.ensure_future(primary())
+        try:
+            if delay is not None:
+                await asyncio.wait({first}, timeout=delay)
+            if delay is None or first.done():
+                response = await first
+            elif not budget.withdraw():
+                HEDGES_SUPPRESSED.inc(route=route)
+                response = await first
+            else:
+                response = await self._race(route, first, asyncio.ensure_future(hedge()))
+        except BaseException:
+            if not first.done():
+                await _discard(first)
+            raise
+        if not is_retryable_status(response.status_code):
+            self.windows[route].add(self._clock() - start)
+        return response
+
+    async def _race(
+        self,
+        route: str,
+        first: "asyncio.Future[httpx.Response]",
+        second: "asyncio.Future[httpx.Response]",
+    ) -> httpx.Response:
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if _succeeded(task):
+                        winner = "primary" if task is first else "hedge"
+                        HEDGES.inc(route=route, winner=winner)
+                        if winner == "hedge":
+                            logger.debug(f"Hedged request on route {route} answered first")
+                        for other in (first, second):
+                            if other is not task and other.done():
+                                await _discard(other)
+                        return task.result()
+            HEDGES.inc(route=route, winner="none")
+            await _discard(second)
+            return first.result()
+        finally:
+            for task in pending:
+                await _discard(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current hedge delay and budget per route for the health endpoint."""
+        stats: Dict[str, Any] = {}
+        for route, window in self.windows.items():
+            delay = self.delay(route)
+            stats[route] = {
+                "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "samples": len(window),
+                "budget_tokens": round(self.budgets[route].tokens, 2),
+            }
+        return stats
+
+
+def build_hedger(settings: Settings) -> Hedger:
+    """Build the hedger for the routes listed in ``CLAUDE_PROXY_HEDGE_ROUTES``."""
+    routes = [route.strip() for route in settings.hedge_routes.split(",") if route.strip()]
+    return Hedger(
+        routes,
+        quantile=settings.hedge_quantile,
+        min_delay=settings.hedge_min_delay,
+        min_samples=settings.hedge_min_samples,
+        budget_ratio=settings.hedge_budget_ratio,
+    )
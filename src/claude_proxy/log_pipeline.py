@@ -0,0 +1,132 @@
+"""Non-blocking log pipeline for Claude API Proxy.
+
+Log calls only enqueue records onto a bounded in-memory queue; a background
+thread drains the queue and performs the actual (possibly slow) writes, so a
+slow stdout consumer never stalls the event loop. When the queue is full,
+records are dropped and counted instead of blocking the caller.
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize the record, including any ``extra`` fields."""
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        """Initialize the handler with drop counters."""
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge message arguments and exception text, keeping ``extra`` fields for the writer."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue without blocking; count the record as dropped on overflow."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self.dropped_by_level[record.levelname] = self.dropped_by_level.get(record.levelname, 0) + 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+
+class _WriterListener(logging.handlers.QueueListener):
+    """Queue listener whose stop sentinel waits for room instead of failing on a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        """Block until the writer has drained enough to accept the sentinel."""
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """A bounded log queue plus the background thread that writes it out."""
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int):
+        """Initialize the pipeline; ``start`` launches the writer thread."""
+        self.queue_size = queue_size
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = _WriterListener(self.queue, *handlers, respect_handler_level=True)
+        self._running = False
+
+    def start(self) -> None:
+        """Start the background writer."""
+        if not self._running:
+            self.listener.start()
+            self._running = True
+
+    def stop(self) -> None:
+        """Flush queued records and stop the background writer."""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue and drop counters for the health endpoint."""
+        return {
+            "queue_size": self.queue_size,
+            "queued": self.queue.qsize(),
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "dropped_by_level": dict(self.handler.dropped_by_level),
+        }
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    """Build the formatter for ``log_format`` ("text" or "json")."""
+    if log_format.lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def build_log_pipeline(stream_handler: logging.Handler, queue_size: int) -> Optional[LogPipeline]:
+    """Wrap ``stream_handler`` in a pipeline, or return ``None`` when queueing is disabled."""
+    if queue_size <= 0:
+        return None
+    return LogPipeline([stream_handler], queue_size)
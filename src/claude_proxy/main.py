@@ -1,50 +1,176 @@
 """Claude API Proxy - Main FastAPI application."""
 
+import asyncio
 import logging
+import math
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Any, Dict, Optional
 
+import httpx
 import uvicorn
 from fastapi import Depends, FastAPI, HTTPException, Header, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
 
-from .config import get_settings
+from .admission import OverloadedError, ReleasingResponse, build_admission
+from .breaker import CircuitOpenError
+from .capture import configure_capture
+from .coalesce import coalesce_deltas
+from .config import get_model_mapping, get_model_route, get_settings, map_claude_model
+from .disconnect import watch_disconnect
+from .hedge import build_hedger
+from .metrics import REGISTRY
 from .models.claude import (
     ClaudeMessagesRequest,
     ClaudeMessagesResponse,
     ClaudeTokenCountRequest,
     ClaudeTokenCountResponse,
+    RawMessagesRequest,
+    check_raw_messages_request,
 )
-# from .providers.anthropic import AnthropicProvider  # Not used currently
+from .pool import UpstreamClientPool
+from .providers.anthropic import AnthropicProvider
+from .providers.base import UpstreamError
 from .providers.openai import OpenAIProvider
+from .ratelimit import RateLimitError, build_rate_limiter, estimate_tokens
+from .retry import build_retrier
+from .shared import open_shared_state
+from .telemetry import RequestMetricsMiddleware
+from .upstream import build_upstream_pool
 from .utils import (
     extract_api_key_from_headers,
     extract_proxy_auth_key,
     generate_request_id,
     get_current_timestamp,
+    hash_api_key,
+    json_loads,
     setup_logging,
     validate_api_key,
 )
 
 # Initialize settings
 settings = get_settings()
-setup_logging(settings.log_level)
+log_pipeline = setup_logging(settings.log_level, settings.log_format, settings.log_queue_size)
+configure_capture(settings.capture_sample_rate, settings.capture_max_chars)
 logger = logging.getLogger(__name__)
 
+# Shared upstream connection pool, opened and closed by the application lifespan
+client_pool = UpstreamClientPool(settings)
+
+# Per-route retry policies and budgets shared by every provider
+retrier = build_retrier(settings)
+
+# Per-route hedging delays and budgets shared by every provider
+hedger = build_hedger(settings)
+
+# Global and per-route limits on in-flight /v1/messages requests
+admission = build_admission(settings)
+
+# State shared by all gunicorn workers (None keeps limits and counters per process)
+shared_state = open_shared_state(settings)
+if shared_state:
+    REGISTRY.share(shared_state.metrics)
+
+# Per-client-key request and input token rate limits
+rate_limiter = build_rate_limiter(settings, shared_state.rate_limits if shared_state else None)
+
+
+def get_upstream_client(base_url: str) -> httpx.AsyncClient:
+    """Get the pooled client for an upstream base URL."""
+    return client_pool.get_client(base_url)
+
+
+# Upstream endpoints with their balancing and circuit breaker state
+breaker_table = shared_state.breakers if shared_state else None
+upstream_pool = build_upstream_pool(
+    settings.openai_base_urls or settings.openai_base_url, settings, get_upstream_client, breaker_table
+)
+anthropic_pool = build_upstream_pool(settings.anthropic_base_url, settings, get_upstream_client, breaker_table)
+
+# Fixed API Key Mode provider, created on first use and reused by every request
+fixed_provider: Optional[OpenAIProvider] = None
+
+
+async def flush_shared_metrics(interval: float) -> None:
+    """Write buffered counter increments to the shared table every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        REGISTRY.flush()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     logger.info("🚀 Claude API Proxy starting up...")
     logger.info(f"   Server: {settings.host}:{settings.port}")
-    logger.info(f"   Target API: {settings.openai_base_url}")
+    if len(upstream_pool.upstreams) > 1:
+        logger.info(
+            f"   Target APIs: {', '.join(u.base_url for u in upstream_pool.upstreams)} "
+            f"({upstream_pool.strategy})"
+        )
+    else:
+        logger.info(f"   Target API: {settings.openai_base_url}")
     logger.info(f"   Big Model: {settings.big_model}")
     logger.info(f"   Small Model: {settings.small_model}")
     logger.info(f"   API Key Validation: {'Enabled' if settings.auth_key else 'Disabled'}")
     logger.info(f"   Mode: {'Fixed API Key' if settings.openai_api_key else 'Passthrough'}")
+    logger.info(f"   Backends: big={settings.big_model_backend}, small={settings.small_model_backend}")
+    logger.info(f"   Fast Path: {'Enabled' if settings.fast_path else 'Disabled'}")
+    logger.info(
+        f"   Retries: max={settings.retry_max_retries}, "
+        f"budget={settings.retry_budget_ratio}/request + {settings.retry_budget_min_per_second}/s"
+    )
+    if rate_limiter.enabled:
+        logger.info(
+            f"   Rate Limit per key: {settings.rate_limit_requests_per_second or 'unlimited'} req/s "
+            f"(burst {settings.rate_limit_burst:g}), "
+            f"{settings.rate_limit_tokens_per_minute or 'unlimited'} input tokens/min"
+        )
+    if shared_state:
+        logger.info(f"   Shared State: {shared_state.directory} (deployment {shared_state.tag})")
+    if admission.enabled:
+        logger.info(
+            f"   Admission Control: max={settings.max_concurrency or 'unlimited'}, "
+            f"big={settings.big_max_concurrency or 'unlimited'}, small={settings.small_max_concurrency or 'unlimited'}, "
+            f"queue={settings.queue_size}, timeout={settings.queue_timeout}s, scheduler={settings.scheduler}"
+        )
+    if hedger.windows:
+        logger.info(
+            f"   Hedging: routes={','.join(hedger.windows)}, after p{settings.hedge_quantile * 100:g} latency, "
+            f"budget={settings.hedge_budget_ratio}/request"
+        )
+    if settings.stream_coalesce_ms > 0:
+        logger.info(
+            f"   Stream Coalescing: window={settings.stream_coalesce_ms}ms, "
+            f"max={settings.stream_coalesce_bytes} bytes"
+        )
+    if settings.capture_sample_rate > 0:
+        logger.info(
+            f"   Payload Capture: rate={settings.capture_sample_rate}, "
+            f"max={settings.capture_max_chars} chars/request"
+        )
+    logger.info(
+        f"   Connection Pool: max={settings.pool_max_connections}, "
+        f"keepalive={settings.pool_max_keepalive_connections}, "
+        f"expiry={settings.pool_keepalive_expiry}s"
+    )
+    for upstream in upstream_pool.upstreams:
+        client_pool.start(upstream.base_url)
+    app.state.client_pool = client_pool
+    flusher = asyncio.ensure_future(flush_shared_metrics(settings.shared_state_flush_interval)) if shared_state else None
     yield
     logger.info("👋 Claude API Proxy shutting down...")
+    if flusher is not None:
+        flusher.cancel()
+        REGISTRY.flush()
+    await client_pool.aclose()
+    if log_pipeline is not None:
+        dropped = log_pipeline.handler.dropped
+        if dropped:
+            logger.warning(f"{dropped} log records were dropped because the log queue was full")
+        log_pipeline.stop()
 
 
 # Create FastAPI app
@@ -64,26 +190,159 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and latency histograms for /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 
 def get_provider(client_api_key: Optional[str] = None) -> OpenAIProvider:
     """Get the configured LLM provider with automatic passthrough mode."""
+    global fixed_provider
     # Simple logic: if OPENAI_API_KEY is set, use it; otherwise use client's key
     if settings.openai_api_key:
         # Use configured API key
-        api_key = settings.openai_api_key
-    else:
-        # Passthrough mode: use client's API key
-        if not client_api_key:
-            raise HTTPException(
-                status_code=500,
-                detail="No API key available. Either set OPENAI_API_KEY or provide API key in request."
-            )
-        api_key = client_api_key
+        if fixed_provider is None:
+            fixed_provider = _build_provider(settings.openai_api_key)
+        return fixed_provider
     
+    # Passthrough mode: use client's API key. Providers only hold the key and
+    # borrow the pooled client, so one is built per request rather than cached.
+    if not client_api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="No API key available. Either set OPENAI_API_KEY or provide API key in request."
+        )
+    return _build_provider(client_api_key)
+
+
+def _build_provider(api_key: str) -> OpenAIProvider:
     return OpenAIProvider(
         api_key=api_key,
         base_url=settings.openai_base_url,
-        timeout=settings.request_timeout
+        timeout=settings.request_timeout,
+        client=client_pool.get_client(settings.openai_base_url),
+        retrier=retrier,
+        upstreams=upstream_pool,
+        hedger=hedger
+    )
+
+
+def get_anthropic_provider(client_api_key: Optional[str] = None) -> AnthropicProvider:
+    """Get the Anthropic provider used by raw passthrough routes."""
+    if settings.anthropic_api_key:
+        api_key = settings.anthropic_api_key
+    elif not settings.openai_api_key and client_api_key:
+        # Passthrough mode: forward the client's own Anthropic key
+        api_key = client_api_key
+    else:
+        raise HTTPException(
+            status_code=500,
+            detail="No API key available for Anthropic route. Either set ANTHROPIC_API_KEY or use Passthrough Mode."
+        )
+    
+    return AnthropicProvider(
+        api_key=api_key,
+        timeout=settings.request_timeout,
+        base_url=settings.anthropic_base_url,
+        client=client_pool.get_client(settings.anthropic_base_url),
+        retrier=retrier,
+        upstreams=anthropic_pool,
+        hedger=hedger
+    )
+
+
+def get_route_backend(claude_model: str) -> str:
+    """Get the backend ("openai" or "anthropic") configured for a Claude model's route."""
+    if get_model_route(claude_model) == "small":
+        return settings.small_model_backend.lower()
+    return settings.big_model_backend.lower()
+
+
+# Claude model names with a fixed mapping, used as-is in metric labels for the anthropic backend
+KNOWN_CLAUDE_MODELS = frozenset(get_model_mapping())
+
+
+def get_metric_model(claude_model: str) -> str:
+    """Model label for request metrics: the upstream model, limited to known names."""
+    if get_route_backend(claude_model) == "openai":
+        return map_claude_model(claude_model)
+    return claude_model if claude_model in KNOWN_CLAUDE_MODELS else "other"
+
+
+def retry_after_headers(seconds: Optional[float]) -> Optional[Dict[str, str]]:
+    """Build a Retry-After header (whole seconds, rounded up) if a delay is known."""
+    if seconds is None:
+        return None
+    return {"Retry-After": str(math.ceil(seconds))}
+
+
+def error_response(
+    status_code: int,
+    error_type: str,
+    message: str,
+    headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    """Build a Claude-format error response."""
+    return JSONResponse(
+        status_code=status_code,
+        content={"type": "error", "error": {"type": error_type, "message": message}},
+        headers=headers
+    )
+
+
+def parse_message_body(body: bytes) -> Dict[str, Any]:
+    """Parse a /v1/messages JSON body, raising a 422 validation error if it is malformed."""
+    try:
+        payload = json_loads(body)
+    except ValueError as e:
+        raise RequestValidationError([
+            {"type": "json_invalid", "loc": ("body",), "msg": f"JSON decode error: {e}", "input": {}}
+        ])
+    if not isinstance(payload, dict) or not isinstance(payload.get("model"), str):
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body", "model"), "msg": "Field required", "input": payload}
+        ])
+    return payload
+
+
+async def passthrough_message(
+    body: bytes,
+    http_request: Request,
+    provider: AnthropicProvider,
+    stream: bool,
+    route: str = "big"
+) -> Response:
+    """Relay a request to an Anthropic-native backend byte-for-byte."""
+    upstream = await provider.send_raw(body, http_request.headers, route)
+    headers = provider.get_relay_headers(upstream)
+    media_type = headers.pop("content-type", None)
+    
+    if stream and upstream.status_code < 400:
+        headers.update({"Cache-Control": "no-cache", "Connection": "keep-alive"})
+        
+        async def relay():
+            # Closed here rather than in a background task, which Starlette skips when the client disconnects
+            try:
+                async for chunk in upstream.aiter_raw():
+                    yield chunk
+            finally:
+                await upstream.aclose()
+        
+        return StreamingResponse(
+            relay(),
+            status_code=upstream.status_code,
+            headers=headers,
+            media_type=media_type
+        )
+    
+    try:
+        content = b"".join([chunk async for chunk in upstream.aiter_raw()])
+    finally:
+        await upstream.aclose()
+    return Response(
+        content=content,
+        status_code=upstream.status_code,
+        headers=headers,
+        media_type=media_type
     )
 
 
@@ -117,14 +376,110 @@ async def validate_client_api_key(
     return client_api_key
 
 
-@app.post("/v1/messages", response_model=ClaudeMessagesResponse)
+# The handler reads the raw body, so the request schema is declared for OpenAPI by hand
+MESSAGES_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/ClaudeMessagesRequest"}}},
+    }
+}
+
+
+def messages_openapi() -> Dict[str, Any]:
+    """Generate the OpenAPI schema, adding the ClaudeMessagesRequest component /v1/messages refers to."""
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        components = schema.setdefault("components", {}).setdefault("schemas", {})
+        request_schema = ClaudeMessagesRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+        components.update(request_schema.pop("$defs", {}))
+        components["ClaudeMessagesRequest"] = request_schema
+    return app.openapi_schema
+
+
+app.openapi = messages_openapi  # type: ignore[method-assign]
+
+
+@app.post("/v1/messages", response_model=ClaudeMessagesResponse, openapi_extra=MESSAGES_REQUEST_BODY)
 async def create_message(
-    request: ClaudeMessagesRequest,
     http_request: Request,
     client_key: Optional[str] = Depends(validate_client_api_key)  # API key validation
 ):
     """Handle Claude API /v1/messages requests."""
     request_id = generate_request_id()
+    body = await http_request.body()
+    client_id = hash_api_key(client_key) if client_key else None
+    if rate_limiter.enabled:
+        try:
+            rate_limiter.acquire(client_id or "anonymous", estimate_tokens(body))
+        except RateLimitError as e:
+            logger.warning(f"Request {request_id} rate limited: {e}")
+            return error_response(429, "rate_limit_error", str(e), retry_after_headers(e.retry_after))
+    
+    payload = parse_message_body(body)
+    route = get_model_route(payload["model"])
+    http_request.state.route = route
+    http_request.state.model = get_metric_model(payload["model"])
+    http_request.state.stream = bool(payload.get("stream"))
+    if not admission.enabled:
+        return await dispatch_message(http_request, client_key, request_id, body, payload, route)
+    
+    try:
+        permit = await admission.admit(route, client_id)
+    except OverloadedError as e:
+        logger.warning(f"Request {request_id} shed: {e}")
+        return error_response(529, "overloaded_error", str(e))
+    try:
+        response = await dispatch_message(http_request, client_key, request_id, body, payload, route)
+    except BaseException:
+        permit.release()
+        raise
+    if isinstance(response, StreamingResponse):
+        # Streaming requests keep their slot until the last byte is sent
+        return ReleasingResponse(response, permit)
+    permit.release()
+    return response
+
+
+async def dispatch_message(
+    http_request: Request,
+    client_key: Optional[str],
+    request_id: str,
+    body: bytes,
+    payload: Dict[str, Any],
+    route: str
+) -> Any:
+    """Serve an admitted /v1/messages request on the backend configured for its route."""
+    if get_route_backend(payload["model"]) == "anthropic":
+        # Raw passthrough: forward the original bytes without Pydantic parsing
+        logger.info(
+            f"Processing request {request_id}: model={payload['model']}, "
+            f"stream={payload.get('stream', False)}, backend=anthropic"
+        )
+        try:
+            provider = get_anthropic_provider(client_key)
+            return await passthrough_message(body, http_request, provider, bool(payload.get("stream")), route)
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            logger.warning(f"Request {request_id} rejected: {e}")
+            raise HTTPException(status_code=503, detail=str(e), headers=retry_after_headers(e.retry_after))
+        except Exception as e:
+            logger.error(f"Request {request_id} failed: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    if settings.fast_path:
+        # Fast path: structural checks only, the converter works on the parsed dicts
+        errors = check_raw_messages_request(payload)
+        if errors:
+            raise RequestValidationError(errors)
+        request = RawMessagesRequest(payload)
+    else:
+        try:
+            request = ClaudeMessagesRequest.model_validate(payload)
+        except ValidationError as e:
+            raise RequestValidationError([
+                {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+            ])
     
     logger.info(
         f"Processing request {request_id}: model={request.model}, "
@@ -144,7 +499,21 @@ async def create_message(
             # The provider will be closed when the generator is exhausted
             async def stream_with_cleanup():
                 async with provider:
-                    async for chunk in provider.stream_complete(request, request_id):
+                    events = provider.stream_complete(request, request_id)
+                    if settings.stream_coalesce_ms > 0:
+                        events = coalesce_deltas(
+                            events,
+                            settings.stream_coalesce_ms / 1000,
+                            settings.stream_coalesce_bytes
+                        )
+                    if settings.disconnect_check_interval > 0:
+                        events = watch_disconnect(
+                            events,
+                            http_request.is_disconnected,
+                            settings.disconnect_check_interval,
+                            request_id
+                        )
+                    async for chunk in events:
                         yield chunk
             
             return StreamingResponse(
@@ -166,6 +535,12 @@ async def create_message(
     
     except HTTPException:
         raise
+    except UpstreamError as e:
+        logger.error(f"Request {request_id} failed: upstream returned {e.status_code}: {e}")
+        raise HTTPException(status_code=e.client_status_code, detail=str(e), headers=retry_after_headers(e.retry_after))
+    except CircuitOpenError as e:
+        logger.warning(f"Request {request_id} rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_headers(e.retry_after))
     except Exception as e:
         logger.error(f"Request {request_id} failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -223,10 +598,25 @@ async def health_check():
             "big_model": settings.big_model,
             "small_model": settings.small_model,
             "max_tokens_limit": settings.max_tokens_limit,
-        }
+        },
+        "pool": client_pool.stats(),
+        "retry": retrier.stats(),
+        "hedge": hedger.stats(),
+        "admission": admission.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "upstreams": {"openai": upstream_pool.stats(), "anthropic": anthropic_pool.stats()},
+        "logging": log_pipeline.stats() if log_pipeline else {"queue_size": 0},
+        "shared_state": shared_state.stats() if shared_state else None,
+        "metrics": REGISTRY.snapshot(),
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/test-connection") 
 async def test_connection():
     """Test connectivity to the target API."""
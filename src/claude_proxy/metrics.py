@@ -0,0 +1,300 @@
+"""In-process metrics for Claude API Proxy.
+
+Counters can be backed by a ``SharedTable`` (see ``shared.py``) so that the
+values reported by any gunicorn worker are the totals of all workers. Gauges
+and histograms describe the worker that reports them and stay in-process.
+
+Recording takes no lock: every metric is recorded from the event loop thread,
+and readers copy values in a single step, so observing a latency on the
+per-token path costs a bucket search and two list updates. Shared counters
+buffer their increments and write them to the table in one locked update per
+label combination when ``MetricsRegistry.flush`` runs (periodically, and
+before this worker reports), so other workers' counts lag by at most one
+flush interval.
+"""
+
+import math
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .shared import SharedTable
+
+LabelValues = Tuple[str, ...]
+
+# Separates the metric name and label values in shared table keys
+_KEY_SEPARATOR = "\x1f"
+
+# Upper bounds in seconds for latency histograms, from sub-millisecond conversion to long completions
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if not math.isfinite(value):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """Labelled metric values, keyed by label values in declaration order."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        """Initialize an empty metric."""
+        self.name = name
+        self.description = description
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames) or not all(name in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels: str) -> float:
+        """Current value for ``labels`` (0 if never set)."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        """All label combinations and their values."""
+        return list(self._values.items())
+
+    def exposition(self) -> Iterator[str]:
+        """Sample lines in the Prometheus text format."""
+        for key, value in self.samples():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        """Initialize an empty, in-process counter."""
+        super().__init__(name, description, labelnames)
+        self.shared: Optional["SharedTable"] = None
+        # Increments not yet written to the shared table
+        self._pending: Dict[LabelValues, float] = {}
+
+    def _shared_key(self, key: LabelValues) -> str:
+        return _KEY_SEPARATOR.join((self.name,) + key)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the counter for ``labels`` by ``amount``."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+        if self.shared is not None:
+            self._pending[key] = self._pending.get(key, 0.0) + amount
+
+    def flush(self) -> None:
+        """Add the buffered increments to the shared table."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        if self.shared is None:
+            return
+        for key, amount in pending.items():
+            try:
+                self.shared.update(
+                    self._shared_key(key),
+                    lambda record, amount=amount: ((record[0] + amount if record else amount,), None),
+                )
+            except (ValueError, OverflowError):
+                # Key too long or table full: this label combination stays per worker
+                pass
+
+    def value(self, **labels: str) -> float:
+        """Current value for ``labels`` (0 if never set), summed across workers when shared."""
+        key = self._key(labels)
+        if self.shared is not None:
+            self.flush()
+            try:
+                record = self.shared.get(self._shared_key(key))
+            except ValueError:
+                record = None
+            if record is not None:
+                return record[0]
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        """All label combinations and their values, summed across workers when shared."""
+        values = dict(self._values)
+        if self.shared is not None:
+            self.flush()
+            prefix = self.name + _KEY_SEPARATOR
+            for shared_key, record in self.shared.items():
+                if shared_key.startswith(prefix):
+                    values[tuple(shared_key[len(prefix):].split(_KEY_SEPARATOR))] = record[0]
+                elif shared_key == self.name and not self.labelnames:
+                    values[()] = record[0]
+        return list(values.items())
+
+
+class Gauge(Metric):
+    """Value that can go up and down, with optional labels."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for ``labels``."""
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        """Initialize an empty histogram with upper bucket bounds ``buckets`` (+Inf is implied)."""
+        super().__init__(name, description, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(bound for bound in buckets if bound != math.inf))
+        # Per label combination: a count per bucket, the +Inf bucket, then the sum
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation of ``value`` for ``labels``."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, **labels: str) -> float:
+        """Number of observations for ``labels``."""
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0.0
+
+    def sum(self, **labels: str) -> float:
+        """Sum of the observations for ``labels``."""
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def value(self, **labels: str) -> float:
+        """Number of observations for ``labels``."""
+        return self.count(**labels)
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        """All label combinations and their observation counts."""
+        return [(key, sum(series[:-1])) for key, series in list(self._series.items())]
+
+    def exposition(self) -> Iterator[str]:
+        """Bucket, sum and count lines in the Prometheus text format."""
+        names = self.labelnames + ("le",)
+        for key, series in list(self._series.items()):
+            series = list(series)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+
+class MetricsRegistry:
+    """Collection of named metrics."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._shared: Optional["SharedTable"] = None
+
+    def _get_or_create(
+        self, cls: type, name: str, description: str, labelnames: Iterable[str], **options: Any
+    ) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, description, labelnames, **options)
+            if isinstance(metric, Counter):
+                metric.shared = self._shared
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Get or create the counter ``name``."""
+        return self._get_or_create(Counter, name, description, labelnames)  # type: ignore[return-value]
+
+    def gauge(self, name: str, description: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Get or create the gauge ``name``."""
+        return self._get_or_create(Gauge, name, description, labelnames)  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create the histogram ``name``."""
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)  # type: ignore[return-value]
+
+    def share(self, table: Optional["SharedTable"]) -> None:
+        """Back every counter, present and future, by ``table`` (None makes them in-process again)."""
+        self.flush()
+        self._shared = table
+        for metric in self._metrics.values():
+            if isinstance(metric, Counter):
+                metric.shared = table
+
+    def flush(self) -> None:
+        """Write the buffered increments of every shared counter to the shared table."""
+        for metric in list(self._metrics.values()):
+            if isinstance(metric, Counter):
+                metric.flush()
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {_escape(metric.description, quote=False)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return ``{metric: {"label=value,...": value}}`` for the health endpoint."""
+        result: Dict[str, Dict[str, float]] = {}
+        for name, metric in self._metrics.items():
+            result[name] = {
+                ",".join(f"{label}={value}" for label, value in zip(metric.labelnames, key)): value
+                for key, value in metric.samples()
+            }
+        return result
+
+
+# Global registry
+REGISTRY = MetricsRegistry()
+
+STREAM_CANCELLATIONS = REGISTRY.counter(
+    "claude_proxy_stream_cancellations_total",
+    "Streaming responses whose upstream request was cancelled before completion",
+    ("reason",),
+)
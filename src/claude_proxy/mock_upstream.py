@@ -0,0 +1,278 @@
+"""Configurable OpenAI-compatible mock upstream for Claude API Proxy.
+
+Serves ``POST .../chat/completions`` with synthetic completions, so proxy
+throughput and streaming overhead can be measured reproducibly without
+network access or an API key. It is a raw ASGI app, so it runs under uvicorn
+(the ``claude-proxy-mock`` command) or under Hypercorn for cleartext HTTP/2:
+
+    claude-proxy-mock --port 9000 --ttft 0.3 --tokens-per-second 80
+    hypercorn claude_proxy.mock_upstream:app --bind 127.0.0.1:9000
+
+Behaviour is set with ``MOCK_*`` environment variables (see ``MockSettings``)
+or the matching command line options:
+
+- Timing: latency before the response headers, time to first token after
+  them, then ``chunks`` content chunks at ``tokens_per_second`` (or one every
+  ``chunk_delay`` seconds). Non-streaming responses are sent after the latency
+  and time to first token.
+- Shape: ``chunk_tokens`` tokens per chunk; requests that declare tools get
+  ``tool_calls`` streamed tool calls after the text, with their arguments
+  split over several chunks, and finish with ``tool_calls``.
+- Errors: a fraction of requests fail with ``error_status`` before any
+  output, and a fraction of streams are cut off halfway without ``[DONE]``.
+- Usage: prompt tokens are estimated from the request size and reported with
+  the completion tokens on the final chunk.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:
+    from pydantic import BaseSettings
+from pydantic import Field
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class MockSettings(BaseSettings):
+    """Mock upstream behaviour with environment variable support."""
+
+    # Timing
+    latency: float = Field(default=0.0, description="Seconds before the response headers are sent", alias="MOCK_LATENCY")
+    ttft: float = Field(default=0.0, description="Seconds after the headers before the first content token", alias="MOCK_TTFT")
+    chunks: int = Field(default=50, description="Streamed content chunks per response", alias="MOCK_CHUNKS")
+    chunk_delay: float = Field(default=0.002, description="Seconds between chunks when tokens_per_second is 0", alias="MOCK_CHUNK_DELAY")
+    tokens_per_second: float = Field(default=0.0, description="Output rate; overrides chunk_delay when set", alias="MOCK_TOKENS_PER_SECOND")
+
+    # Response shape
+    chunk_tokens: int = Field(default=1, description="Tokens of text per content chunk", alias="MOCK_CHUNK_TOKENS")
+    tool_calls: int = Field(default=0, description="Tool calls returned to requests that declare tools", alias="MOCK_TOOL_CALLS")
+    tool_argument_bytes: int = Field(default=256, description="Size of each tool call's JSON arguments", alias="MOCK_TOOL_ARGUMENT_BYTES")
+    usage: bool = Field(default=True, description="Report token usage on the final chunk", alias="MOCK_USAGE")
+
+    # Load and error injection
+    concurrency: int = Field(default=0, description="Requests served at once, the rest queue (0 is unlimited)", alias="MOCK_CONCURRENCY")
+    stall_rate: float = Field(default=0.0, description="Fraction of requests that stall before responding", alias="MOCK_STALL_RATE")
+    stall_latency: float = Field(default=1.0, description="Seconds a stalled request waits, on top of latency", alias="MOCK_STALL_LATENCY")
+    error_rate: float = Field(default=0.0, description="Fraction of requests answered with error_status", alias="MOCK_ERROR_RATE")
+    error_status: int = Field(default=500, description="HTTP status of injected errors", alias="MOCK_ERROR_STATUS")
+    retry_after: Optional[float] = Field(default=None, description="Retry-After seconds sent with injected errors", alias="MOCK_RETRY_AFTER")
+    drop_rate: float = Field(default=0.0, description="Fraction of streams cut off halfway", alias="MOCK_DROP_RATE")
+    seed: Optional[int] = Field(default=None, description="Random seed for stalls and injected errors", alias="MOCK_SEED")
+
+    model_config = {"case_sensitive": False, "extra": "ignore", "populate_by_name": True}
+
+    @property
+    def token_interval(self) -> float:
+        """Seconds between content chunks."""
+        if self.tokens_per_second > 0:
+            return self.chunk_tokens / self.tokens_per_second
+        return self.chunk_delay
+
+
+class MockUpstream:
+    """ASGI app answering chat completion requests as configured."""
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        """Initialize from ``settings`` (read from the environment by default)."""
+        self.settings = settings or MockSettings()
+        self.random = random.Random(self.settings.seed)
+        self.requests = 0
+        # Created on first use, inside the server's event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        body = await _read_body(receive)
+        if scope["method"] != "POST" or not scope["path"].endswith("/chat/completions"):
+            await _send_json(send, 404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        self.requests += 1
+        request = json.loads(body or b"{}")
+        if not self.settings.concurrency:
+            await self._respond(request, len(body), send)
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings.concurrency)
+        async with self._slots:
+            await self._respond(request, len(body), send)
+
+    def _tool_calls(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        tools = request.get("tools") or []
+        if not tools or not self.settings.tool_calls:
+            return []
+        calls = []
+        for index in range(self.settings.tool_calls):
+            function = tools[index % len(tools)].get("function", {})
+            arguments = json.dumps({
+                "path": f"src/module_{index}.py",
+                "content": "x" * max(self.settings.tool_argument_bytes - 40, 0),
+            })
+            calls.append({
+                "id": f"call_mock_{index}",
+                "type": "function",
+                "function": {"name": function.get("name", "tool"), "arguments": arguments},
+            })
+        return calls
+
+    async def _respond(self, request: Dict[str, Any], request_bytes: int, send: Send) -> None:
+        settings = self.settings
+        if settings.latency:
+            await asyncio.sleep(settings.latency)
+        if settings.stall_rate and self.random.random() < settings.stall_rate:
+            await asyncio.sleep(settings.stall_latency)
+        if settings.error_rate and self.random.random() < settings.error_rate:
+            headers = {"retry-after": f"{settings.retry_after:g}"} if settings.retry_after is not None else {}
+            await _send_json(send, settings.error_status, {
+                "error": {"message": "Injected mock upstream error", "type": "server_error"},
+            }, headers)
+            return
+
+        model = request.get("model", "mock-model")
+        text = "token " * settings.chunk_tokens
+        tool_calls = self._tool_calls(request)
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        prompt_tokens = max(1, request_bytes // 4)
+        completion_tokens = settings.chunks * settings.chunk_tokens + sum(
+            len(call["function"]["arguments"]) // 4 for call in tool_calls
+        )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if not request.get("stream"):
+            if settings.ttft:
+                await asyncio.sleep(settings.ttft)
+            message: Dict[str, Any] = {"role": "assistant", "content": text * settings.chunks}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            response: Dict[str, Any] = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            }
+            if settings.usage:
+                response["usage"] = usage
+            await _send_json(send, 200, response)
+            return
+
+        # Role chunk, then text chunks, then each tool call's name and argument pieces
+        deltas: List[Dict[str, Any]] = [{"content": text} for _ in range(settings.chunks)]
+        piece = 16 * settings.chunk_tokens
+        for index, call in enumerate(tool_calls):
+            deltas.append({"tool_calls": [{
+                "index": index, "id": call["id"], "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": ""},
+            }]})
+            arguments = call["function"]["arguments"]
+            for start in range(0, len(arguments), piece):
+                deltas.append({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + piece]}}]})
+        drop_at = len(deltas) // 2 if settings.drop_rate and self.random.random() < settings.drop_rate else None
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream")],
+        })
+        await _send_chunk(send, _chunk(model, {"role": "assistant", "content": ""}))
+        loop = asyncio.get_running_loop()
+        interval = settings.token_interval
+        first_token_at = loop.time() + settings.ttft
+        for index, delta in enumerate(deltas):
+            if index == drop_at:
+                raise ConnectionAbortedError("Mock upstream dropped the stream")
+            # Paced against a fixed schedule so timer overshoot does not lower the rate
+            delay = first_token_at + index * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await _send_chunk(send, _chunk(model, delta))
+        await _send_chunk(send, _chunk(model, {}, finish_reason, usage if settings.usage else None))
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+
+def _chunk(
+    model: str,
+    delta: Dict[str, Any],
+    finish_reason: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None,
+) -> bytes:
+    payload: Dict[str, Any] = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return b"data: " + json.dumps(payload).encode() + b"\n\n"
+
+
+async def _send_chunk(send: Send, body: bytes) -> None:
+    await send({"type": "http.response.body", "body": body, "more_body": True})
+
+
+async def _send_json(send: Send, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+    raw_headers = [(b"content-type", b"application/json")]
+    raw_headers += [(name.encode(), value.encode()) for name, value in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+# Default app, configured from MOCK_* environment variables
+app = MockUpstream()
+
+
+def main() -> None:
+    """Run the mock upstream under uvicorn; options override ``MOCK_*`` environment variables."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock upstream for benchmarking Claude API Proxy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    for name, field in MockSettings.model_fields.items():
+        option = "--" + name.replace("_", "-")
+        if field.annotation is bool:
+            parser.add_argument(option, dest=name, action=argparse.BooleanOptionalAction, help=field.description)
+        else:
+            kind = int if field.annotation in (int, Optional[int]) else float
+            parser.add_argument(option, dest=name, type=kind, help=field.description)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    settings = MockSettings(**{name: value for name, value in args.items() if value is not None})
+
+    print(f"Mock upstream at http://{host}:{port}/v1/chat/completions")
+    uvicorn.run(MockUpstream(settings), host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ __all__ = [
     "ClaudeMessagesRequest", 
     "ClaudeMessagesResponse",
     "ClaudeTokenCountRequest",
+    "RawMessagesRequest",
+    "MessagesRequest",
+    "check_raw_messages_request",
     
     # OpenAI models
     "OpenAIMessage",
@@ -1,6 +1,6 @@
 """Claude API data models."""
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 
 
@@ -96,4 +96,154 @@ class ClaudeStreamEvent(BaseModel):
     delta: Optional[Dict[str, Any]] = None
     content_block: Optional[Dict[str, Any]] = None
     message: Optional[Dict[str, Any]] = None
-    usage: Optional[ClaudeUsage] = None
\ No newline at end of file
+    usage: Optional[ClaudeUsage] = None
+
+
+class RawMessagesRequest:
+    """Claude /v1/messages request backed directly by the parsed JSON body.
+    
+    Used by the fast path to skip Pydantic model construction. It exposes the same
+    attributes as ``ClaudeMessagesRequest``, but messages and content blocks stay
+    plain dicts. Build it only from bodies that passed ``check_raw_messages_request``.
+    """
+    
+    __slots__ = ("data",)
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+    
+    @property
+    def model(self) -> str:
+        return self.data["model"]
+    
+    @property
+    def max_tokens(self) -> int:
+        return self.data["max_tokens"]
+    
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        return self.data["messages"]
+    
+    @property
+    def system(self) -> Optional[Union[str, List[Dict[str, Any]]]]:
+        return self.data.get("system")
+    
+    @property
+    def temperature(self) -> Optional[float]:
+        return self.data.get("temperature")
+    
+    @property
+    def top_p(self) -> Optional[float]:
+        return self.data.get("top_p")
+    
+    @property
+    def top_k(self) -> Optional[int]:
+        return self.data.get("top_k")
+    
+    @property
+    def stream(self) -> bool:
+        return bool(self.data.get("stream"))
+    
+    @property
+    def stop_sequences(self) -> Optional[List[str]]:
+        return self.data.get("stop_sequences")
+    
+    @property
+    def tools(self) -> Optional[List[Dict[str, Any]]]:
+        return self.data.get("tools")
+    
+    @property
+    def tool_choice(self) -> Optional[Dict[str, Any]]:
+        return self.data.get("tool_choice")
+    
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return the underlying request dict (no copy)."""
+        return self.data
+
+
+# Either request representation accepted by providers
+MessagesRequest = Union[ClaudeMessagesRequest, RawMessagesRequest]
+
+
+def _error(loc: tuple, msg: str, value: Any, error_type: str = "value_error") -> Dict[str, Any]:
+    return {"type": error_type, "loc": ("body", *loc), "msg": msg, "input": value}
+
+
+# Fields the converter reads from each known content block type, with their accepted types
+# (a field that accepts None may be missing); mirrors the content block models above
+_NONE = type(None)
+_BLOCK_FIELDS: Dict[str, Tuple[Tuple[str, tuple], ...]] = {
+    "text": (("text", (str,)),),
+    "image": (("source", (dict,)),),
+    "tool_use": (("id", (str,)), ("name", (str,)), ("input", (dict,))),
+    "tool_result": (("tool_use_id", (str,)), ("content", (_NONE, str, list)), ("is_error", (_NONE, bool))),
+}
+
+
+def _check_block(block: Any, loc: tuple, errors: List[Dict[str, Any]]) -> None:
+    if not isinstance(block, dict) or not isinstance(block.get("type"), str):
+        errors.append(_error(loc, "Content block must be an object with a string type", block))
+        return
+    for name, types in _BLOCK_FIELDS.get(block["type"], ()):
+        value = block.get(name)
+        if not isinstance(value, types):
+            errors.append(_error((*loc, name), f"Invalid {name!r} for a {block['type']} block", value))
+    content = block.get("content")
+    if block["type"] == "tool_result" and isinstance(content, list):
+        for k, item in enumerate(content):
+            if not isinstance(item, dict):
+                errors.append(_error((*loc, "content", k), "Tool result content must be a list of objects", item))
+
+
+def check_raw_messages_request(data: Any) -> List[Dict[str, Any]]:
+    """Lightweight structural validation of a raw /v1/messages body.
+    
+    Checks the shapes the converter relies on, including the fields it reads from
+    each known content block type, without building models or copying payloads
+    (tool result text and tool inputs are type-checked, never walked). Returns a
+    list of errors in FastAPI's validation error format; an empty list means valid.
+    """
+    if not isinstance(data, dict):
+        return [_error((), "Input should be a valid dictionary", data, "dict_type")]
+    
+    errors = []
+    if not isinstance(data.get("model"), str):
+        errors.append(_error(("model",), "Input should be a valid string", data.get("model"), "string_type"))
+    max_tokens = data.get("max_tokens")
+    if not isinstance(max_tokens, int) or isinstance(max_tokens, bool):
+        errors.append(_error(("max_tokens",), "Input should be a valid integer", max_tokens, "int_type"))
+    
+    messages = data.get("messages")
+    if not isinstance(messages, list):
+        errors.append(_error(("messages",), "Input should be a valid list", messages, "list_type"))
+        messages = []
+    for i, message in enumerate(messages):
+        if not isinstance(message, dict) or not isinstance(message.get("role"), str):
+            errors.append(_error(("messages", i), "Message must be an object with a string role", message))
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            continue
+        if not isinstance(content, list):
+            errors.append(_error(("messages", i, "content"), "Content must be a string or a list of blocks", content))
+            continue
+        for j, block in enumerate(content):
+            _check_block(block, ("messages", i, "content", j), errors)
+    
+    system = data.get("system")
+    if system is not None and not isinstance(system, (str, list)):
+        errors.append(_error(("system",), "System must be a string or a list of blocks", system))
+    for name in ("temperature", "top_p"):
+        value = data.get(name)
+        if value is not None and (
+            not isinstance(value, (int, float)) or isinstance(value, bool) or not 0.0 <= value <= 1.0
+        ):
+            errors.append(_error((name,), "Input should be a number between 0 and 1", value))
+    for name, expected in (("stream", bool), ("stop_sequences", list), ("tools", list), ("tool_choice", dict)):
+        value = data.get(name)
+        if value is not None and not isinstance(value, expected):
+            errors.append(_error((name,), f"Input should be a valid {expected.__name__}", value))
+    stop_sequences = data.get("stop_sequences")
+    if isinstance(stop_sequences, list) and not all(isinstance(stop, str) for stop in stop_sequences):
+        errors.append(_error(("stop_sequences",), "Stop sequences must be strings", stop_sequences))
+    return errors
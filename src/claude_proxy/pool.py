@@ -0,0 +1,241 @@
+"""Shared upstream HTTP connection pool for Claude API Proxy."""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import Settings
+from .telemetry import trace_connect
+
+try:
+    import h2  # noqa: F401  (optional, enables HTTP/2 upstream transport)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body stream that runs a callback exactly once when closed or done iterating."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            # Iteration ended or was abandoned: release even if aclose() is never awaited
+            self._release()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+
+class StreamLimitedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper capping concurrent in-flight requests to one upstream host.
+
+    The cap covers every request sent through the wrapped transport, so it bounds
+    the streams multiplexed over all of the host's HTTP/2 connections together.
+    A slot is held until the response body is closed, so long-running streaming
+    completions count against the limit for their whole duration. Requests
+    waiting for a slot give up after the request's pool timeout with
+    ``httpx.PoolTimeout``, like requests waiting for a pooled connection.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_streams: int):
+        self._transport = transport
+        self.max_streams = max_streams
+        self._semaphore = asyncio.Semaphore(max_streams)
+        self._active = 0
+
+    @property
+    def _pool(self) -> Any:
+        """Expose the wrapped connection pool for statistics."""
+        return getattr(self._transport, "_pool", None)
+
+    @property
+    def active_streams(self) -> int:
+        """Number of streams currently holding a slot."""
+        return self._active
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    async def _wait_for_slot(self, request: httpx.Request) -> None:
+        """Acquire a slot within the request's pool timeout, or raise ``httpx.PoolTimeout``."""
+        timeout = request.extensions.get("timeout", {}).get("pool")
+        # A separate task rather than wait_for, which can drop a slot granted as the timeout expires
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait((acquire,), timeout=timeout)
+        except BaseException:
+            acquire.cancel()
+            if acquire.done() and not acquire.cancelled():
+                self._semaphore.release()
+            raise
+        if not acquire.done():
+            acquire.cancel()
+            raise httpx.PoolTimeout(
+                f"No stream slot freed up within {timeout}s ({self.max_streams} streams in flight)",
+                request=request,
+            )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._semaphore.locked():
+            await self._wait_for_slot(request)
+        else:
+            await self._semaphore.acquire()
+        self._active += 1
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        if response.is_closed:
+            # Body was already buffered by the transport; nothing left in flight
+            self._release()
+            return response
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class UpstreamClientPool:
+    """Process-wide pool of ``httpx.AsyncClient`` instances, one per upstream host.
+
+    Every provider borrows its client from here instead of opening a new one per
+    request, so TCP/TLS connections to the upstream are kept alive and reused.
+    Connection limits apply per upstream host because each host gets its own client.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the pool from application settings."""
+        self.settings = settings
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._requests: Dict[str, int] = {}
+        self.http2 = settings.http2 and HTTP2_AVAILABLE
+        if settings.http2 and not HTTP2_AVAILABLE:
+            logger.warning(
+                "CLAUDE_PROXY_HTTP2 is enabled but the 'h2' package is not installed. "
+                "Install claude-proxy[http2] to use HTTP/2; falling back to HTTP/1.1."
+            )
+
+    @staticmethod
+    def host_key(base_url: str) -> str:
+        """Return the pool key (scheme://host:port) for an upstream URL."""
+        parts = urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _build_limits(self) -> httpx.Limits:
+        """Build connection limits from settings."""
+        return httpx.Limits(
+            max_connections=self.settings.pool_max_connections,
+            max_keepalive_connections=self.settings.pool_max_keepalive_connections,
+            keepalive_expiry=self.settings.pool_keepalive_expiry,
+        )
+
+    def _build_http2_transport(self) -> httpx.AsyncBaseTransport:
+        """Build a multiplexed HTTP/2 transport with a per-host stream cap."""
+        transport = httpx.AsyncHTTPTransport(
+            http1=not self.settings.http2_prior_knowledge,
+            http2=True,
+            limits=self._build_limits(),
+        )
+        return StreamLimitedTransport(transport, self.settings.http2_max_concurrent_streams)
+
+    def _create_client(self, key: str) -> httpx.AsyncClient:
+        """Create a pooled client for one upstream host."""
+        async def count_request(request: httpx.Request) -> None:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            trace_connect(request, key)
+
+        logger.debug(f"Creating pooled upstream client for {key} (http2={self.http2})")
+        if self.http2:
+            return httpx.AsyncClient(
+                timeout=httpx.Timeout(self.settings.request_timeout),
+                transport=self._build_http2_transport(),
+                event_hooks={"request": [count_request]},
+            )
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.settings.request_timeout),
+            limits=self._build_limits(),
+            event_hooks={"request": [count_request]},
+        )
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get the shared client for ``base_url``, creating it on first use."""
+        key = self.host_key(base_url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._create_client(key)
+            self._clients[key] = client
+        return client
+
+    def start(self, base_url: str) -> None:
+        """Warm the pool for the default upstream at application startup."""
+        self.get_client(base_url)
+
+    async def aclose(self) -> None:
+        """Close every pooled client."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    @staticmethod
+    def _connection_stats(client: httpx.AsyncClient) -> Dict[str, int]:
+        """Inspect the transport's connection pool (best effort, httpcore internals)."""
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return {}
+        idle = sum(1 for conn in connections if conn.is_idle())
+        stats = {
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+        }
+        transport = client._transport
+        if isinstance(transport, StreamLimitedTransport):
+            stats["active_streams"] = transport.active_streams
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool statistics for the health endpoint."""
+        hosts: Dict[str, Any] = {}
+        for key, client in self._clients.items():
+            hosts[key] = {
+                "requests": self._requests.get(key, 0),
+                **self._connection_stats(client),
+            }
+        limits: Dict[str, Any] = {
+            "max_connections_per_host": self.settings.pool_max_connections,
+            "max_keepalive_connections_per_host": self.settings.pool_max_keepalive_connections,
+            "keepalive_expiry": self.settings.pool_keepalive_expiry,
+        }
+        if self.http2:
+            limits["http2_max_concurrent_streams"] = self.settings.http2_max_concurrent_streams
+        return {
+            "http2": self.http2,
+            "limits": limits,
+            "hosts": hosts,
+        }
+
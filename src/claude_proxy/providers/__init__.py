@@ -1,7 +1,7 @@
 """LLM providers for Claude API Proxy."""
 
-from .base import BaseProvider
+from .base import BaseProvider, UpstreamError
 from .openai import OpenAIProvider  
 from .anthropic import AnthropicProvider
 
-__all__ = ["BaseProvider", "OpenAIProvider", "AnthropicProvider"]
\ No newline at end of file
+__all__ = ["BaseProvider", "OpenAIProvider", "AnthropicProvider", "UpstreamError"]
\ No newline at end of file
@@ -1,24 +1,48 @@
 """Anthropic provider implementation (pass-through adapter)."""
 
-import json
-from typing import Any, AsyncGenerator, Dict
+from typing import Any, AsyncGenerator, Dict, Mapping, Optional
 
 import httpx
 
+from .. import sse
+from ..breaker import CircuitOpenError
+from ..hedge import Hedger
 from ..models.claude import ClaudeMessagesRequest, ClaudeMessagesResponse
+from ..retry import Retrier
+from ..upstream import UpstreamPool
 
-from .base import BaseProvider
+from .base import ERROR_TYPES, BaseProvider, UpstreamError
+
+
+# Client headers forwarded verbatim to the upstream in raw passthrough mode
+PASSTHROUGH_HEADERS = ("anthropic-version", "anthropic-beta")
+
+# Upstream response headers relayed back to the client in raw passthrough mode
+RELAY_HEADERS = ("content-type", "content-encoding", "request-id", "retry-after")
 
 
 class AnthropicProvider(BaseProvider):
     """Anthropic API provider (direct pass-through)."""
     
-    def __init__(self, api_key: str, timeout: int = 90):
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 90,
+        base_url: str = "https://api.anthropic.com",
+        client: Optional[httpx.AsyncClient] = None,
+        retrier: Optional[Retrier] = None,
+        upstreams: Optional[UpstreamPool] = None,
+        hedger: Optional[Hedger] = None
+    ):
         """Initialize Anthropic provider."""
         super().__init__(
             api_key=api_key,
-            base_url="https://api.anthropic.com",
-            timeout=timeout
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            client=client,
+            retrier=retrier,
+            upstreams=upstreams,
+            hedger=hedger
         )
     
     def convert_request(self, request: ClaudeMessagesRequest) -> Dict[str, Any]:
@@ -43,6 +67,42 @@ class AnthropicProvider(BaseProvider):
             "User-Agent": "claude-proxy/0.1.0"
         }
     
+    def get_passthrough_headers(self, client_headers: Mapping[str, str]) -> Dict[str, str]:
+        """Get upstream headers for raw passthrough, keeping the client's API version/betas."""
+        headers = self.get_headers()
+        for name in PASSTHROUGH_HEADERS:
+            if value := client_headers.get(name):
+                headers[name] = value
+        return headers
+    
+    @staticmethod
+    def get_relay_headers(response: httpx.Response) -> Dict[str, str]:
+        """Get the upstream response headers to relay to the client."""
+        return {
+            name: response.headers[name]
+            for name in RELAY_HEADERS
+            if name in response.headers
+        }
+    
+    async def send_raw(
+        self,
+        body: bytes,
+        client_headers: Mapping[str, str],
+        route: str = "big"
+    ) -> httpx.Response:
+        """Forward a raw /v1/messages request body and return the unread upstream response.
+        
+        The request body is sent unchanged and the response is opened in streaming mode,
+        so callers relay the upstream bytes with ``aiter_raw()`` (no decoding, no
+        SSE line re-splitting) and must close it with ``aclose()``. Retryable
+        failures are retried per ``route`` before the response is returned.
+        """
+        headers = self.get_passthrough_headers(client_headers)
+        return await self.send(route, lambda base_url, client: client.send(
+            client.build_request("POST", f"{base_url}/v1/messages", content=body, headers=headers),
+            stream=True
+        ))
+    
     async def complete(
         self, 
         request: ClaudeMessagesRequest,
@@ -52,18 +112,20 @@ class AnthropicProvider(BaseProvider):
         anthropic_request = self.convert_request(request)
         
         try:
-            response = await self.client.post(
-                f"{self.base_url}/v1/messages",
+            response = await self.send(self.get_model_route(request.model), lambda base_url, client: client.post(
+                f"{base_url}/v1/messages",
                 json=anthropic_request,
                 headers=self.get_headers()
-            )
+            ), hedge=True)
             response.raise_for_status()
             response_data = response.json()
             return self.convert_response(response_data, request)
             
         except httpx.HTTPStatusError as e:
             error_msg = self.classify_error(str(e), e.response.status_code)
-            raise Exception(error_msg) from e
+            raise UpstreamError.from_response(error_msg, e.response) from e
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_msg = self.classify_error(str(e))
             raise Exception(error_msg) from e
@@ -72,17 +134,16 @@ class AnthropicProvider(BaseProvider):
         self, 
         request: ClaudeMessagesRequest,
         request_id: str
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """Stream a completion request."""
         anthropic_request = self.convert_request(request)
         anthropic_request["stream"] = True
         
         try:
-            async with self.client.stream(
-                "POST",
-                f"{self.base_url}/v1/messages",
-                json=anthropic_request,
-                headers=self.get_headers()
+            async with self.open_stream(
+                self.get_model_route(request.model),
+                "/v1/messages",
+                anthropic_request
             ) as response:
                 response.raise_for_status()
                 
@@ -90,28 +151,16 @@ class AnthropicProvider(BaseProvider):
                     if line.startswith("data: "):
                         data = line[6:]  # Remove "data: " prefix
                         if data.strip():
-                            yield f"data: {data}\n\n"
+                            yield f"data: {data}\n\n".encode("utf-8")
                     elif line.startswith("event: "):
                         event = line[7:]  # Remove "event: " prefix
-                        yield f"event: {event}\n"
+                        yield f"event: {event}\n".encode("utf-8")
                         
         except httpx.HTTPStatusError as e:
             error_msg = self.classify_error(str(e), e.response.status_code)
-            error_event = {
-                "type": "error",
-                "error": {
-                    "type": "api_error",
-                    "message": error_msg
-                }
-            }
-            yield f"event: error\ndata: {json.dumps(error_event)}\n\n"
+            yield sse.error_event(error_msg, ERROR_TYPES.get(e.response.status_code, "api_error"))
+        except CircuitOpenError as e:
+            yield sse.error_event(str(e), "overloaded_error")
         except Exception as e:
             error_msg = self.classify_error(str(e))
-            error_event = {
-                "type": "error",
-                "error": {
-                    "type": "api_error",
-                    "message": error_msg
-                }
-            }
-            yield f"event: error\ndata: {json.dumps(error_event)}\n\n"
\ No newline at end of file
+            yield sse.error_event(error_msg)
\ No newline at end of file
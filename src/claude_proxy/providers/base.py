@@ -1,11 +1,55 @@
 """Base provider class for LLM providers."""
 
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Collection, Dict, Optional, Set
 
 import httpx
 
-from ..models.claude import ClaudeMessagesRequest, ClaudeMessagesResponse
+from ..hedge import Hedger
+from ..models.claude import ClaudeMessagesResponse, MessagesRequest
+from ..retry import Retrier, parse_retry_after
+from ..upstream import UpstreamPool
+
+# Sends one attempt of an upstream request to ``base_url`` with ``client``
+UpstreamSend = Callable[[str, httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+# Anthropic API error types by HTTP status
+ERROR_TYPES = {
+    400: "invalid_request_error",
+    401: "authentication_error",
+    403: "permission_error",
+    404: "not_found_error",
+    413: "request_too_large",
+    429: "rate_limit_error",
+    529: "overloaded_error",
+}
+
+
+class UpstreamError(Exception):
+    """Upstream request failed with an HTTP error status."""
+    
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        """Initialize with the upstream status and its Retry-After hint (seconds)."""
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @classmethod
+    def from_response(cls, message: str, response: httpx.Response) -> "UpstreamError":
+        """Build the error for an upstream error response."""
+        return cls(message, response.status_code, parse_retry_after(response.headers))
+    
+    @property
+    def client_status_code(self) -> int:
+        """Status code to return to the client (upstream server errors become 502)."""
+        return 502 if self.status_code >= 500 else self.status_code
+    
+    @property
+    def error_type(self) -> str:
+        """Anthropic error type matching the upstream status."""
+        return ERROR_TYPES.get(self.status_code, "api_error")
 
 
 class BaseProvider(ABC):
@@ -16,29 +60,83 @@ class BaseProvider(ABC):
         api_key: str, 
         base_url: str, 
         timeout: int = 90,
-        client: Optional[httpx.AsyncClient] = None
+        client: Optional[httpx.AsyncClient] = None,
+        retrier: Optional[Retrier] = None,
+        upstreams: Optional[UpstreamPool] = None,
+        hedger: Optional[Hedger] = None
     ):
         """Initialize provider with API credentials."""
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = timeout
+        self.retrier = retrier
+        self.hedger = hedger
+        # When set, each attempt goes to an upstream chosen by the pool instead of base_url
+        self.upstreams = upstreams
+        # Shared (pooled) clients are owned by the caller and must not be closed here
+        self.owns_client = client is None
         self.client = client or httpx.AsyncClient(
             timeout=httpx.Timeout(timeout),
             limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
         )
     
+    async def _send_once(self, send: UpstreamSend, avoid: Collection[str] = ()) -> httpx.Response:
+        if self.upstreams is None:
+            return await send(self.base_url, self.client)
+        return await self.upstreams.send(send, avoid)
+    
+    async def _send_retrying(self, route: str, send: UpstreamSend, avoid: Collection[str] = ()) -> httpx.Response:
+        if self.retrier is None:
+            return await self._send_once(send, avoid)
+        return await self.retrier.send(route, lambda: self._send_once(send, avoid))
+    
+    async def send(self, route: str, send: UpstreamSend, hedge: bool = False) -> httpx.Response:
+        """Send an upstream request, retrying it per the route's policy if a retrier is set.
+        
+        With ``hedge``, a slow request on a hedged route is duplicated to a
+        different upstream and the first successful response is used; only
+        pass it for requests whose response is read in full.
+        """
+        if not hedge or self.hedger is None or not self.hedger.enabled(route):
+            return await self._send_retrying(route, send)
+        # Upstreams the primary attempt went to, so the hedge can go elsewhere
+        used: Set[str] = set()
+        
+        def send_primary(base_url: str, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+            used.add(base_url)
+            return send(base_url, client)
+        
+        return await self.hedger.send(
+            route,
+            lambda: self._send_retrying(route, send_primary),
+            lambda: self._send_retrying(route, send, avoid=used)
+        )
+    
+    @asynccontextmanager
+    async def open_stream(self, route: str, path: str, payload: Dict[str, Any]) -> AsyncIterator[httpx.Response]:
+        """Open a streaming POST to ``path`` on the upstream; failures before the first byte are retried."""
+        response = await self.send(route, lambda base_url, client: client.send(
+            client.build_request("POST", f"{base_url}{path}", json=payload, headers=self.get_headers()),
+            stream=True
+        ))
+        try:
+            yield response
+        finally:
+            await response.aclose()
+    
     async def __aenter__(self):
         """Async context manager entry."""
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
-        await self.client.aclose()
+        if self.owns_client:
+            await self.client.aclose()
     
     @abstractmethod
     async def complete(
         self, 
-        request: ClaudeMessagesRequest,
+        request: MessagesRequest,
         request_id: str
     ) -> ClaudeMessagesResponse:
         """Complete a chat completion request."""
@@ -47,14 +145,14 @@ class BaseProvider(ABC):
     @abstractmethod
     async def stream_complete(
         self, 
-        request: ClaudeMessagesRequest,
+        request: MessagesRequest,
         request_id: str
-    ) -> AsyncGenerator[str, None]:
-        """Stream a chat completion request."""
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream a chat completion request as encoded Claude SSE events."""
         pass
     
     @abstractmethod
-    def convert_request(self, request: ClaudeMessagesRequest) -> Dict[str, Any]:
+    def convert_request(self, request: MessagesRequest) -> Dict[str, Any]:
         """Convert Claude request to provider-specific format."""
         pass
     
@@ -62,7 +160,7 @@ class BaseProvider(ABC):
     def convert_response(
         self, 
         response: Dict[str, Any], 
-        original_request: ClaudeMessagesRequest
+        original_request: MessagesRequest
     ) -> ClaudeMessagesResponse:
         """Convert provider response to Claude format."""
         pass
@@ -144,6 +242,11 @@ class BaseProvider(ABC):
         # Default to user-specified model
         return big_model
     
+    @staticmethod
+    def get_model_route(claude_model: str) -> str:
+        """Return the route ("big" or "small") a Claude model name is served by."""
+        return BaseProvider.map_claude_model(claude_model, "big", "small")
+    
     @staticmethod
     def guess_claude_model(provider_model: Optional[str], big_model: str, small_model: str) -> str:
         """Guess Claude model from provider model response.
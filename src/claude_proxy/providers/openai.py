@@ -12,22 +12,114 @@ from ..models.claude import (
     ClaudeMessage,
     ClaudeMessagesRequest,
     ClaudeMessagesResponse,
+    MessagesRequest,
     ClaudeTextContent,
     ClaudeToolUseContent,
     ClaudeToolResultContent,
     ClaudeUsage,
 )
+from .. import sse
+from ..breaker import CircuitOpenError
+from ..capture import start_capture
 from ..models.openai import OpenAIMessage, OpenAIMessagesRequest
-from ..utils import generate_request_id, get_current_timestamp
+from ..telemetry import CONVERSION_DURATION, StreamTimer
+from ..utils import generate_request_id, get_current_timestamp, json_loads
 
-from .base import BaseProvider
+from .base import ERROR_TYPES, BaseProvider, UpstreamError
+
+
+def _field(block: Any, name: str, default: Any = None) -> Any:
+    """Read a field from a content block given as a dict or a Pydantic model."""
+    if isinstance(block, dict):
+        return block.get(name, default)
+    return getattr(block, name, default)
+
+
+def _join_text_blocks(blocks: List[Any]) -> str:
+    """Join the text of all text blocks in a list in a single pass."""
+    return "".join([
+        block.get("text", "")
+        for block in blocks
+        if isinstance(block, dict) and block.get("type") == "text"
+    ])
+
+
+class _MessageParts:
+    """Accumulates the OpenAI pieces produced from one Claude message."""
+    
+    __slots__ = ("content_parts", "tool_calls", "tool_messages", "first_text")
+    
+    def __init__(self):
+        self.content_parts: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.tool_messages: List[Dict[str, Any]] = []
+        self.first_text: Optional[str] = None
+    
+    def add_text(self, text: str) -> None:
+        self.content_parts.append({"type": "text", "text": text})
+        if self.first_text is None:
+            self.first_text = text
+
+
+def _convert_text_block(block: Any, parts: _MessageParts) -> None:
+    parts.add_text(_field(block, "text", ""))
+
+
+def _convert_image_block(block: Any, parts: _MessageParts) -> None:
+    # Convert Claude base64 image source to an OpenAI data URL
+    source = _field(block, "source") or {}
+    if source.get("type") == "base64":
+        parts.content_parts.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{source.get('media_type', 'image/jpeg')};base64,{source.get('data', '')}"
+            }
+        })
+
+
+def _convert_tool_use_block(block: Any, parts: _MessageParts) -> None:
+    # Claude tool_use -> OpenAI tool_calls entry
+    parts.tool_calls.append({
+        "id": _field(block, "id", ""),
+        "type": "function",
+        "function": {
+            "name": _field(block, "name", ""),
+            "arguments": json.dumps(_field(block, "input") or {})
+        }
+    })
+
+
+def _convert_tool_result_block(block: Any, parts: _MessageParts) -> None:
+    # Claude tool_result -> separate OpenAI tool message
+    content = _field(block, "content")
+    if isinstance(content, list):
+        content = _join_text_blocks(content)
+    elif content is None:
+        content = ""
+    else:
+        content = str(content)
+    parts.add_text(content)
+    parts.tool_messages.append({
+        "role": "tool",
+        "content": content,
+        "tool_call_id": _field(block, "tool_use_id", "unknown")
+    })
+
+
+# Content block type -> converter, dispatched once per block
+_BLOCK_CONVERTERS = {
+    "text": _convert_text_block,
+    "image": _convert_image_block,
+    "tool_use": _convert_tool_use_block,
+    "tool_result": _convert_tool_result_block,
+}
 
 
 class OpenAIProvider(BaseProvider):
     """OpenAI API provider."""
     
-    def convert_request(self, request: ClaudeMessagesRequest) -> Dict[str, Any]:
-        """Convert Claude request to OpenAI format."""
+    def convert_request(self, request: MessagesRequest) -> Dict[str, Any]:
+        """Convert Claude request (Pydantic model or raw dict-backed) to OpenAI format."""
         messages = []
         
         # Add system message if present
@@ -35,178 +127,41 @@ class OpenAIProvider(BaseProvider):
             system_content = request.system
             if isinstance(system_content, list):
                 # Convert system blocks to string
-                system_text = ""
-                for block in system_content:
-                    if isinstance(block, dict) and block.get("type") == "text":
-                        system_text += block.get("text", "")
-                system_content = system_text
+                system_content = _join_text_blocks(system_content)
             
             messages.append({
                 "role": "system",
                 "content": system_content
             })
         
-        # Convert Claude messages to OpenAI format
+        # Convert Claude messages to OpenAI format, one pass over each content list
+        converters = _BLOCK_CONVERTERS
         for msg in request.messages:
-            openai_msg = {"role": msg.role}
-            
-            # Check if this message contains tool_use content (assistant with tool calls)
-            has_tool_use = False
-            tool_calls = []
+            role = _field(msg, "role")
+            content = _field(msg, "content")
+            if isinstance(content, str):
+                messages.append({"role": role, "content": content})
+                continue
             
-            # Check if this message contains tool_result content (user with tool results)  
-            has_tool_results = False
+            parts = _MessageParts()
+            for block in content:
+                converter = converters.get(_field(block, "type"))
+                if converter is not None:
+                    converter(block, parts)
             
-            if isinstance(msg.content, str):
-                openai_msg["content"] = msg.content
-            elif isinstance(msg.content, list):
-                # Handle multi-modal content and tool calls
-                content_parts = []
-                
-                for part in msg.content:
-                    if isinstance(part, dict):
-                        if part.get("type") == "text":
-                            content_parts.append({
-                                "type": "text",
-                                "text": part.get("text", "")
-                            })
-                        elif part.get("type") == "image":
-                            # Convert Claude image format to OpenAI
-                            source = part.get("source", {})
-                            if source.get("type") == "base64":
-                                content_parts.append({
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:{source.get('media_type', 'image/jpeg')};base64,{source.get('data', '')}"
-                                    }
-                                })
-                        elif part.get("type") == "tool_use":
-                            # Convert Claude tool_use to OpenAI tool_calls
-                            has_tool_use = True
-                            tool_calls.append({
-                                "id": part.get("id", ""),
-                                "type": "function",
-                                "function": {
-                                    "name": part.get("name", ""),
-                                    "arguments": json.dumps(part.get("input", {}))
-                                }
-                            })
-                        elif part.get("type") == "tool_result":
-                            # Convert Claude tool_result to OpenAI format
-                            has_tool_results = True
-                            tool_result_content = part.get("content", "")
-                            if isinstance(tool_result_content, list):
-                                # Extract text from content list
-                                text_content = ""
-                                for item in tool_result_content:
-                                    if isinstance(item, dict) and item.get("type") == "text":
-                                        text_content += item.get("text", "")
-                                tool_result_content = text_content
-                            
-                            content_parts.append({
-                                "type": "text",
-                                "text": str(tool_result_content)
-                            })
-                    elif hasattr(part, "type") and hasattr(part, "text"):
-                        # Handle Pydantic models
-                        if part.type == "text":
-                            content_parts.append({
-                                "type": "text", 
-                                "text": part.text
-                            })
-                        elif part.type == "tool_use":
-                            # Handle Pydantic tool_use models
-                            has_tool_use = True
-                            tool_calls.append({
-                                "id": part.id,
-                                "type": "function",
-                                "function": {
-                                    "name": part.name,
-                                    "arguments": json.dumps(part.input)
-                                }
-                            })
-                    elif hasattr(part, "type"):
-                        # Handle Pydantic models without text attribute
-                        if part.type == "tool_use":
-                            has_tool_use = True
-                            tool_calls.append({
-                                "id": part.id,
-                                "type": "function", 
-                                "function": {
-                                    "name": part.name,
-                                    "arguments": json.dumps(part.input)
-                                }
-                            })
-                        elif part.type == "tool_result":
-                            # Handle Pydantic tool_result models  
-                            has_tool_results = True
-                            result_content = part.content
-                            if isinstance(result_content, list):
-                                text_content = ""
-                                for item in result_content:
-                                    if isinstance(item, dict) and item.get("type") == "text":
-                                        text_content += item.get("text", "")
-                                result_content = text_content
-                            
-                            content_parts.append({
-                                "type": "text",
-                                "text": str(result_content)
-                            })
-                
-                # Set message content and tool_calls
-                if has_tool_use:
-                    # Assistant message with tool calls
-                    openai_msg["tool_calls"] = tool_calls
-                    # For assistant messages with tool calls, content should be null or text-only
-                    text_parts = [part for part in content_parts if part.get("type") == "text"]
-                    if text_parts and text_parts[0].get("text"):
-                        openai_msg["content"] = text_parts[0]["text"]
-                    else:
-                        openai_msg["content"] = None
-                elif has_tool_results:
-                    # Handle tool_result messages - convert each to separate tool message
-                    for part in msg.content:
-                        if isinstance(part, dict) and part.get("type") == "tool_result":
-                            tool_result_content = part.get("content", "")
-                            if isinstance(tool_result_content, list):
-                                # Extract text from content list
-                                text_content = ""
-                                for item in tool_result_content:
-                                    if isinstance(item, dict) and item.get("type") == "text":
-                                        text_content += item.get("text", "")
-                                tool_result_content = text_content
-                            
-                            # Create separate tool message
-                            tool_msg = {
-                                "role": "tool",
-                                "content": str(tool_result_content),
-                                "tool_call_id": part.get("tool_use_id", "unknown")
-                            }
-                            messages.append(tool_msg)
-                        elif hasattr(part, "type") and part.type == "tool_result":
-                            # Handle Pydantic tool_result models
-                            result_content = part.content
-                            if isinstance(result_content, list):
-                                text_content = ""
-                                for item in result_content:
-                                    if isinstance(item, dict) and item.get("type") == "text":
-                                        text_content += item.get("text", "")
-                                result_content = text_content
-                            
-                            # Create separate tool message
-                            tool_msg = {
-                                "role": "tool", 
-                                "content": str(result_content),
-                                "tool_call_id": part.tool_use_id
-                            }
-                            messages.append(tool_msg)
-                    # Skip the original user message since we've converted tool_results to tool messages
-                    continue
-                else:
-                    # Regular content
-                    openai_msg["content"] = content_parts if content_parts else ""
-            
-            messages.append(openai_msg)
+            if parts.tool_calls:
+                # Assistant message with tool calls: content is the first text or null
+                messages.append({
+                    "role": role,
+                    "tool_calls": parts.tool_calls,
+                    "content": parts.first_text or None
+                })
+            elif parts.tool_messages:
+                # User message carrying tool results becomes one tool message per result
+                messages.extend(parts.tool_messages)
+            else:
+                # Regular content
+                messages.append({"role": role, "content": parts.content_parts or ""})
         
         # Build OpenAI request
         openai_request = {
@@ -235,7 +190,7 @@ class OpenAIProvider(BaseProvider):
     def convert_response(
         self, 
         response: Dict[str, Any], 
-        original_request: Optional[ClaudeMessagesRequest] = None
+        original_request: Optional[MessagesRequest] = None
     ) -> ClaudeMessagesResponse:
         """Convert OpenAI response to Claude format."""
         choice = response["choices"][0]
@@ -382,50 +337,43 @@ class OpenAIProvider(BaseProvider):
     
     async def complete(
         self, 
-        request: ClaudeMessagesRequest,
+        request: MessagesRequest,
         request_id: str
     ) -> ClaudeMessagesResponse:
         """Complete a non-streaming request."""
-        logging.info(f"=== NON-STREAMING REQUEST START [{request_id}] ===")
-        logging.info(f"Original Claude request: {request.model_dump()}")
+        capture = start_capture(request_id)
+        if capture:
+            capture.record("claude_request", request.model_dump)
+        started = time.perf_counter()
         openai_request = self.convert_request(request)
-        logging.info(f"Converted OpenAI request: {openai_request}")
-        logging.info(f"=== NON-STREAMING REQUEST END [{request_id}] ===")
-        
-        # Log the exact URL and headers being used
-        url = f"{self.base_url}/chat/completions"
-        headers = self.get_headers()
-        logging.debug(f"Request URL: {url}")
-        logging.debug(f"Request headers: {headers}")
-        logging.debug(f"Base URL: {self.base_url}")
-        logging.debug(f"Client base URL: {self.client.base_url}")
+        CONVERSION_DURATION.observe(time.perf_counter() - started, direction="request")
+        if capture:
+            capture.record("openai_request", openai_request)
         
         try:
-            logging.debug(f"About to send POST request to: {url}")
-            response = await self.client.post(
-                f"{self.base_url}/chat/completions",
+            response = await self.send(self.get_model_route(request.model), lambda base_url, client: client.post(
+                f"{base_url}/chat/completions",
                 json=openai_request,
                 headers=self.get_headers()
-            )
-            logging.debug(f"HTTP response received: {response.status_code}")
-            logging.debug(f"Response headers: {response.headers}")
+            ), hedge=True)
             response.raise_for_status()
             response_data = response.json()
-            logging.debug(f"Response data: {response_data}")
+            started = time.perf_counter()
             claude_response = self.convert_response(response_data, request)
-            logging.info(f"=== NON-STREAMING RESPONSE START [{request_id}] ===")
-            logging.info(f"OpenAI response data: {response_data}")
-            logging.info(f"Final Claude response: {claude_response.model_dump()}")
-            logging.info(f"=== NON-STREAMING RESPONSE END [{request_id}] ===")
+            CONVERSION_DURATION.observe(time.perf_counter() - started, direction="response")
+            if capture:
+                capture.record("openai_response", response_data)
+                capture.record("claude_response", claude_response.model_dump)
             return claude_response
             
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTPStatusError occurred: {e.response.status_code}, {str(e)}")
             logging.error(f"Response text: {e.response.text}")
             logging.error(f"Request URL was: {e.request.url}")
-            logging.error(f"Request headers were: {e.request.headers}")
             error_msg = self.classify_error(str(e), e.response.status_code)
-            raise Exception(error_msg) from e
+            raise UpstreamError.from_response(error_msg, e.response) from e
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logging.error(f"General exception occurred: {str(e)}")
             error_msg = self.classify_error(str(e))
@@ -434,25 +382,29 @@ class OpenAIProvider(BaseProvider):
     
     async def stream_complete(
         self, 
-        request: ClaudeMessagesRequest,
+        request: MessagesRequest,
         request_id: str
-    ) -> AsyncGenerator[str, None]:
-        """Stream a completion request."""
-        logging.info(f"=== STREAMING REQUEST START [{request_id}] ===")
-        logging.info(f"Original Claude request: {request.model_dump()}")
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream a completion request as encoded SSE events."""
+        capture = start_capture(request_id)
+        if capture:
+            capture.record("claude_request", request.model_dump)
+        started = time.perf_counter()
         openai_request = self.convert_request(request)
-        logging.info(f"Converted OpenAI request: {openai_request}")
-        logging.info(f"=== STREAMING REQUEST END [{request_id}] ===")
+        CONVERSION_DURATION.observe(time.perf_counter() - started, direction="request")
         openai_request["stream"] = True
+        if capture:
+            capture.record("openai_request", openai_request)
+        route = self.get_model_route(request.model)
+        timer = StreamTimer(request_id, route)
+        output_tokens = 0
         
         try:
-            async with self.client.stream(
-                "POST",
-                f"{self.base_url}/chat/completions",
-                json=openai_request,
-                headers=self.get_headers()
+            async with self.open_stream(
+                route,
+                "/chat/completions",
+                openai_request
             ) as response:
-                logging.debug(f"Streaming HTTP response status: {response.status_code}")
                 response.raise_for_status()
                 
                 input_tokens = 0
@@ -462,202 +414,139 @@ class OpenAIProvider(BaseProvider):
                 text_block_started = False
                 
                 # Send initial message_start event
-                start_event = {
-                    "type": "message_start",
-                    "message": {
-                        "id": f"msg_{generate_request_id()}",
-                        "type": "message",
-                        "role": "assistant",
-                        "model": request.model,
-                        "content": [],
-                        "stop_reason": None,
-                        "stop_sequence": None,
-                        "usage": {"input_tokens": input_tokens, "output_tokens": 0}
-                    }
-                }
-                start_event_str = f"event: message_start\ndata: {json.dumps(start_event)}\n\n"
-                logging.info(f"[{request_id}] STREAMING RESPONSE: {start_event_str.strip()}")
-                yield start_event_str
-                async for line in response.aiter_lines():
-                    logging.debug(f"Streaming line received: {line}")
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
-                        if data.strip() == "[DONE]":
-                            logging.debug("Streaming completed with [DONE] signal.")
-                            break
+                start_event = sse.message_start({
+                    "id": f"msg_{generate_request_id()}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": request.model,
+                    "content": [],
+                    "stop_reason": None,
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": 0}
+                })
+                if capture:
+                    capture.record("claude_event", start_event)
+                yield start_event
+                async for data in sse.aiter_sse_data(response.aiter_bytes()):
+                    timer.chunk()
+                    if capture:
+                        capture.record("openai_data", data)
+                    if data.strip() == b"[DONE]":
+                        break
+                    
+                    try:
+                        chunk = json_loads(data)
                         
-                        try:
-                            chunk = json.loads(data)
-                            logging.debug(f"Parsed chunk: {chunk}")
+                        # Check if chunk has choices array
+                        choices = chunk.get("choices")
+                        if not choices or not isinstance(choices, list):
+                            continue
+                            
+                        choice = choices[0]
+                        if not choice or not isinstance(choice, dict):
+                            continue
                             
-                            # Check if chunk has choices array
-                            if not chunk.get("choices") or not isinstance(chunk["choices"], list):
-                                logging.debug("Chunk has no choices array, skipping")
-                                continue
+                        delta = choice.get("delta") or {}
+                        
+                        usage = chunk.get("usage")
+                        if usage and isinstance(usage, dict):
+                            input_tokens = usage.get("prompt_tokens", input_tokens)
+                        
+                        # Handle text content deltas
+                        if content := delta.get("content"):
+                            if not text_block_started:
+                                # Send text content_block_start event
+                                yield sse.text_block_start(0)
+                                text_block_started = True
                                 
-                            choice = chunk["choices"][0] if len(chunk["choices"]) > 0 else None
-                            if not choice or not isinstance(choice, dict):
-                                logging.debug("Choice is None, empty, or not a dict, skipping")
-                                continue
+                            has_text_content = True
+                            delta_event = sse.text_delta(0, content)
+                            if capture:
+                                capture.record("claude_event", delta_event)
+                            timer.delta()
+                            yield delta_event
+                        
+                        # Handle tool calls in streaming
+                        if tool_calls := delta.get("tool_calls"):
+                            for tool_call in tool_calls:
+                                call_index = tool_call.get("index", 0)
+                                call_id = tool_call.get("id", "")
                                 
-                            delta = choice.get("delta", {}) if choice else {}
-                            
-                            if chunk.get("usage") and isinstance(chunk["usage"], dict):
-                                input_tokens = chunk["usage"].get("prompt_tokens", input_tokens)
-                            
-                            # Handle text content deltas
-                            if content := delta.get("content"):
-                                if not text_block_started:
-                                    # Send text content_block_start event
-                                    block_start_event = {
-                                        "type": "content_block_start",
-                                        "index": 0,
-                                        "content_block": {
-                                            "type": "text",
-                                            "text": ""
-                                        }
+                                # Initialize tool call if we haven't seen it
+                                if call_index not in tool_calls_accumulator:
+                                    tool_calls_accumulator[call_index] = {
+                                        "id": call_id,
+                                        "name": "",
+                                        "arguments": "",
+                                        "started": False
                                     }
-                                    yield f"event: content_block_start\ndata: {json.dumps(block_start_event)}\n\n"
-                                    text_block_started = True
                                     
-                                has_text_content = True
-                                delta_event = {
-                                    "type": "content_block_delta",
-                                    "index": 0,
-                                    "delta": {
-                                        "type": "text_delta",
-                                        "text": content
-                                    }
-                                }
-                                delta_event_str = f"event: content_block_delta\ndata: {json.dumps(delta_event)}\n\n"
-                                logging.info(f"[{request_id}] STREAMING RESPONSE: {delta_event_str.strip()}")
-                                yield delta_event_str
-                            
-                            # Handle tool calls in streaming
-                            if tool_calls := delta.get("tool_calls"):
-                                for tool_call in tool_calls:
-                                    call_index = tool_call.get("index", 0)
-                                    call_id = tool_call.get("id", "")
-                                    
-                                    # Initialize tool call if we haven't seen it
-                                    if call_index not in tool_calls_accumulator:
-                                        tool_calls_accumulator[call_index] = {
-                                            "id": call_id,
-                                            "name": "",
-                                            "arguments": "",
-                                            "started": False
-                                        }
-                                        
-                                    acc = tool_calls_accumulator[call_index]
-                                    
-                                    # Update ID if provided
-                                    if call_id:
-                                        acc["id"] = call_id
-                                    
-                                    # Handle function info
-                                    if func := tool_call.get("function"):
-                                        # Update function name if provided
-                                        if name := func.get("name"):
-                                            acc["name"] = name
-                                            
-                                        # Update arguments if provided
-                                        if args := func.get("arguments"):
-                                            acc["arguments"] += args
-                                    
-                                    # Send content_block_start if this is the first time we see this tool call with a name
-                                    if acc["name"] and not acc["started"]:
-                                        content_index = 1 if has_text_content else 0
-                                        tool_start_event = {
-                                            "type": "content_block_start",
-                                            "index": content_index,
-                                            "content_block": {
-                                                "type": "tool_use",
-                                                "id": acc["id"],
-                                                "name": acc["name"],
-                                                "input": {}
-                                            }
-                                        }
-                                        tool_start_event_str = f"event: content_block_start\ndata: {json.dumps(tool_start_event)}\n\n"
-                                        logging.info(f"[{request_id}] STREAMING RESPONSE: {tool_start_event_str.strip()}")
-                                        yield tool_start_event_str
-                                        acc["started"] = True
-                                        has_tool_content = True
-                                        
-                                    # Send arguments delta if we have new arguments
-                                    if func and func.get("arguments"):
-                                        content_index = 1 if has_text_content else 0
-                                        tool_delta_event = {
-                                            "type": "content_block_delta",
-                                            "index": content_index,
-                                            "delta": {
-                                                "type": "input_json_delta",
-                                                "partial_json": func["arguments"]
-                                            }
-                                        }
-                                        yield f"event: content_block_delta\ndata: {json.dumps(tool_delta_event)}\n\n"
-                            
-                            if choice and choice.get("finish_reason"):
-                                usage_info = chunk.get("usage", {}) if chunk.get("usage") and isinstance(chunk.get("usage"), dict) else {}
-                                output_tokens = usage_info.get("completion_tokens", 0)
+                                acc = tool_calls_accumulator[call_index]
                                 
-                                # Send content_block_stop events for any active blocks
-                                if has_tool_content:
-                                    content_index = 1 if has_text_content else 0
-                                    tool_stop_event = {
-                                        "type": "content_block_stop",
-                                        "index": content_index
-                                    }
-                                    yield f"event: content_block_stop\ndata: {json.dumps(tool_stop_event)}\n\n"
+                                # Update ID if provided
+                                if call_id:
+                                    acc["id"] = call_id
                                 
-                                if has_text_content:
-                                    block_stop_event = {
-                                        "type": "content_block_stop",
-                                        "index": 0
-                                    }
-                                    yield f"event: content_block_stop\ndata: {json.dumps(block_stop_event)}\n\n"
-                                
-                                # Send message_delta event
-                                stop_event = {
-                                    "type": "message_delta",
-                                    "delta": {
-                                        "stop_reason": self._convert_finish_reason(choice.get("finish_reason")),
-                                        "stop_sequence": None
-                                    },
-                                    "usage": {
-                                        "output_tokens": output_tokens
-                                    }
-                                }
-                                yield f"event: message_delta\ndata: {json.dumps(stop_event)}\n\n"
+                                # Handle function info
+                                if func := tool_call.get("function"):
+                                    # Update function name if provided
+                                    if name := func.get("name"):
+                                        acc["name"] = name
+                                        
+                                    # Update arguments if provided
+                                    if args := func.get("arguments"):
+                                        acc["arguments"] += args
                                 
-                                stop_event = {"type": "message_stop"}
-                                stop_event_str = f"event: message_stop\ndata: {json.dumps(stop_event)}\n\n"
-                                logging.info(f"[{request_id}] STREAMING RESPONSE: {stop_event_str.strip()}")
-                                logging.info(f"=== STREAMING COMPLETE [{request_id}] ===")
-                                yield stop_event_str
-                                break
-                        except json.JSONDecodeError as e:
-                            logging.error(f"JSONDecodeError occurred: {str(e)}")
-                            continue
+                                # Send content_block_start if this is the first time we see this tool call with a name
+                                if acc["name"] and not acc["started"]:
+                                    content_index = 1 if has_text_content else 0
+                                    tool_start_event = sse.tool_block_start(content_index, acc["id"], acc["name"])
+                                    if capture:
+                                        capture.record("claude_event", tool_start_event)
+                                    yield tool_start_event
+                                    acc["started"] = True
+                                    has_tool_content = True
+                                    
+                                # Send arguments delta if we have new arguments
+                                if func and func.get("arguments"):
+                                    content_index = 1 if has_text_content else 0
+                                    timer.delta()
+                                    yield sse.input_json_delta(content_index, func["arguments"])
+                        
+                        if choice and choice.get("finish_reason"):
+                            usage_info = usage if usage and isinstance(usage, dict) else {}
+                            output_tokens = usage_info.get("completion_tokens", 0)
+                            
+                            # Send content_block_stop events for any active blocks
+                            if has_tool_content:
+                                yield sse.block_stop(1 if has_text_content else 0)
+                            
+                            if has_text_content:
+                                yield sse.block_stop(0)
+                            
+                            # Send message_delta and message_stop events
+                            yield sse.message_delta(
+                                self._convert_finish_reason(choice.get("finish_reason")),
+                                output_tokens
+                            )
+                            if capture:
+                                capture.record("claude_event", sse.MESSAGE_STOP)
+                            yield sse.MESSAGE_STOP
+                            break
+                    except json.JSONDecodeError as e:
+                        logging.error(f"JSONDecodeError occurred: {str(e)}")
+                        continue
                             
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTPStatusError occurred during streaming: {e.response.status_code}, {str(e)}")
             error_msg = self.classify_error(str(e), e.response.status_code)
-            error_event = {
-                "type": "error", 
-                "error": {
-                    "type": "api_error",
-                    "message": error_msg
-                }
-            }
-            yield f"event: error\ndata: {json.dumps(error_event)}\n\n"
+            yield sse.error_event(error_msg, ERROR_TYPES.get(e.response.status_code, "api_error"))
+        except CircuitOpenError as e:
+            yield sse.error_event(str(e), "overloaded_error")
         except Exception as e:
             logging.error(f"General exception occurred during streaming: {str(e)}")
             error_msg = self.classify_error(str(e))
-            error_event = {
-                "type": "error",
-                "error": {
-                    "type": "api_error", 
-                    "message": error_msg
-                }
-            }
-            yield f"event: error\ndata: {json.dumps(error_event)}\n\n"
\ No newline at end of file
+            yield sse.error_event(error_msg)
+        finally:
+            # Also covers streams ending on [DONE] without a finish_reason, errors and client disconnects
+            timer.finish(output_tokens)
\ No newline at end of file
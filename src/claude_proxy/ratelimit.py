@@ -0,0 +1,144 @@
+"""Per-key rate limiting for Claude API Proxy.
+
+Each client key gets two token buckets: one for requests per second and one
+for estimated input tokens per minute. Input tokens are estimated from the
+request body size (about four bytes per token, like ``/v1/messages/count_tokens``)
+so a request can be rejected before its body is parsed. A rejected request is
+answered with a Claude ``rate_limit_error`` (HTTP 429) and a ``Retry-After``
+saying when it would be accepted, so the shared upstream quota is protected
+before any call leaves the proxy.
+
+State is a few floats per key, kept in an LRU cache. A key is evicted once it
+has been idle long enough for both buckets to refill, so eviction never gives
+a client more than a fresh bucket would. With ``CLAUDE_PROXY_SHARED_STATE_DIR``
+the buckets live in a table shared by all gunicorn workers instead, which
+evicts the least recently used key when a key's slots are full.
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import LRUCache
+from .config import Settings
+from .metrics import REGISTRY
+from .shared import SharedTable
+
+RATE_LIMITED = REGISTRY.counter(
+    "claude_proxy_rate_limited_total",
+    "Requests rejected by the per-key rate limiter",
+    ("limit",),
+)
+
+
+# Requests left, input tokens left and when the levels were computed
+Bucket = Tuple[float, float, float]
+
+
+def estimate_tokens(body: bytes) -> int:
+    """Rough input token count of a request body."""
+    return max(1, len(body) // 4)
+
+
+class RateLimitError(Exception):
+    """A client key is over its rate limit."""
+
+    def __init__(self, message: str, retry_after: float, limit: str = "requests"):
+        """Initialize with the seconds until the request would be accepted and the ``limit`` exceeded."""
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.limit = limit
+
+
+class RateLimiter:
+    """Token buckets for requests and estimated input tokens per client key."""
+
+    def __init__(
+        self,
+        requests_per_second: float = 0.0,
+        burst: float = 10.0,
+        tokens_per_minute: float = 0.0,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+        table: Optional[SharedTable] = None,
+    ):
+        """Initialize the limiter; a rate of 0 disables that limit.
+
+        With a shared ``table`` the buckets are shared by every worker mapping it.
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = max(burst, 1.0)
+        self.tokens_per_second = tokens_per_minute / 60
+        # The token bucket holds one minute of tokens
+        self.token_capacity = tokens_per_minute
+        self._clock = clock
+        self.table = table
+        refill_seconds = max(
+            self.burst / requests_per_second if requests_per_second else 0.0,
+            60.0 if tokens_per_minute else 0.0,
+        )
+        self.keys: LRUCache[Bucket] = LRUCache(max_size=max_keys, ttl=refill_seconds or None, clock=clock)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured."""
+        return bool(self.requests_per_second or self.tokens_per_second)
+
+    def _charge(self, bucket: Optional[Bucket], now: float, tokens: int) -> Tuple[Bucket, Optional[RateLimitError]]:
+        """Refill ``bucket`` to ``now`` and charge one request; return the new bucket and any rejection."""
+        if bucket is None:
+            requests, token_level = self.burst, self.token_capacity
+        else:
+            elapsed = now - bucket[2]
+            requests = min(self.burst, bucket[0] + elapsed * self.requests_per_second)
+            token_level = min(self.token_capacity, bucket[1] + elapsed * self.tokens_per_second)
+
+        if self.requests_per_second and requests < 1.0:
+            return (requests, token_level, now), RateLimitError(
+                f"Rate limit of {self.requests_per_second:g} requests per second exceeded",
+                (1.0 - requests) / self.requests_per_second,
+                "requests",
+            )
+        # A request larger than the whole bucket is let through once the bucket is full
+        cost = min(float(tokens), self.token_capacity)
+        if self.tokens_per_second and token_level < cost:
+            return (requests, token_level, now), RateLimitError(
+                f"Rate limit of {self.token_capacity:g} input tokens per minute exceeded",
+                (cost - token_level) / self.tokens_per_second,
+                "input_tokens",
+            )
+        if self.requests_per_second:
+            requests -= 1.0
+        if self.tokens_per_second:
+            token_level -= cost
+        return (requests, token_level, now), None
+
+    def acquire(self, key: str, tokens: int = 0) -> None:
+        """Charge one request of ``tokens`` estimated input tokens to ``key``; raise ``RateLimitError`` if over."""
+        now = self._clock()
+        if self.table is not None:
+            error = self.table.update(key, lambda bucket: self._charge(bucket, now, tokens))
+        else:
+            bucket, error = self._charge(self.keys.get(key), now, tokens)
+            self.keys.put(key, bucket)
+        if error is not None:
+            RATE_LIMITED.inc(limit=error.limit)
+            raise error
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the limits and key cache statistics for the health endpoint."""
+        return {
+            "requests_per_second": self.requests_per_second,
+            "tokens_per_minute": self.token_capacity,
+            "keys": {"shared": self.table.path} if self.table is not None else self.keys.stats(),
+        }
+
+
+def build_rate_limiter(settings: Settings, table: Optional[SharedTable] = None) -> RateLimiter:
+    """Build the per-key rate limiter from application settings, optionally on a shared table."""
+    return RateLimiter(
+        requests_per_second=settings.rate_limit_requests_per_second,
+        burst=settings.rate_limit_burst,
+        tokens_per_minute=settings.rate_limit_tokens_per_minute,
+        max_keys=settings.rate_limit_max_keys,
+        table=table,
+    )
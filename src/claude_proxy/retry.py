@@ -0,0 +1,245 @@
+"""Upstream retries for Claude API Proxy.
+
+A failed upstream attempt is retried when it is safe and useful: connection
+errors that happen before the upstream has seen the whole request, and
+responses whose status says the request may succeed later (408, 409, 429 and
+5xx). Errors while reading the response are only retried when
+``retry_read_errors`` is set: by then the upstream may already have processed
+(and billed) the completion, so a retry can run it twice. Retries wait for the upstream's ``Retry-After`` hint when there is one,
+and otherwise for an exponential backoff with full jitter.
+
+Each route ("big"/"small") has its own policy and its own retry budget. The
+budget is a token bucket: every request deposits ``ratio`` tokens and every
+retry spends one, so retries add at most ``ratio`` extra load on top of the
+incoming traffic during an outage instead of multiplying it.
+
+Retries only happen before a response is handed to the caller. For streaming
+requests this means before the first byte is relayed to the client; once the
+upstream has accepted a stream, failures are reported, not retried.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from .config import Settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Errors raised before the upstream received the whole request, so it cannot have processed it
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.WriteError,
+)
+# Errors raised after the request was sent; the upstream may have processed it already
+READ_ERRORS = (
+    httpx.ReadError,
+    httpx.RemoteProtocolError,
+)
+
+RETRIES = REGISTRY.counter(
+    "claude_proxy_upstream_retries_total",
+    "Upstream attempts that were retried",
+    ("route", "reason"),
+)
+RETRIES_SUPPRESSED = REGISTRY.counter(
+    "claude_proxy_upstream_retries_suppressed_total",
+    "Retryable upstream failures that were not retried",
+    ("route", "cause"),
+)
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """Whether an upstream status code is worth retrying."""
+    return status_code in (408, 409, 429) or status_code >= 500
+
+
+def parse_retry_after(headers: httpx.Headers, now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait according to ``retry-after-ms`` or ``Retry-After``, if present."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - (time.time() if now is None else now), 0.0)
+
+
+class RetryPolicy:
+    """How often and how long to retry requests on one route."""
+
+    __slots__ = ("max_retries", "base_delay", "max_delay")
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0):
+        """Initialize the policy."""
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, retry: int, rng: random.Random) -> float:
+        """Full-jitter delay before retry number ``retry`` (0-based)."""
+        return rng.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of requests.
+
+    ``min_per_second`` tokens are added over time regardless of traffic so
+    that a quiet route can still retry occasional failures.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        capacity: float = 100.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a full bucket."""
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Record a request."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend a token for a retry; return False if the budget is exhausted."""
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        self._refill()
+        return self._tokens
+
+
+class Retrier:
+    """Sends upstream requests with per-route retry policies and budgets."""
+
+    def __init__(
+        self,
+        policies: Dict[str, RetryPolicy],
+        budgets: Dict[str, RetryBudget],
+        rng: Optional[random.Random] = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        retry_read_errors: bool = False,
+    ):
+        """Initialize the retrier; routes without a policy are never retried.
+
+        ``retry_read_errors`` also retries ``READ_ERRORS``, at the risk of duplicate upstream requests.
+        """
+        self.policies = policies
+        self.budgets = budgets
+        self.retry_read_errors = retry_read_errors
+        self._rng = rng or random.Random()
+        self._sleep = sleep
+
+    def _should_retry(self, route: str, retry: int, reason: str, retry_after: Optional[float]) -> bool:
+        policy = self.policies.get(route)
+        if policy is None or retry >= policy.max_retries:
+            return False
+        if retry_after is not None and retry_after > policy.max_delay:
+            # The upstream asks for a longer pause than we are willing to hold the client
+            RETRIES_SUPPRESSED.inc(route=route, cause="retry_after")
+            return False
+        budget = self.budgets.get(route)
+        if budget is not None and not budget.withdraw():
+            RETRIES_SUPPRESSED.inc(route=route, cause="budget")
+            return False
+        RETRIES.inc(route=route, reason=reason)
+        return True
+
+    async def send(self, route: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Call ``send`` until it returns a final response or retries run out.
+
+        The last response is returned as is (possibly with an error status) and
+        the last connection error is re-raised.
+        """
+        budget = self.budgets.get(route)
+        if budget is not None:
+            budget.deposit()
+        retry = 0
+        while True:
+            try:
+                response = await send()
+            except RETRYABLE_ERRORS + READ_ERRORS as e:
+                reason = type(e).__name__
+                if isinstance(e, READ_ERRORS) and not self.retry_read_errors:
+                    raise
+                if not self._should_retry(route, retry, reason, None):
+                    raise
+                delay = self.policies[route].backoff(retry, self._rng)
+                logger.warning(f"Upstream {reason} on route {route}, retrying in {delay:.2f}s")
+            else:
+                if not is_retryable_status(response.status_code):
+                    return response
+                retry_after = parse_retry_after(response.headers)
+                reason = str(response.status_code)
+                if not self._should_retry(route, retry, reason, retry_after):
+                    return response
+                await response.aclose()
+                delay = retry_after if retry_after is not None else self.policies[route].backoff(retry, self._rng)
+                logger.warning(f"Upstream returned {reason} on route {route}, retrying in {delay:.2f}s")
+            retry += 1
+            await self._sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return retry settings and remaining budget per route for the health endpoint."""
+        return {
+            route: {
+                "max_retries": policy.max_retries,
+                "budget_tokens": round(self.budgets[route].tokens, 2) if route in self.budgets else None,
+            }
+            for route, policy in self.policies.items()
+        }
+
+
+def build_retrier(settings: Settings) -> Retrier:
+    """Build the retrier for the "big" and "small" routes from application settings."""
+    policies: Dict[str, RetryPolicy] = {}
+    budgets: Dict[str, RetryBudget] = {}
+    for route, max_retries in (
+        ("big", settings.big_retry_max_retries),
+        ("small", settings.small_retry_max_retries),
+    ):
+        policies[route] = RetryPolicy(
+            max_retries=settings.retry_max_retries if max_retries is None else max_retries,
+            base_delay=settings.retry_base_delay,
+            max_delay=settings.retry_max_delay,
+        )
+        budgets[route] = RetryBudget(settings.retry_budget_ratio, settings.retry_budget_min_per_second)
+    return Retrier(policies, budgets, retry_read_errors=settings.retry_read_errors)
@@ -0,0 +1,279 @@
+"""Cross-worker shared state for Claude API Proxy.
+
+Under gunicorn every worker is a separate process, so in-process rate-limit
+buckets, circuit breakers and counters are each split across the workers.
+When ``CLAUDE_PROXY_SHARED_STATE_DIR`` is set, these live instead in small
+memory-mapped files (ideally on a tmpfs such as ``/dev/shm``) that every
+worker maps, so the workers behave like one proxy without an external service.
+
+Each file is a fixed-size hash table of records: a key followed by a few
+float64 fields. A key lives in one of ``probe`` consecutive slots after its
+hash, so lookups are O(1); when all of them are taken, the record with the
+smallest ``evict_field`` (e.g. the least recently updated rate-limit bucket)
+is replaced, or the update is refused (counted and logged) for tables that
+must not lose records. Every read-modify-write holds an exclusive ``fcntl``
+lock on the file, so hot paths such as counter increments batch their updates
+instead of writing through.
+
+Files are named after a deployment token: ``CLAUDE_PROXY_SHARED_STATE_TOKEN``,
+which the bundled ``gunicorn.conf.py`` sets to a fresh value in the master
+before forking workers, or else the parent process id. Every process of a
+deployment holds a shared lock on its token's lock file; the first one to
+start recreates the tables, so a restarted deployment never inherits old
+counters or buckets, and tables whose lock nobody holds any more (deployments
+that have exited) are removed.
+"""
+
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Record = Tuple[float, ...]
+
+TABLES = ("metrics", "ratelimit", "breakers")
+
+
+class SharedTable:
+    """Fixed-size hash table of float records in a memory-mapped file shared by processes."""
+
+    def __init__(
+        self,
+        path: str,
+        fields: int,
+        slots: int = 4096,
+        key_size: int = 64,
+        probe: int = 8,
+        evict_field: Optional[int] = None,
+    ):
+        """Map ``path`` (created and sized if needed) as ``slots`` records of ``fields`` floats."""
+        import fcntl
+
+        self._fcntl = fcntl
+        self.path = path
+        self.fields = fields
+        self.slots = slots
+        self.key_size = key_size
+        self.probe = min(probe, slots)
+        self.evict_field = evict_field
+        self._values = struct.Struct(f"<{fields}d")
+        self._record_size = key_size + self._values.size
+        size = slots * self._record_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        # fcntl locks are per process, so threads of one worker also need a lock
+        self._thread_lock = threading.Lock()
+        # New keys refused because their slots were full (this process only)
+        self.overflows = 0
+
+    def _locked(self) -> "_FileLock":
+        return _FileLock(self._fcntl, self._fd)
+
+    def _encode_key(self, key: str) -> bytes:
+        data = key.encode("utf-8")
+        if len(data) > self.key_size or b"\0" in data:
+            raise ValueError(f"Shared table keys must be at most {self.key_size} bytes without NUL: {key!r}")
+        return data
+
+    def _find(self, key: bytes, create: bool) -> Optional[int]:
+        """Offset of ``key``'s record, claiming a slot for it if ``create``."""
+        start = zlib.crc32(key) % self.slots
+        victim: Optional[int] = None
+        victim_age = 0.0
+        for i in range(self.probe):
+            offset = ((start + i) % self.slots) * self._record_size
+            stored = self._mmap[offset:offset + self.key_size].rstrip(b"\0")
+            if stored == key:
+                return offset
+            if not stored:
+                # Records are never removed, so the key cannot be further along
+                if not create:
+                    return None
+                victim = offset
+                break
+            if self.evict_field is not None:
+                age = self._read(offset)[self.evict_field]
+                if victim is None or age < victim_age:
+                    victim, victim_age = offset, age
+        if not create or victim is None:
+            return None
+        self._mmap[victim:victim + self._record_size] = key.ljust(self.key_size, b"\0") + bytes(self._values.size)
+        return victim
+
+    def _read(self, offset: int) -> Record:
+        return self._values.unpack_from(self._mmap, offset + self.key_size)
+
+    def get(self, key: str) -> Optional[Record]:
+        """Return the record stored under ``key``, if any."""
+        encoded = self._encode_key(key)
+        with self._thread_lock, self._locked():
+            offset = self._find(encoded, create=False)
+            return None if offset is None else self._read(offset)
+
+    def update(self, key: str, update: Callable[[Optional[Record]], Tuple[Record, T]]) -> T:
+        """Atomically replace the record under ``key`` by ``update(current)[0]`` and return ``[1]``.
+
+        ``current`` is None for a new key. Raises ``OverflowError`` if the key
+        is new and its slots are full in a table without eviction.
+        """
+        encoded = self._encode_key(key)
+        with self._thread_lock, self._locked():
+            offset = self._find(encoded, create=False)
+            current = None if offset is None else self._read(offset)
+            record, result = update(current)
+            if offset is None:
+                offset = self._find(encoded, create=True)
+                if offset is None:
+                    self.overflows += 1
+                    if self.overflows == 1:
+                        logger.warning(f"Shared table {self.path} is full; new keys stay per worker")
+                    raise OverflowError(f"Shared table {self.path} is full")
+            self._values.pack_into(self._mmap, offset + self.key_size, *record)
+            return result
+
+    def items(self) -> Iterator[Tuple[str, Record]]:
+        """Yield every stored key and record."""
+        with self._thread_lock, self._locked():
+            records = []
+            for slot in range(self.slots):
+                offset = slot * self._record_size
+                stored = self._mmap[offset:offset + self.key_size].rstrip(b"\0")
+                if stored:
+                    records.append((stored.decode("utf-8"), self._read(offset)))
+        return iter(records)
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._mmap.close()
+        os.close(self._fd)
+
+
+class _FileLock:
+    """Exclusive ``fcntl`` lock on a file descriptor for the duration of a ``with`` block."""
+
+    __slots__ = ("_fcntl", "_fd")
+
+    def __init__(self, fcntl_module, fd: int):
+        self._fcntl = fcntl_module
+        self._fd = fd
+
+    def __enter__(self) -> None:
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info) -> None:
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN)
+
+
+class SharedState:
+    """The shared tables of one proxy deployment."""
+
+    def __init__(self, directory: str, tag: str, rate_limit_keys: int = 65536):
+        """Open the tables of deployment ``tag`` in ``directory``, recreating them if no other process uses them."""
+        import fcntl
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.tag = tag
+        paths = {name: os.path.join(directory, f"{name}-{tag}.bin") for name in TABLES}
+        self._lock_fd = _lock_deployment(fcntl, os.path.join(directory, f"deployment-{tag}.lock"), paths.values())
+        _remove_stale(fcntl, directory, tag)
+        # Metric names with label values, summed across workers
+        self.metrics = SharedTable(paths["metrics"], 1, slots=2048, key_size=256)
+        # Rate-limit buckets (requests, tokens, updated); the least recently updated key is evicted
+        self.rate_limits = SharedTable(paths["ratelimit"], 3, slots=rate_limit_keys, evict_field=2)
+        # Circuit breakers (state, opened_at, generation) per upstream URL
+        self.breakers = SharedTable(paths["breakers"], 3, slots=1024, key_size=256)
+
+    def stats(self) -> Dict[str, object]:
+        """Return the directory and this worker's table overflows for the health endpoint."""
+        return {
+            "directory": self.directory,
+            "overflows": {
+                "metrics": self.metrics.overflows,
+                "ratelimit": self.rate_limits.overflows,
+                "breakers": self.breakers.overflows,
+            },
+        }
+
+    def close(self) -> None:
+        """Unmap every table and release the deployment lock."""
+        for table in (self.metrics, self.rate_limits, self.breakers):
+            table.close()
+        os.close(self._lock_fd)
+
+
+def _lock_deployment(fcntl_module, lock_path: str, table_paths: Iterator[str]) -> int:
+    """Hold a shared lock on ``lock_path`` for the life of the process; the first holder removes old tables."""
+    table_paths = list(table_paths)
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl_module.flock(fd, fcntl_module.LOCK_EX | fcntl_module.LOCK_NB)
+            first = True
+        except OSError:
+            first = False
+            fcntl_module.flock(fd, fcntl_module.LOCK_SH)
+        try:
+            current = os.stat(lock_path).st_ino == os.fstat(fd).st_ino
+        except FileNotFoundError:
+            current = False
+        if not current:
+            # Removed as stale by another deployment while we waited; start over
+            os.close(fd)
+            continue
+        if first:
+            # No other process uses this deployment's tables: whatever is there is left from a previous run
+            for path in table_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+            fcntl_module.flock(fd, fcntl_module.LOCK_SH)
+        return fd
+
+
+def _remove_stale(fcntl_module, directory: str, tag: str) -> None:
+    """Remove the tables of other deployments whose lock no process holds."""
+    for lock_path in glob.glob(os.path.join(directory, "deployment-*.lock")):
+        other = os.path.basename(lock_path)[len("deployment-"):-len(".lock")]
+        if other == tag:
+            continue
+        try:
+            fd = os.open(lock_path, os.O_RDWR)
+        except FileNotFoundError:
+            continue
+        try:
+            fcntl_module.flock(fd, fcntl_module.LOCK_EX | fcntl_module.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        try:
+            for name in TABLES:
+                path = os.path.join(directory, f"{name}-{other}.bin")
+                if os.path.exists(path):
+                    os.unlink(path)
+            os.unlink(lock_path)
+            logger.info(f"Removed shared state of exited deployment {other}")
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def open_shared_state(settings: Settings) -> Optional[SharedState]:
+    """Open the shared tables if ``CLAUDE_PROXY_SHARED_STATE_DIR`` is set."""
+    if not settings.shared_state_dir:
+        return None
+    # Set by the gunicorn master (see gunicorn.conf.py); otherwise workers of one master share its pid
+    tag = settings.shared_state_token or f"ppid{os.getppid()}"
+    return SharedState(settings.shared_state_dir, tag, settings.rate_limit_max_keys)
@@ -0,0 +1,188 @@
+"""Server-sent event encoding and parsing for streaming responses.
+
+Per-token events are rendered from pre-serialized byte templates: only the
+variable string is JSON-escaped, instead of building a nested dict and running
+``json.dumps`` over it for every delta. The output is byte-for-byte identical
+to ``json.dumps`` of the equivalent event dict.
+
+Upstream streams are parsed by ``SSEParser`` directly on the received bytes,
+without first decoding and splitting them into ``str`` lines.
+"""
+
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+
+def _escape(value: str) -> bytes:
+    """JSON-encode a string (quoted, ASCII-only, same as ``json.dumps``)."""
+    return encode_basestring_ascii(value).encode("ascii")
+
+
+_TEXT_DELTA = (
+    b'event: content_block_delta\n'
+    b'data: {"type": "content_block_delta", "index": %d, "delta": {"type": "text_delta", "text": %s}}\n\n'
+)
+_INPUT_JSON_DELTA = (
+    b'event: content_block_delta\n'
+    b'data: {"type": "content_block_delta", "index": %d, "delta": {"type": "input_json_delta", "partial_json": %s}}\n\n'
+)
+_TEXT_BLOCK_START = (
+    b'event: content_block_start\n'
+    b'data: {"type": "content_block_start", "index": %d, "content_block": {"type": "text", "text": ""}}\n\n'
+)
+_TOOL_BLOCK_START = (
+    b'event: content_block_start\n'
+    b'data: {"type": "content_block_start", "index": %d, '
+    b'"content_block": {"type": "tool_use", "id": %s, "name": %s, "input": {}}}\n\n'
+)
+_BLOCK_STOP = b'event: content_block_stop\ndata: {"type": "content_block_stop", "index": %d}\n\n'
+_MESSAGE_DELTA = (
+    b'event: message_delta\n'
+    b'data: {"type": "message_delta", "delta": {"stop_reason": %s, "stop_sequence": null}, '
+    b'"usage": {"output_tokens": %s}}\n\n'
+)
+MESSAGE_STOP = b'event: message_stop\ndata: {"type": "message_stop"}\n\n'
+
+
+def encode_event(event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encode an arbitrary event (used for once-per-stream events)."""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def message_start(message: Dict[str, Any]) -> bytes:
+    """Encode the ``message_start`` event."""
+    return encode_event("message_start", {"type": "message_start", "message": message})
+
+
+def text_block_start(index: int) -> bytes:
+    """Encode ``content_block_start`` for an empty text block."""
+    return _TEXT_BLOCK_START % index
+
+
+def tool_block_start(index: int, tool_id: str, name: str) -> bytes:
+    """Encode ``content_block_start`` for a tool_use block."""
+    return _TOOL_BLOCK_START % (index, _escape(tool_id), _escape(name))
+
+
+def text_delta(index: int, text: str) -> bytes:
+    """Encode a ``text_delta`` event."""
+    return _TEXT_DELTA % (index, _escape(text))
+
+
+def input_json_delta(index: int, partial_json: str) -> bytes:
+    """Encode an ``input_json_delta`` event."""
+    return _INPUT_JSON_DELTA % (index, _escape(partial_json))
+
+
+def block_stop(index: int) -> bytes:
+    """Encode ``content_block_stop``."""
+    return _BLOCK_STOP % index
+
+
+def message_delta(stop_reason: Optional[str], output_tokens: Optional[int]) -> bytes:
+    """Encode the final ``message_delta`` event."""
+    reason = b"null" if stop_reason is None else _escape(stop_reason)
+    tokens = b"null" if output_tokens is None else b"%d" % output_tokens
+    return _MESSAGE_DELTA % (reason, tokens)
+
+
+def error_event(message: str, error_type: str = "api_error") -> bytes:
+    """Encode an ``error`` event."""
+    return encode_event("error", {"type": "error", "error": {"type": error_type, "message": message}})
+
+
+class SSEParser:
+    """Incremental SSE parser yielding the ``data`` payload of each complete event.
+
+    Accepts arbitrary byte chunks (events and line endings may be split across
+    chunks), LF, CRLF and CR line endings, and multi-line ``data`` fields, which
+    are joined with ``\n``. Comments and the ``event``/``id``/``retry`` fields
+    are ignored, since OpenAI-compatible streams carry everything in ``data``.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self):
+        """Initialize an empty parser."""
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Consume ``chunk`` and return the data of every event it completes."""
+        buffer = self._buffer + chunk if self._buffer else chunk
+        held = b""
+        if b"\r" in buffer:
+            # A trailing CR may be the first half of a CRLF split across chunks
+            if buffer.endswith(b"\r"):
+                buffer, held = buffer[:-1], b"\r"
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        # Only complete events (terminated by a blank line) are parsed; the rest waits
+        blocks = buffer.split(b"\n\n")
+        self._buffer = blocks.pop() + held
+        events: List[bytes] = []
+        for block in blocks:
+            if block.startswith(b"data: ") and b"\n" not in block:
+                # Common case: a single "data: ..." line
+                events.append(block[6:])
+            elif block:
+                data = self._event_data(block)
+                if data is not None:
+                    events.append(data)
+        return events
+
+    @staticmethod
+    def _event_data(block: bytes) -> Optional[bytes]:
+        """Extract the (possibly multi-line) data field of one event block."""
+        data = [
+            line[6:] if line.startswith(b"data: ") else line[5:]
+            for line in block.split(b"\n")
+            if line.startswith(b"data:")
+        ]
+        return b"\n".join(data) if data else None
+
+    def flush(self) -> List[bytes]:
+        """Return the data of a final event not terminated by a blank line."""
+        events = self.feed(b"\n\n") if self._buffer else []
+        self._buffer = b""
+        return events
+
+
+async def aiter_sse_data(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Yield the ``data`` payload of each SSE event in a byte stream."""
+    parser = SSEParser()
+    async for chunk in chunks:
+        for data in parser.feed(chunk):
+            yield data
+    for data in parser.flush():
+        yield data
+
+
+# Delta events end with the closing quote of their escaped string payload
+_DELTA_EVENT = b"event: content_block_delta\n"
+_DELTA_END = b'"}}\n\n'
+_DELTA_MARKERS = (b'"type": "text_delta", "text": "', b'"type": "input_json_delta", "partial_json": "')
+
+
+def split_delta(event: bytes) -> Optional[Tuple[bytes, bytes]]:
+    """Split a text/input_json delta event into ``(head, escaped payload)``.
+
+    ``head`` identifies the delta type and block index; the payload is the
+    JSON-escaped string without quotes. Returns ``None`` for any other event.
+    """
+    if not event.startswith(_DELTA_EVENT) or not event.endswith(_DELTA_END):
+        return None
+    for marker in _DELTA_MARKERS:
+        pos = event.find(marker)
+        if pos != -1:
+            cut = pos + len(marker)
+            return event[:cut], event[cut:-len(_DELTA_END)]
+    return None
+
+
+def merge_deltas(head: bytes, payloads: List[bytes]) -> bytes:
+    """Rebuild one delta event from a ``split_delta`` head and escaped payloads.
+
+    JSON string escaping is per character, so concatenating escaped payloads
+    equals escaping the concatenated text.
+    """
+    return head + b"".join(payloads) + _DELTA_END
@@ -0,0 +1,220 @@
+"""Request and stage latency metrics for Claude API Proxy.
+
+``RequestMetricsMiddleware`` times every ``/v1/messages`` request from arrival
+to its last response byte, and for streams the time until the first SSE
+event reaches the client. The handler labels the request by storing
+``route``, ``model`` and ``stream`` in ``request.state``; requests rejected
+before their body is parsed are labelled ``unknown``. The other stages
+(format conversion, upstream connect and time to headers, stream throughput)
+are recorded where they happen. Everything is served by ``GET /metrics``.
+
+``StreamTimer`` follows one converted stream: upstream time to first token,
+the time the proxy adds before yielding that token as a ``content_block_delta``,
+the gaps between tokens and the output rate. It reports them per route and
+in one summary log line per request, to show whether the proxy or the
+upstream is the bottleneck.
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+import httpx
+
+from .metrics import LATENCY_BUCKETS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds for work done by the proxy itself, down to tens of microseconds
+OVERHEAD_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025) + LATENCY_BUCKETS[:8]
+
+REQUESTS = REGISTRY.counter(
+    "claude_proxy_requests_total",
+    "/v1/messages requests by route, target model and response status",
+    ("route", "model", "status"),
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "claude_proxy_request_duration_seconds",
+    "/v1/messages latency from request arrival to the last response byte",
+    ("route", "stream"),
+)
+TIME_TO_FIRST_EVENT = REGISTRY.histogram(
+    "claude_proxy_time_to_first_event_seconds",
+    "Streaming /v1/messages time from request arrival to the first SSE event sent to the client",
+    ("route",),
+)
+STREAM_DURATION = REGISTRY.histogram(
+    "claude_proxy_stream_duration_seconds",
+    "Streaming /v1/messages time from the first SSE event to the end of the stream",
+    ("route",),
+)
+STREAM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "claude_proxy_stream_output_tokens_per_second",
+    "Output tokens per second of streamed completions, from the first to the last token",
+    ("route",),
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000),
+)
+UPSTREAM_TTFT = REGISTRY.histogram(
+    "claude_proxy_upstream_ttft_seconds",
+    "Streamed completions' time from sending the upstream request to receiving the first output token",
+    ("route",),
+)
+PROXY_TTFT_OVERHEAD = REGISTRY.histogram(
+    "claude_proxy_ttft_overhead_seconds",
+    "Time from receiving the first upstream token to yielding it as a content_block_delta",
+    ("route",),
+    buckets=OVERHEAD_BUCKETS,
+)
+INTER_TOKEN_GAP = REGISTRY.histogram(
+    "claude_proxy_inter_token_gap_seconds",
+    "Time between consecutive content_block_delta events of a streamed completion",
+    ("route",),
+    buckets=OVERHEAD_BUCKETS[2:] + LATENCY_BUCKETS[8:12],
+)
+CONVERSION_DURATION = REGISTRY.histogram(
+    "claude_proxy_conversion_seconds",
+    "Time spent converting between Claude and OpenAI formats",
+    ("direction",),
+)
+UPSTREAM_CONNECT_DURATION = REGISTRY.histogram(
+    "claude_proxy_upstream_connect_seconds",
+    "Time to open a new upstream connection (TCP connect plus TLS handshake)",
+    ("upstream",),
+)
+UPSTREAM_TTFB = REGISTRY.histogram(
+    "claude_proxy_upstream_ttfb_seconds",
+    "Time from sending an upstream request to its response headers",
+    ("upstream",),
+)
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording request counts, total latency and time to first SSE event."""
+
+    def __init__(self, app: Callable[[Scope, Receive, Send], Awaitable[None]], path: str = "/v1/messages"):
+        """Wrap ``app``, timing requests to ``path``."""
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        # request.state in the handler reads and writes this dict
+        state: Dict[str, Any] = scope.setdefault("state", {})
+        status = 500
+        first_body: Optional[float] = None
+
+        async def timed_send(message: Message) -> None:
+            nonlocal status, first_body
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif first_body is None and message["type"] == "http.response.body" and message.get("body"):
+                first_body = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            end = time.perf_counter()
+            route = state.get("route", "unknown")
+            stream = bool(state.get("stream")) and status == 200
+            REQUESTS.inc(route=route, model=state.get("model", "unknown"), status=str(status))
+            REQUEST_DURATION.observe(end - start, route=route, stream="true" if stream else "false")
+            if stream and first_body is not None:
+                TIME_TO_FIRST_EVENT.observe(first_body - start, route=route)
+                STREAM_DURATION.observe(end - first_body, route=route)
+
+
+def trace_connect(request: httpx.Request, upstream: str) -> None:
+    """Time any new connection opened for ``request`` into ``claude_proxy_upstream_connect_seconds``."""
+    if "trace" in request.extensions:
+        return
+    done_event = "connection.start_tls.complete" if request.url.scheme == "https" else "connection.connect_tcp.complete"
+    started: Optional[float] = None
+
+    async def trace(event: str, info: Dict[str, Any]) -> None:
+        nonlocal started
+        if event == "connection.connect_tcp.started":
+            started = time.perf_counter()
+        elif event == done_event and started is not None:
+            UPSTREAM_CONNECT_DURATION.observe(time.perf_counter() - started, upstream=upstream)
+            started = None
+
+    request.extensions["trace"] = trace
+
+
+class StreamTimer:
+    """Token timings of one converted stream."""
+
+    __slots__ = (
+        "request_id", "route", "_clock", "started", "received", "first_received",
+        "first_delta", "last_delta", "deltas", "max_gap", "finished",
+    )
+
+    def __init__(self, request_id: str, route: str, clock: Callable[[], float] = time.perf_counter):
+        """Start timing when the upstream request is sent."""
+        self.request_id = request_id
+        self.route = route
+        self._clock = clock
+        self.started = clock()
+        self.received = self.started
+        self.first_received: Optional[float] = None
+        self.first_delta: Optional[float] = None
+        self.last_delta: Optional[float] = None
+        self.deltas = 0
+        self.max_gap = 0.0
+        self.finished = False
+
+    def chunk(self) -> None:
+        """Mark that an upstream chunk was received."""
+        self.received = self._clock()
+
+    def delta(self) -> None:
+        """Mark that a content delta converted from the last received chunk is about to be yielded."""
+        now = self._clock()
+        self.deltas += 1
+        if self.last_delta is None:
+            self.first_received = self.received
+            self.first_delta = now
+            UPSTREAM_TTFT.observe(self.received - self.started, route=self.route)
+            PROXY_TTFT_OVERHEAD.observe(now - self.received, route=self.route)
+        else:
+            gap = now - self.last_delta
+            if gap > self.max_gap:
+                self.max_gap = gap
+            INTER_TOKEN_GAP.observe(gap, route=self.route)
+        self.last_delta = now
+
+    def finish(self, output_tokens: int = 0) -> None:
+        """Record the output rate and log the summary once; ``output_tokens`` of 0 counts one token per delta."""
+        if self.finished:
+            return
+        self.finished = True
+        tokens = output_tokens or self.deltas
+        parts = [f"Stream {self.request_id} timing: route={self.route}", f"deltas={self.deltas}"]
+        if self.first_delta is not None and self.last_delta is not None and self.first_received is not None:
+            generating = self.last_delta - self.first_delta
+            parts += [
+                f"upstream_ttft_ms={(self.first_received - self.started) * 1000:.1f}",
+                f"proxy_overhead_ms={(self.first_delta - self.first_received) * 1000:.3f}",
+            ]
+            if self.deltas > 1:
+                parts += [
+                    f"gap_mean_ms={generating / (self.deltas - 1) * 1000:.1f}",
+                    f"gap_max_ms={self.max_gap * 1000:.1f}",
+                ]
+            if tokens > 1 and generating > 0:
+                # The first token arrives at first_delta, so the rest were generated after it
+                rate = (tokens - 1) / generating
+                STREAM_TOKENS_PER_SECOND.observe(rate, route=self.route)
+                parts.append(f"tokens_per_second={rate:.1f}")
+        parts.append(f"output_tokens={output_tokens}")
+        logger.info(" ".join(parts))
@@ -0,0 +1,240 @@
+"""Load balancing and health tracking for upstream endpoints.
+
+``OPENAI_BASE_URLS`` lists the upstreams as ``url|weight`` entries (a single
+``OPENAI_BASE_URL`` is a pool of one). Each request attempt is sent to one
+upstream chosen by the configured strategy:
+
+- ``round_robin``: smooth weighted round robin.
+- ``least_outstanding``: fewest in-flight requests relative to weight. A
+  streaming request stays in flight until its response body is closed, so
+  slow replicas accumulate requests and receive fewer new ones.
+- ``ewma``: like ``least_outstanding``, scaled by an exponentially weighted
+  moving average of time to response headers.
+
+Health is tracked passively by a ``CircuitBreaker`` per upstream. Upstreams
+whose circuit is open are skipped, so requests fail over to the others; if no
+circuit admits the request, ``CircuitOpenError`` is raised at once instead of
+waiting on an upstream that is known to be failing.
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Tuple
+
+import httpx
+
+from .breaker import OPEN, CircuitBreaker, CircuitOpenError
+from .config import Settings
+from .metrics import REGISTRY
+from .pool import _ReleasingStream
+from .shared import SharedTable
+from .telemetry import UPSTREAM_TTFB
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("round_robin", "least_outstanding", "ewma")
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "claude_proxy_upstream_requests_total",
+    "Upstream request attempts by upstream and outcome",
+    ("upstream", "outcome"),
+)
+
+
+def parse_upstreams(value: str) -> List[Tuple[str, float]]:
+    """Parse ``"url|weight, url, ..."`` into ``(url, weight)`` pairs (weight defaults to 1)."""
+    upstreams: List[Tuple[str, float]] = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, weight = entry.partition("|")
+        weight_value = float(weight) if weight.strip() else 1.0
+        if weight_value <= 0:
+            raise ValueError(f"Upstream weight must be positive: {entry!r}")
+        upstreams.append((url.strip().rstrip("/"), weight_value))
+    return upstreams
+
+
+class Upstream:
+    """One upstream base URL with its load and health state."""
+
+    def __init__(self, base_url: str, weight: float = 1.0, breaker: Optional[CircuitBreaker] = None):
+        """Initialize an idle upstream with a closed circuit."""
+        self.base_url = base_url
+        self.weight = weight
+        self.breaker = breaker or CircuitBreaker(base_url)
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.current_weight = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return load and health statistics."""
+        return {
+            "weight": self.weight,
+            "circuit": self.breaker.stats(),
+            "outstanding": self.outstanding,
+            "latency_ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class UpstreamPool:
+    """Weighted set of upstreams that picks one per request attempt."""
+
+    def __init__(
+        self,
+        upstreams: List[Upstream],
+        get_client: Callable[[str], httpx.AsyncClient],
+        strategy: str = "least_outstanding",
+        ewma_alpha: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the pool; ``get_client`` returns the pooled client for a base URL."""
+        if not upstreams:
+            raise ValueError("UpstreamPool needs at least one upstream")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.upstreams = upstreams
+        self.get_client = get_client
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self._clock = clock
+        self._offset = 0
+
+    def _score(self, upstream: Upstream, default_latency: float) -> float:
+        load = (upstream.outstanding + 1) / upstream.weight
+        if self.strategy != "ewma":
+            return load
+        return load * (upstream.ewma if upstream.ewma is not None else default_latency)
+
+    def _round_robin(self, candidates: List[Upstream]) -> Upstream:
+        total = 0.0
+        best = candidates[0]
+        for upstream in candidates:
+            upstream.current_weight += upstream.weight
+            total += upstream.weight
+            if upstream.current_weight > best.current_weight:
+                best = upstream
+        best.current_weight -= total
+        return best
+
+    def pick(self, avoid: Collection[str] = ()) -> Upstream:
+        """Choose the upstream for the next attempt; raise ``CircuitOpenError`` if every circuit is open.
+
+        Upstreams in ``avoid`` are only chosen when no other one is available.
+        """
+        candidates = [upstream for upstream in self.upstreams if upstream.breaker.available()]
+        if not candidates:
+            retry_after = min(upstream.breaker.retry_after() for upstream in self.upstreams)
+            raise CircuitOpenError(
+                f"All upstream circuits are open ({', '.join(u.base_url for u in self.upstreams)})",
+                retry_after,
+            )
+        if avoid:
+            candidates = [upstream for upstream in candidates if upstream.base_url not in avoid] or candidates
+        if self.strategy == "round_robin" or len(candidates) == 1:
+            return self._round_robin(candidates)
+        if self.strategy == "ewma":
+            # Upstreams without a latency sample yet are assumed to be average
+            measured = [upstream.ewma for upstream in candidates if upstream.ewma is not None]
+            default_latency = sum(measured) / len(measured) if measured else 1.0
+        else:
+            default_latency = 1.0
+        # Rotate the scan start so ties are spread evenly
+        self._offset = (self._offset + 1) % len(candidates)
+        best = candidates[self._offset]
+        best_score = self._score(best, default_latency)
+        for upstream in candidates[self._offset + 1:] + candidates[:self._offset]:
+            score = self._score(upstream, default_latency)
+            if score < best_score:
+                best, best_score = upstream, score
+        return best
+
+    def _release(self, upstream: Upstream) -> None:
+        upstream.outstanding -= 1
+
+    def _record(self, upstream: Upstream, ok: bool, latency: Optional[float]) -> None:
+        upstream.requests += 1
+        if latency is not None:
+            upstream.ewma = latency if upstream.ewma is None else (
+                upstream.ewma + self.ewma_alpha * (latency - upstream.ewma)
+            )
+        if not ok:
+            upstream.failures += 1
+        UPSTREAM_REQUESTS.inc(upstream=upstream.base_url, outcome="success" if ok else "failure")
+        state = upstream.breaker.state
+        upstream.breaker.record(ok, latency)
+        if upstream.breaker.state != state:
+            log = logger.warning if upstream.breaker.state == OPEN else logger.info
+            log(f"Upstream {upstream.base_url} circuit is now {upstream.breaker.state}")
+
+    async def send(
+        self,
+        send: Callable[[str, httpx.AsyncClient], Awaitable[httpx.Response]],
+        avoid: Collection[str] = (),
+    ) -> httpx.Response:
+        """Call ``send(base_url, client)`` on the chosen upstream and track the attempt.
+
+        The upstream counts as busy until the response body is closed, so
+        streaming responses are accounted for their whole duration.
+        """
+        upstream = self.pick(avoid)
+        probe = upstream.breaker.on_start()
+        upstream.outstanding += 1
+        start = self._clock()
+        try:
+            response = await send(upstream.base_url, self.get_client(upstream.base_url))
+        except BaseException as e:
+            self._release(upstream)
+            if isinstance(e, Exception):
+                self._record(upstream, False, None)
+            else:
+                # Cancelled (client disconnect, hedge loser): no outcome, so free the probe slot
+                upstream.breaker.on_cancel(probe)
+            raise
+        latency = self._clock() - start
+        UPSTREAM_TTFB.observe(latency, upstream=upstream.base_url)
+        self._record(upstream, response.status_code < 500, latency)
+        if response.is_closed:
+            self._release(upstream)
+        else:
+            response.stream = _ReleasingStream(response.stream, lambda: self._release(upstream))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-upstream statistics for the health endpoint."""
+        return {
+            "strategy": self.strategy,
+            "upstreams": {upstream.base_url: upstream.stats() for upstream in self.upstreams},
+        }
+
+
+def build_upstream_pool(
+    base_urls: str,
+    settings: Settings,
+    get_client: Callable[[str], httpx.AsyncClient],
+    table: Optional[SharedTable] = None,
+) -> UpstreamPool:
+    """Build a pool over ``base_urls`` (``url|weight`` list) with circuit breakers from settings.
+
+    With a shared ``table`` the circuit breakers are shared across workers.
+    """
+    upstreams = [
+        Upstream(url, weight, CircuitBreaker(
+            url,
+            error_rate=settings.circuit_error_rate,
+            window=settings.circuit_window,
+            min_requests=settings.circuit_min_requests,
+            consecutive_failures=settings.circuit_consecutive_failures,
+            slow_call_seconds=settings.circuit_slow_call_seconds,
+            open_seconds=settings.circuit_open_seconds,
+            half_open_probes=settings.circuit_half_open_probes,
+            table=table,
+        ))
+        for url, weight in parse_upstreams(base_urls)
+    ]
+    return UpstreamPool(upstreams, get_client, strategy=settings.balance_strategy)
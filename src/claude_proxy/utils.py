@@ -1,19 +1,53 @@
 """Utility functions for Claude API Proxy."""
 
+import atexit
+import hashlib
+import json
 import logging
 import sys
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
+from .log_pipeline import LogPipeline, build_formatter, build_log_pipeline
 
-def setup_logging(log_level: str = "INFO") -> None:
-    """Setup application logging."""
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+try:
+    import orjson  # optional fast JSON parser
+except ImportError:
+    orjson = None
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    log_format: str = "text",
+    queue_size: int = 10000
+) -> Optional[LogPipeline]:
+    """Setup application logging.
+    
+    Records are written to stdout by a background thread fed through a bounded
+    queue (dropping on overflow), unless ``queue_size`` is 0. Returns the running
+    pipeline, or ``None`` when logging is synchronous or was already configured.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(build_formatter(log_format))
+    pipeline = build_log_pipeline(stream_handler, queue_size)
+    handler = pipeline.handler if pipeline else stream_handler
+    logging.basicConfig(level=getattr(logging, log_level.upper()), handlers=[handler])
+    if pipeline is None or handler not in logging.getLogger().handlers:
+        return None
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    return pipeline
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        # json.loads(bytes) sniffs the encoding first; JSON on the wire is UTF-8
+        data = data.decode("utf-8")
+    return json.loads(data)
 
 
 def generate_request_id() -> str:
@@ -61,6 +95,11 @@ def extract_proxy_auth_key(headers: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key into an identifier (e.g. a rate-limit key) that does not reveal it."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
 def validate_api_key(client_key: Optional[str], expected_key: Optional[str]) -> bool:
     """Validate client API key against expected key."""
     if expected_key is None:
@@ -0,0 +1,273 @@
+"""
+转换性能基准
+复用conversion_runner加载的JSONC案例，测量convert_request、convert_response和流式转换的吞吐量，
+并与保存的基线比较，吞吐量下降超过阈值时以非零状态退出
+
+    python -m tests.unit.conversion_bench                    # 与基线比较
+    python -m tests.unit.conversion_bench --update-baseline  # 重新生成基线
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import httpx
+
+from src.claude_proxy.models.claude import ClaudeMessagesRequest
+from src.claude_proxy.providers.openai import OpenAIProvider
+from .conversion_runner import ConversionCaseLoader, ConversionTestCase
+
+CASES_DIR = Path(__file__).parent / "convert_cases"
+BASELINE_PATH = Path(__file__).parent / "conversion_bench_baseline.json"
+
+# 与test_convert.py相同的测试环境变量，可被case.env覆盖
+BENCH_ENV = {
+    'OPENAI_API_KEY': 'sk-test-key-12345',
+    'OPENAI_BASE_URL': 'https://api.openai.com/v1',
+    'CLAUDE_PROXY_BIG_MODEL': 'gpt-4o',
+    'CLAUDE_PROXY_SMALL_MODEL': 'gpt-4o-mini',
+}
+
+DEFAULT_STREAM_REQUEST = {
+    "model": "claude-3-haiku-20240307",
+    "max_tokens": 100,
+    "messages": [{"role": "user", "content": "test"}],
+}
+
+
+@dataclass
+class BenchCase:
+    """基准案例数据类"""
+    name: str
+    kind: str  # request / response / stream
+    claude_request: Optional[Dict[str, Any]]
+    openai_response: Any = None
+    env: Optional[Dict[str, str]] = None
+
+
+def corpus_cases(cases: List[ConversionTestCase]) -> List[BenchCase]:
+    """把正确性案例转换为基准案例，每个案例可产生请求、响应或流式基准"""
+    bench_cases = []
+    for case in sorted(cases, key=lambda case: case.file_path):
+        name = f"{case.category}::{case.file_name}"
+        if case.claude_request:
+            bench_cases.append(BenchCase(f"request::{name}", "request", case.claude_request, env=case.env))
+        if isinstance(case.openai_response, list):
+            bench_cases.append(BenchCase(f"stream::{name}", "stream", case.claude_request, case.openai_response, case.env))
+        elif case.openai_response:
+            bench_cases.append(BenchCase(f"response::{name}", "response", case.claude_request, case.openai_response, case.env))
+    return bench_cases
+
+
+def _tool_turns(count: int, result_bytes: int) -> List[Dict[str, Any]]:
+    """生成count轮tool_use/tool_result对话"""
+    output = ("line of tool output\n" * (result_bytes // 20 + 1))[:result_bytes]
+    turns: List[Dict[str, Any]] = []
+    for i in range(count):
+        tool_id = f"toolu_{i:04d}"
+        turns.append({"role": "assistant", "content": [
+            {"type": "text", "text": f"Step {i}: reading the next file."},
+            {"type": "tool_use", "id": tool_id, "name": "Read", "input": {"file_path": f"/src/module_{i}.py"}},
+        ]})
+        turns.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": output},
+        ]})
+    return turns
+
+
+def _tools(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": f"tool_{i}",
+            "description": f"Tool number {i}. " + "Usage notes for the model. " * 10,
+            "input_schema": {
+                "type": "object",
+                "properties": {"path": {"type": "string"}, "content": {"type": "string"}},
+                "required": ["path"],
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def scaled_cases(cases: List[ConversionTestCase]) -> List[BenchCase]:
+    """基于语料生成放大变体：10x/100x消息、大tool_result、大量工具、长流式响应"""
+    by_name = {case.file_name: case for case in cases}
+    bench_cases = []
+
+    base = by_name.get("multi_turn")
+    if base and base.claude_request:
+        for factor in (10, 100):
+            request = copy.deepcopy(base.claude_request)
+            request["messages"] = request["messages"] * factor
+            bench_cases.append(BenchCase(f"request::scaled::messages_x{factor}", "request", request, env=base.env))
+
+    base = by_name.get("simple_request")
+    if base and base.claude_request:
+        # 最后一条用户消息之后追加工具轮次，保持user/assistant交替
+        request = copy.deepcopy(base.claude_request)
+        request["messages"] = request["messages"] + _tool_turns(4, 256 * 1024)
+        bench_cases.append(BenchCase("request::scaled::tool_result_256kb", "request", request, env=base.env))
+
+        request = copy.deepcopy(base.claude_request)
+        request["tools"] = _tools(200)
+        bench_cases.append(BenchCase("request::scaled::tools_200", "request", request, env=base.env))
+
+    base = by_name.get("streaming_response")
+    if base and isinstance(base.openai_response, list):
+        # 重复中间的内容chunk，保留首个role chunk和结尾chunk
+        chunks = base.openai_response
+        for factor in (10, 100):
+            scaled = chunks[:1] + chunks[1:-1] * factor + chunks[-1:]
+            bench_cases.append(BenchCase(f"stream::scaled::chunks_x{factor}", "stream", base.claude_request, scaled, base.env))
+    return bench_cases
+
+
+def _stream_client(chunks: List[Dict[str, Any]]) -> httpx.AsyncClient:
+    """返回流式输出给定OpenAI chunk的HTTP客户端"""
+    body = b"".join(f"data: {json.dumps(chunk)}\n\n".encode("utf-8") for chunk in chunks) + b"data: [DONE]\n\n"
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+
+
+def _best_rate(run: Callable[[int], float], min_time: float, repeats: int) -> float:
+    """校准迭代次数使单次测量至少min_time秒，返回repeats次中最高的每秒操作数"""
+    iterations = 1
+    while True:
+        elapsed = run(iterations)
+        if elapsed >= min_time:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed * 1.2) + 1))
+    best = iterations / elapsed
+    for _ in range(repeats - 1):
+        best = max(best, iterations / run(iterations))
+    return best
+
+
+def measure(case: BenchCase, min_time: float = 0.2, repeats: int = 3) -> float:
+    """测量单个案例的吞吐量（次/秒）"""
+    with patch.dict(os.environ, {**BENCH_ENV, **(case.env or {})}, clear=False):
+        # 清除缓存的设置并重新加载配置
+        import src.claude_proxy.config as config_module
+        config_module._settings = None
+
+        if case.kind == "stream":
+            return _measure_stream(case, min_time, repeats)
+
+        provider = OpenAIProvider(api_key="test-key", base_url="https://api.openai.com/v1", timeout=30)
+        request = ClaudeMessagesRequest(**case.claude_request) if case.claude_request else None
+
+        if case.kind == "request":
+            def call() -> None:
+                provider.convert_request(request)
+        else:
+            def call() -> None:
+                provider.convert_response(case.openai_response, request)
+
+        def run(iterations: int) -> float:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            return time.perf_counter() - start
+
+        return _best_rate(run, min_time, repeats)
+
+
+def _measure_stream(case: BenchCase, min_time: float, repeats: int) -> float:
+    client = _stream_client(case.openai_response)
+    provider = OpenAIProvider(api_key="test-key", base_url="https://api.openai.com/v1", timeout=30, client=client)
+    request = ClaudeMessagesRequest(**(case.claude_request or DEFAULT_STREAM_REQUEST))
+
+    async def consume(iterations: int) -> float:
+        start = time.perf_counter()
+        for i in range(iterations):
+            async for _ in provider.stream_complete(request, f"bench-{i}"):
+                pass
+        return time.perf_counter() - start
+
+    # 每次测量都在同一个事件循环内完成整批迭代
+    loop = asyncio.new_event_loop()
+    try:
+        return _best_rate(lambda iterations: loop.run_until_complete(consume(iterations)), min_time, repeats)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+
+
+def run_benchmark(
+    cases_dir: Path = CASES_DIR,
+    min_time: float = 0.2,
+    repeats: int = 3,
+    name_filter: Optional[str] = None,
+) -> Dict[str, float]:
+    """测量语料和放大变体的全部案例，返回案例名到吞吐量（次/秒）的映射"""
+    cases = ConversionCaseLoader(str(cases_dir)).load_all_cases()
+    results = {}
+    for case in corpus_cases(cases) + scaled_cases(cases):
+        if name_filter and name_filter not in case.name:
+            continue
+        try:
+            results[case.name] = measure(case, min_time, repeats)
+        except Exception as e:
+            # 转换失败由test_convert.py报告，这里只跳过
+            print(f"⚠️ Skipping {case.name}: {type(e).__name__}")
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """返回吞吐量低于基线(1 - threshold)倍的案例说明"""
+    regressions = []
+    for name, expected in sorted(baseline.items()):
+        actual = results.get(name)
+        if actual is not None and actual < expected * (1 - threshold):
+            regressions.append(f"{name}: {actual:,.0f} ops/s vs baseline {expected:,.0f} ({actual / expected - 1:+.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed throughput drop as a fraction")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per measurement")
+    parser.add_argument("--repeats", type=int, default=3, help="measurements per case, the best is kept")
+    parser.add_argument("-k", dest="name_filter", help="only run cases whose name contains this string")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    results = run_benchmark(min_time=args.min_time, repeats=args.repeats, name_filter=args.name_filter)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    for name, rate in results.items():
+        reference = baseline.get(name)
+        change = f"{rate / reference - 1:+7.1%}" if reference else "    new"
+        print(f"{name:<50} {rate:>12,.0f} ops/s  {change}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.update_baseline or not baseline:
+        args.baseline.write_text(json.dumps({name: round(rate, 1) for name, rate in results.items()}, indent=2, sort_keys=True) + "\n")
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"❌ Throughput regressed more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print(f"✅ No case regressed more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Tests for admission control and load shedding."""
+
+import asyncio
+import importlib
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+from src.claude_proxy.admission import (
+    ADMISSION_SHED,
+    AdmissionController,
+    ConcurrencyLimiter,
+    FairQueueLimiter,
+    OverloadedError,
+)
+
+main_module = importlib.import_module("src.claude_proxy.main")
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_order():
+    """Test that requests over the limit queue and take freed slots first come, first served."""
+    limiter = ConcurrencyLimiter("big", limit=1, queue_size=2)
+    await limiter.acquire(1)
+    order = []
+
+    async def wait(name):
+        await limiter.acquire(1)
+        order.append(name)
+
+    waiters = [asyncio.ensure_future(wait("first")), asyncio.ensure_future(wait("second"))]
+    await asyncio.sleep(0)
+    assert limiter.stats() == {"limit": 1, "in_flight": 1, "queued": 2}
+
+    limiter.release()
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*waiters)
+
+    assert order == ["first", "second"]
+    assert limiter.stats() == {"limit": 1, "in_flight": 1, "queued": 0}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_immediately():
+    """Test that a request is shed without waiting when the queue is full."""
+    limiter = ConcurrencyLimiter("small", limit=1, queue_size=0)
+    await limiter.acquire(1)
+    before = ADMISSION_SHED.value(scope="small", reason="queue_full")
+
+    with pytest.raises(OverloadedError):
+        await limiter.acquire(10)
+
+    assert ADMISSION_SHED.value(scope="small", reason="queue_full") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_sheds_waiter():
+    """Test that a queued request is shed once its deadline passes and leaves the queue."""
+    limiter = ConcurrencyLimiter("big", limit=1, queue_size=5)
+    await limiter.acquire(1)
+    before = ADMISSION_SHED.value(scope="big", reason="timeout")
+
+    with pytest.raises(OverloadedError):
+        await limiter.acquire(0.01)
+
+    assert ADMISSION_SHED.value(scope="big", reason="timeout") == before + 1
+    assert limiter.stats()["queued"] == 0
+    limiter.release()
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_route_slot_is_returned_when_global_limit_sheds():
+    """Test that a request shed by the global limit does not keep its route slot."""
+    global_limiter = ConcurrencyLimiter("global", limit=1, queue_size=0)
+    big = ConcurrencyLimiter("big", limit=5, queue_size=0)
+    controller = AdmissionController(global_limiter, {"big": big})
+    permit = await controller.admit("big")
+
+    with pytest.raises(OverloadedError):
+        await controller.admit("big")
+    assert big.active == 1
+
+    permit.release()
+    permit.release()
+    assert big.active == 0 and global_limiter.active == 0
+
+
+async def admission_order(limiter, requests, slots):
+    """Queue ``(route, key)`` requests behind a held slot and return the order of the first ``slots`` admitted."""
+    await limiter.acquire(1)
+    order = []
+
+    async def wait(route, key):
+        await limiter.acquire(1, route, key)
+        order.append((route, key))
+
+    waiters = [asyncio.ensure_future(wait(route, key)) for route, key in requests]
+    await asyncio.sleep(0)
+    for _ in range(slots):
+        limiter.release()
+        await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_wfq_shares_slots_by_route_weight():
+    """Test that backlogged routes are admitted in proportion to their weights, without starving either."""
+    limiter = FairQueueLimiter("global", limit=1, queue_size=100, weights={"big": 3, "small": 1})
+    requests = [("small", None)] * 10 + [("big", None)] * 10
+
+    order = await admission_order(limiter, requests, 8)
+
+    assert [route for route, _ in order].count("big") == 6
+    assert [route for route, _ in order].count("small") == 2
+
+
+@pytest.mark.asyncio
+async def test_wfq_idle_route_does_not_bank_credit():
+    """Test that a route returning from idle gets its weighted share, not a burst of catch-up slots."""
+    limiter = FairQueueLimiter("global", limit=1, queue_size=100, weights={"big": 3, "small": 1})
+    await admission_order(limiter, [("small", None)] * 10, 10)
+    limiter.release()
+
+    order = await admission_order(limiter, [("small", None)] * 10 + [("big", None)] * 10, 8)
+
+    # Big starts at the current virtual time, so small keeps at most one slot of lead
+    assert [route for route, _ in order].count("big") <= 7
+    assert [route for route, _ in order].count("small") >= 1
+
+
+@pytest.mark.asyncio
+async def test_wfq_round_robins_client_keys():
+    """Test that with per-key fairness one client's backlog does not delay another client."""
+    limiter = FairQueueLimiter("global", limit=1, queue_size=100, weights={}, per_key=True)
+    requests = [("small", "a")] * 3 + [("small", "b")]
+
+    order = await admission_order(limiter, requests, 4)
+
+    assert [key for _, key in order] == ["a", "b", "a", "a"]
+
+
+class Provider:
+    """Fake provider streaming a fixed event."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def stream_complete(self, request, request_id):
+        yield b"event: ping\ndata: {}\n\n"
+
+
+def test_shed_request_gets_529_overloaded_error():
+    """Test that the endpoint answers a shed request with a Claude overloaded_error."""
+    admission = AdmissionController(ConcurrencyLimiter("global", limit=0, queue_size=0), {})
+
+    with patch.object(main_module, "admission", admission):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 529
+    assert response.json() == {
+        "type": "error",
+        "error": {"type": "overloaded_error", "message": "Too many concurrent global requests, please retry later"},
+    }
+
+
+def test_streaming_request_releases_slot_when_done():
+    """Test that a streaming request holds its slot until the stream has been sent."""
+    limiter = ConcurrencyLimiter("small", limit=1, queue_size=0)
+    admission = AdmissionController(None, {"small": limiter})
+
+    with patch.object(main_module, "admission", admission), \
+            patch.object(main_module, "get_provider", return_value=Provider()):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-haiku-20241022",
+            "max_tokens": 10,
+            "stream": True,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 200
+    assert response.content == b"event: ping\ndata: {}\n\n"
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_streaming_slot_released_when_client_disconnects_before_first_chunk():
+    """Test that the slot comes back when sending fails before the stream body is first read."""
+    limiter = ConcurrencyLimiter("small", limit=1, queue_size=0)
+    admission = AdmissionController(None, {"small": limiter})
+    body = b'{"model": "claude-3-5-haiku-20241022", "max_tokens": 10, "stream": true, ' \
+        b'"messages": [{"role": "user", "content": "Hello"}]}'
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/v1/messages", "raw_path": b"/v1/messages",
+        "root_path": "", "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("Connection reset by peer")
+
+    with patch.object(main_module, "admission", admission), \
+            patch.object(main_module, "get_provider", return_value=Provider()):
+        with pytest.raises(ClientDisconnect):
+            await main_module.app(scope, receive, send)
+
+    assert limiter.active == 0
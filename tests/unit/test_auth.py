@@ -190,6 +190,8 @@ class TestGetProvider:
     def test_get_provider_fixed_api_key_mode(self):
         """Test provider creation in Fixed API Key Mode."""
         with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module, 'fixed_provider', None), \
+             patch.object(main_module, 'client_pool') as mock_pool, \
              patch.object(main_module, 'OpenAIProvider') as mock_provider_class:
             # Mock settings with fixed API key
             mock_settings.openai_api_key = "sk-server-fixed-key"
@@ -203,12 +205,18 @@ class TestGetProvider:
             mock_provider_class.assert_called_once_with(
                 api_key="sk-server-fixed-key",
                 base_url="https://api.test.com/v1",
-                timeout=90
+                timeout=90,
+                client=mock_pool.get_client.return_value,
+                retrier=main_module.retrier,
+                upstreams=main_module.upstream_pool,
+                hedger=main_module.hedger
             )
     
     def test_get_provider_fixed_api_key_mode_no_client_key(self):
         """Test provider creation in Fixed API Key Mode without client key."""
         with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module, 'fixed_provider', None), \
+             patch.object(main_module, 'client_pool') as mock_pool, \
              patch.object(main_module, 'OpenAIProvider') as mock_provider_class:
             # Mock settings with fixed API key
             mock_settings.openai_api_key = "sk-server-fixed-key"
@@ -222,12 +230,17 @@ class TestGetProvider:
             mock_provider_class.assert_called_once_with(
                 api_key="sk-server-fixed-key",
                 base_url="https://api.test.com/v1",
-                timeout=90
+                timeout=90,
+                client=mock_pool.get_client.return_value,
+                retrier=main_module.retrier,
+                upstreams=main_module.upstream_pool,
+                hedger=main_module.hedger
             )
     
     def test_get_provider_passthrough_mode_with_client_key(self):
         """Test provider creation in Passthrough Mode with client key."""
         with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module, 'client_pool') as mock_pool, \
              patch.object(main_module, 'OpenAIProvider') as mock_provider_class:
             # Mock settings without fixed API key (passthrough mode)
             mock_settings.openai_api_key = None
@@ -241,7 +254,11 @@ class TestGetProvider:
             mock_provider_class.assert_called_once_with(
                 api_key="sk-client-provided-key",
                 base_url="https://api.test.com/v1",
-                timeout=90
+                timeout=90,
+                client=mock_pool.get_client.return_value,
+                retrier=main_module.retrier,
+                upstreams=main_module.upstream_pool,
+                hedger=main_module.hedger
             )
     
     def test_get_provider_passthrough_mode_no_client_key(self):
@@ -281,4 +298,35 @@ class TestGetProvider:
                 get_provider(None)
             
             assert exc_info.value.status_code == 500
-            assert "No API key available" in exc_info.value.detail
\ No newline at end of file
+            assert "No API key available" in exc_info.value.detail    
+    def test_get_provider_uses_shared_client_pool(self):
+        """Test that Fixed API Key Mode reuses one provider borrowing the shared pooled client."""
+        with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module, 'fixed_provider', None):
+            mock_settings.openai_api_key = "sk-server-fixed-key"
+            mock_settings.openai_base_url = "https://api.test.com/v1"
+            mock_settings.request_timeout = 90
+            
+            first = get_provider(None)
+            second = get_provider("sk-client-key")
+            
+            assert first is second
+            assert first.client is main_module.client_pool.get_client("https://api.test.com/v1")
+            assert first.owns_client is False
+
+    def test_get_provider_passthrough_mode_keeps_no_keys(self):
+        """Test that Passthrough Mode builds a provider per request on the shared client and keeps no key."""
+        with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module, 'fixed_provider', None):
+            mock_settings.openai_api_key = None
+            mock_settings.openai_base_url = "https://api.test.com/v1"
+            mock_settings.request_timeout = 90
+            
+            first = get_provider("sk-client-a")
+            other = get_provider("sk-client-b")
+            
+            assert first is not other
+            assert first.api_key == "sk-client-a"
+            assert other.api_key == "sk-client-b"
+            assert first.client is other.client
+            assert main_module.fixed_provider is None
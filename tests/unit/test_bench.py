@@ -0,0 +1,68 @@
+"""Tests for the load benchmark."""
+
+import json
+import random
+
+import httpx
+import pytest
+
+from src.claude_proxy.bench import SCENARIOS, build_request, parse_mix, percentiles, run_load, summarize
+from src.claude_proxy.models.claude import ClaudeMessagesRequest
+
+STREAM = (
+    b"event: message_start\ndata: {}\n\n"
+    b"event: content_block_delta\ndata: {}\n\n"
+    b"event: message_stop\ndata: {}\n\n"
+)
+
+
+def test_parse_mix_and_percentiles():
+    """Test mix parsing, including rejected scenarios, and percentiles in milliseconds."""
+    assert parse_mix("agentic=3, background") == {"agentic": 3.0, "background": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("batch=1")
+    with pytest.raises(ValueError):
+        parse_mix("agentic=0")
+
+    figures = percentiles([i / 1000 for i in range(1, 101)])
+    assert figures == {"p50": 51.0, "p95": 96.0, "p99": 100.0, "mean": 50.5, "max": 100.0}
+    assert percentiles([]) is None
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_requests_are_valid_messages(scenario):
+    """Test that every scenario builds a valid /v1/messages body."""
+    body = build_request(scenario, random.Random(0))
+
+    request = ClaudeMessagesRequest(**body)
+
+    assert request.stream is (scenario != "background")
+    assert bool(request.tools) is (scenario != "background")
+
+
+@pytest.mark.asyncio
+async def test_run_load_and_summary():
+    """Test that a fixed number of requests is sent and summarized per scenario with TTFT for streams."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        seen.append(body["model"])
+        if body.get("stream"):
+            return httpx.Response(200, content=STREAM, headers={"content-type": "text/event-stream"})
+        if len(seen) % 2:
+            return httpx.Response(529, json={"type": "error"})
+        return httpx.Response(200, json={"type": "message"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        results, elapsed = await run_load(
+            client, "http://proxy/v1/messages", {"agentic": 1, "background": 1}, concurrency=4, requests=40,
+        )
+
+    summary = summarize(results, elapsed)
+    assert len(seen) == summary["requests"] == 40
+    agentic, background = summary["scenarios"]["agentic"], summary["scenarios"]["background"]
+    assert agentic["errors"] == 0 and agentic["ttft_ms"] is not None
+    assert background["ttft_ms"] is None
+    assert summary["errors"] == background["errors"] == summary["statuses"].get("529", 0)
+    assert agentic["requests"] + background["requests"] == 40
@@ -0,0 +1,133 @@
+"""Tests for circuit breakers."""
+
+import asyncio
+import importlib
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.claude_proxy.breaker import CIRCUIT_STATE, CircuitBreaker
+from src.claude_proxy.providers.openai import OpenAIProvider
+from src.claude_proxy.upstream import Upstream, UpstreamPool
+
+main_module = importlib.import_module("src.claude_proxy.main")
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_opens_on_consecutive_failures():
+    """Test that failures in a row open the circuit."""
+    breaker = CircuitBreaker("http://a", consecutive_failures=3, clock=Clock())
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.available()
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.available()
+    assert CIRCUIT_STATE.value(upstream="http://a") == 2
+
+
+def test_opens_on_error_rate():
+    """Test that the failure rate over the window opens the circuit once enough requests were seen."""
+    breaker = CircuitBreaker("http://b", error_rate=0.5, window=10, min_requests=6, consecutive_failures=100, clock=Clock())
+    for ok in (True, False, True, False, True):
+        breaker.record(ok)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+
+
+def test_slow_calls_count_as_failures():
+    """Test that a response slower than the threshold counts as a failure."""
+    breaker = CircuitBreaker("http://c", consecutive_failures=2, slow_call_seconds=5.0, clock=Clock())
+    breaker.record(True, latency=1.0)
+    breaker.record(True, latency=6.0)
+    breaker.record(True, latency=7.0)
+    assert breaker.state == "open"
+
+
+def test_half_open_probe_closes_or_reopens():
+    """Test the open -> half-open -> closed/open cycle."""
+    clock = Clock()
+    breaker = CircuitBreaker("http://d", consecutive_failures=1, open_seconds=10, half_open_probes=1, clock=clock)
+    breaker.record(False)
+    assert breaker.retry_after() == 10
+
+    clock.now = 10
+    assert breaker.available()
+    assert breaker.state == "half_open"
+    breaker.on_start()
+    assert not breaker.available()
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.available()
+    breaker.on_start()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert CIRCUIT_STATE.value(upstream="http://d") == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_gives_back_its_slot():
+    """Test that a half-open probe cancelled while waiting for headers lets the next request probe."""
+    clock = Clock()
+    breaker = CircuitBreaker("http://e", consecutive_failures=1, open_seconds=10, half_open_probes=1, clock=clock)
+    breaker.record(False)
+    clock.now = 10
+    pool = UpstreamPool([Upstream("http://e", breaker=breaker)], lambda base_url: None)
+    waiting = asyncio.Event()
+
+    async def hang(base_url, client):
+        waiting.set()
+        await asyncio.sleep(60)
+
+    probe = asyncio.ensure_future(pool.send(hang))
+    await waiting.wait()
+    assert not breaker.available()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.state == "half_open"
+    assert breaker.available()
+    response = await pool.send(lambda base_url, client: asyncio.sleep(0, httpx.Response(200)))
+    assert response.status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_returns_503_to_client():
+    """Test that the endpoint fails fast with 503 and Retry-After while the circuit is open."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200)
+
+    breaker = CircuitBreaker("https://upstream.test/v1", consecutive_failures=1, open_seconds=12.5)
+    breaker.record(False)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool = UpstreamPool([Upstream("https://upstream.test/v1", breaker=breaker)], lambda base_url: client)
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", upstreams=pool)
+
+    with patch.object(main_module, "get_provider", return_value=provider):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+    assert calls == []
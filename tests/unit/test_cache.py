@@ -0,0 +1,69 @@
+"""Tests for the LRU cache used for rate-limit buckets."""
+
+from src.claude_proxy.cache import LRUCache
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_and_put():
+    """Test basic lookups and hit/miss accounting."""
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_size_eviction_is_lru():
+    """Test that the least recently used entry is evicted first."""
+    evicted = []
+    cache = LRUCache(max_size=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert evicted == ["b"]
+    assert "a" in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_ttl_eviction():
+    """Test that idle entries expire and active ones are kept."""
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl=60, clock=clock)
+    cache.put("idle", 1)
+    cache.put("active", 2)
+
+    clock.now = 50
+    assert cache.get("active") == 2
+
+    clock.now = 100
+    assert cache.get("idle") is None
+    assert cache.get("active") == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_prune_on_put():
+    """Test that inserts sweep expired entries from the cold end."""
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl=10, clock=clock)
+    for key in ("a", "b", "c"):
+        cache.put(key, key)
+
+    clock.now = 20
+    cache.put("d", "d")
+
+    assert len(cache) == 1
+    assert "d" in cache
@@ -0,0 +1,82 @@
+"""Tests for sampled debug payload capture."""
+
+import logging
+
+import pytest
+
+from src.claude_proxy import capture as capture_module
+from src.claude_proxy.capture import PayloadCapture, RequestCapture
+
+
+@pytest.fixture
+def debug_capture_logger():
+    """Enable the capture logger for DEBUG and restore it afterwards."""
+    logger = logging.getLogger("src.claude_proxy.capture")
+    previous = logger.level
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    logger.setLevel(previous)
+
+
+def test_disabled_by_default():
+    """Test that a zero sample rate never starts a capture."""
+    assert PayloadCapture().start("req-1") is None
+
+
+def test_requires_debug_level():
+    """Test that capture stays off while the capture logger is above DEBUG."""
+    logger = logging.getLogger("src.claude_proxy.capture")
+    previous = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        assert PayloadCapture(sample_rate=1.0).start("req-1") is None
+    finally:
+        logger.setLevel(previous)
+
+
+def test_sampling(debug_capture_logger):
+    """Test that requests are sampled against the configured rate."""
+    values = iter([0.1, 0.9])
+    policy = PayloadCapture(sample_rate=0.5, rng=lambda: next(values))
+
+    assert policy.start("sampled") is not None
+    assert policy.start("skipped") is None
+
+
+def test_unsampled_payload_is_never_formatted(debug_capture_logger):
+    """Test that lazy payloads are not evaluated for unsampled requests."""
+    calls = []
+    capture = PayloadCapture(sample_rate=0.5, rng=lambda: 0.99).start("req-1")
+    if capture:
+        capture.record("claude_request", lambda: calls.append(1))
+
+    assert capture is None
+    assert calls == []
+
+
+def test_record_truncates_and_drops(debug_capture_logger, caplog):
+    """Test the per-request size budget."""
+    capture = RequestCapture("req-1", max_chars=10)
+    with caplog.at_level(logging.DEBUG, logger="src.claude_proxy.capture"):
+        capture.record("openai_request", {"model": "gpt-4o"})
+        capture.record("openai_response", "ignored")
+
+    assert len(caplog.records) == 1
+    record = caplog.records[0]
+    assert record.capture == {"request_id": "req-1", "stage": "openai_request", "size": 19, "truncated": True}
+    assert record.getMessage().endswith('{"model": ')
+    assert capture.dropped == 1
+
+
+def test_configure_capture_enables_logger():
+    """Test that a positive sample rate lowers the capture logger to DEBUG."""
+    logger = logging.getLogger("src.claude_proxy.capture")
+    previous = logger.level
+    try:
+        logger.setLevel(logging.WARNING)
+        policy = capture_module.configure_capture(sample_rate=1.0, max_chars=64)
+        assert policy.enabled
+        assert capture_module.start_capture("req-1").remaining == 64
+    finally:
+        capture_module.configure_capture(sample_rate=0.0, max_chars=8192)
+        logger.setLevel(previous)
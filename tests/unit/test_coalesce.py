@@ -0,0 +1,119 @@
+"""Tests for streaming delta coalescing."""
+
+import asyncio
+
+import pytest
+
+from src.claude_proxy import sse
+from src.claude_proxy.coalesce import coalesce_deltas
+
+
+async def from_list(events):
+    """Async iterator over ready events."""
+    for event in events:
+        yield event
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+@pytest.mark.asyncio
+async def test_first_delta_immediate_rest_merged():
+    """Test that the leading delta is sent alone and the burst behind it is merged."""
+    events = [
+        sse.text_block_start(0),
+        sse.text_delta(0, "Hel"),
+        sse.text_delta(0, "lo, "),
+        sse.text_delta(0, "wörld\n"),
+        sse.block_stop(0),
+        sse.MESSAGE_STOP,
+    ]
+    out = await collect(coalesce_deltas(from_list(events), window=10.0, max_bytes=4096))
+
+    assert out == [
+        sse.text_block_start(0),
+        sse.text_delta(0, "Hel"),
+        sse.text_delta(0, "lo, wörld\n") + sse.block_stop(0),
+        sse.MESSAGE_STOP,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_flushes():
+    """Test that a merged delta is flushed once the byte budget is reached."""
+    events = [sse.text_delta(0, "ab") for _ in range(7)]
+    out = await collect(coalesce_deltas(from_list(events), window=10.0, max_bytes=4))
+
+    assert out == [
+        sse.text_delta(0, "ab"),
+        sse.text_delta(0, "abab"),
+        sse.text_delta(0, "abab"),
+        sse.text_delta(0, "abab"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_different_blocks_not_merged():
+    """Test that deltas for different blocks or delta types stay separate."""
+    events = [
+        sse.text_delta(0, "a"),
+        sse.text_delta(0, "b"),
+        sse.input_json_delta(1, '{"x"'),
+        sse.input_json_delta(1, ": 1}"),
+    ]
+    out = b"".join(await collect(coalesce_deltas(from_list(events), window=10.0, max_bytes=4096)))
+
+    assert out == sse.text_delta(0, "a") + sse.text_delta(0, "b") + sse.input_json_delta(1, '{"x": 1}')
+
+
+@pytest.mark.asyncio
+async def test_window_flushes_while_upstream_stalls():
+    """Test that pending deltas go out when the window elapses, without waiting for upstream."""
+    resume = asyncio.Event()
+
+    async def upstream():
+        yield sse.text_delta(0, "a")
+        yield sse.text_delta(0, "b")
+        yield sse.text_delta(0, "c")
+        await resume.wait()
+        yield sse.text_delta(0, "d")
+
+    stream = coalesce_deltas(upstream(), window=0.01, max_bytes=4096)
+    assert await asyncio.wait_for(stream.__anext__(), 1) == sse.text_delta(0, "a")
+    assert await asyncio.wait_for(stream.__anext__(), 1) == sse.text_delta(0, "bc")
+    resume.set()
+    assert await collect(stream) == [sse.text_delta(0, "d")]
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_propagates():
+    """Test that upstream exceptions reach the consumer after buffered events."""
+    async def upstream():
+        yield sse.text_delta(0, "a")
+        raise RuntimeError("upstream failed")
+
+    stream = coalesce_deltas(upstream(), window=0.01, max_bytes=4096)
+    assert await stream.__anext__() == sse.text_delta(0, "a")
+    with pytest.raises(RuntimeError, match="upstream failed"):
+        await stream.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_closing_consumer_stops_upstream():
+    """Test that closing the coalesced stream cancels and closes the upstream iterator."""
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield sse.text_delta(0, "a")
+            await asyncio.sleep(10)
+            yield sse.text_delta(0, "b")
+        finally:
+            closed.set()
+
+    stream = coalesce_deltas(upstream(), window=0.01, max_bytes=4096)
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert closed.is_set()
@@ -0,0 +1,39 @@
+"""
+转换性能基准测试
+验证基准案例的生成、测量和基线比较
+"""
+
+from .conversion_bench import compare, corpus_cases, measure, scaled_cases
+from .conversion_runner import ConversionCaseLoader
+
+
+def test_corpus_and_scaled_cases():
+    """测试语料案例和放大变体都能生成并测得吞吐量"""
+    cases = ConversionCaseLoader().load_all_cases()
+    bench_cases = {case.name: case for case in corpus_cases(cases) + scaled_cases(cases)}
+
+    assert {
+        "request::basic::multi_turn",
+        "response::basic::simple_response",
+        "stream::advanced::streaming_response",
+        "request::scaled::messages_x100",
+        "request::scaled::tool_result_256kb",
+        "request::scaled::tools_200",
+        "stream::scaled::chunks_x100",
+    } <= set(bench_cases)
+    assert len(bench_cases["request::scaled::messages_x100"].claude_request["messages"]) == 300
+
+    for name in ("request::scaled::tools_200", "response::basic::simple_response", "stream::advanced::streaming_response"):
+        assert measure(bench_cases[name], min_time=0.001, repeats=1) > 0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """测试只有超过阈值的吞吐量下降被报告，新增和缺失的案例被忽略"""
+    baseline = {"slow": 1000.0, "noisy": 1000.0, "removed": 1000.0}
+    results = {"slow": 700.0, "noisy": 900.0, "new": 1.0}
+
+    regressions = compare(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow: 700 ops/s vs baseline 1,000 (-30%)")
+
@@ -247,37 +247,25 @@ class TestConvertCases:
         import json
         from unittest.mock import AsyncMock, MagicMock
         
-        sse_lines = []
+        sse_events = []
         for chunk in openai_chunks:
-            sse_lines.append(f"data: {json.dumps(chunk)}")
-        sse_lines.append("data: [DONE]")
+            sse_events.append(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        sse_events.append(b"data: [DONE]\n\n")
         
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status = MagicMock()
+        mock_response.aclose = AsyncMock()
         
-        async def mock_aiter_lines():
-            for line in sse_lines:
-                yield line
+        async def mock_aiter_bytes():
+            for event in sse_events:
+                yield event
         
-        mock_response.aiter_lines = mock_aiter_lines
-        
-        class MockStreamContext:
-            def __init__(self, response):
-                self.response = response
-            
-            async def __aenter__(self):
-                return self.response
-            
-            async def __aexit__(self, _exc_type, _exc_val, _exc_tb):
-                return None
+        mock_response.aiter_bytes = mock_aiter_bytes
         
         mock_client = AsyncMock()
-        
-        def mock_stream(*_args, **_kwargs):
-            return MockStreamContext(mock_response)
-        
-        mock_client.stream = mock_stream
+        mock_client.build_request = MagicMock()
+        mock_client.send = AsyncMock(return_value=mock_response)
         
         return mock_client
     
@@ -285,6 +273,8 @@ class TestConvertCases:
         """解析provider返回的SSE事件字符串为JSON对象"""
         import json
         
+        if isinstance(sse_event_str, bytes):
+            sse_event_str = sse_event_str.decode("utf-8")
         if not sse_event_str.strip():
             return None
         
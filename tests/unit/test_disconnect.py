@@ -0,0 +1,94 @@
+"""Tests for the client disconnect watchdog."""
+
+import asyncio
+
+import pytest
+
+from src.claude_proxy.disconnect import watch_disconnect
+from src.claude_proxy.metrics import STREAM_CANCELLATIONS
+
+
+class Client:
+    """Fake client connection that can be disconnected by the test."""
+
+    def __init__(self):
+        self.disconnected = False
+        self.checks = 0
+
+    async def is_disconnected(self) -> bool:
+        self.checks += 1
+        return self.disconnected
+
+
+@pytest.mark.asyncio
+async def test_passes_events_through():
+    """Test that a completed stream is relayed unchanged and not counted."""
+    async def upstream():
+        for i in range(5):
+            yield b"event %d" % i
+
+    before = STREAM_CANCELLATIONS.value(reason="client_disconnect")
+    out = [event async for event in watch_disconnect(upstream(), Client().is_disconnected, 0.01)]
+
+    assert out == [b"event %d" % i for i in range(5)]
+    assert STREAM_CANCELLATIONS.value(reason="client_disconnect") == before
+
+
+@pytest.mark.asyncio
+async def test_disconnect_while_upstream_idle_cancels_upstream():
+    """Test that a silent upstream is cancelled once the client disconnects."""
+    client = Client()
+    upstream_closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield b"first"
+            await asyncio.sleep(30)
+            yield b"never"
+        finally:
+            upstream_closed.set()
+
+    before = STREAM_CANCELLATIONS.value(reason="client_disconnect")
+    stream = watch_disconnect(upstream(), client.is_disconnected, 0.01)
+    assert await stream.__anext__() == b"first"
+    client.disconnected = True
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(stream.__anext__(), 1)
+
+    assert upstream_closed.is_set()
+    assert STREAM_CANCELLATIONS.value(reason="client_disconnect") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_while_events_flow():
+    """Test that the connection is still checked when the upstream never pauses."""
+    client = Client()
+
+    async def upstream():
+        while True:
+            await asyncio.sleep(0)
+            yield b"token"
+
+    received = 0
+    async for _ in watch_disconnect(upstream(), client.is_disconnected, 0.01):
+        received += 1
+        if received == 10:
+            client.disconnected = True
+            await asyncio.sleep(0.02)
+
+    assert client.checks >= 1
+
+
+@pytest.mark.asyncio
+async def test_response_closed_is_counted():
+    """Test that a stream closed by the server before completion is counted."""
+    async def upstream():
+        yield b"first"
+        await asyncio.sleep(30)
+
+    before = STREAM_CANCELLATIONS.value(reason="response_closed")
+    stream = watch_disconnect(upstream(), Client().is_disconnected, 10)
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert STREAM_CANCELLATIONS.value(reason="response_closed") == before + 1
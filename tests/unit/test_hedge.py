@@ -0,0 +1,140 @@
+"""Tests for hedged upstream requests."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.claude_proxy.breaker import CircuitBreaker
+from src.claude_proxy.hedge import HEDGES, HEDGES_SUPPRESSED, Hedger, LatencyWindow
+from src.claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest
+from src.claude_proxy.providers.openai import OpenAIProvider
+from src.claude_proxy.upstream import Upstream, UpstreamPool
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+}
+
+
+class Upstreams:
+    """Mock upstreams with a per-host delay and status, recording finished and cancelled requests."""
+
+    def __init__(self, **hosts):
+        self.hosts = hosts
+        self.calls = []
+        self.cancelled = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        delay, status = self.hosts[host]
+        self.calls.append(host)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(host)
+            raise
+        return httpx.Response(status, json=COMPLETION)
+
+    def pool(self) -> UpstreamPool:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        upstreams = [Upstream(f"http://{host}/v1", breaker=CircuitBreaker(host)) for host in self.hosts]
+        return UpstreamPool(upstreams, lambda base_url: client, strategy="round_robin")
+
+
+def make_provider(upstreams: Upstreams, **options) -> OpenAIProvider:
+    """OpenAI provider over the mock upstreams hedging the small route."""
+    options.setdefault("min_samples", 0)
+    options.setdefault("min_delay", 0.02)
+    return OpenAIProvider("sk-test", "http://unused/v1", upstreams=upstreams.pool(), hedger=Hedger(["small"], **options))
+
+
+def small_request() -> ClaudeMessagesRequest:
+    """Non-streaming request on the small route."""
+    return ClaudeMessagesRequest(
+        model="claude-3-5-haiku-20241022",
+        max_tokens=10,
+        messages=[ClaudeMessage(role="user", content="Hello")],
+    )
+
+
+def test_latency_window_quantile():
+    """Test the quantile of recent latencies."""
+    window = LatencyWindow(size=100)
+    assert window.quantile(0.95) is None
+    for i in range(1, 101):
+        window.add(i / 100)
+    assert window.quantile(0.95) == 0.96
+    assert window.quantile(0.5) == 0.51
+
+
+def test_no_hedging_until_enough_samples():
+    """Test that the hedge delay is unknown until the route has enough latency samples."""
+    hedger = Hedger(["small"], min_samples=3, min_delay=0.05)
+    assert hedger.delay("small") is None
+    for latency in (0.01, 0.02, 0.3):
+        hedger.windows["small"].add(latency)
+    assert hedger.delay("small") == 0.3
+    assert not hedger.enabled("big")
+    assert hedger.delay("big") is None
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_to_another_upstream():
+    """Test that a slow primary is raced by a hedge on another upstream and cancelled when it loses."""
+    upstreams = Upstreams(a=(5.0, 200), b=(0.0, 200))
+    provider = make_provider(upstreams)
+    before = HEDGES.value(route="small", winner="hedge")
+
+    response = await asyncio.wait_for(provider.complete(small_request(), "req-1"), timeout=2)
+
+    assert response.content[0].text == "hi"
+    assert upstreams.calls == ["a", "b"]
+    assert upstreams.cancelled == ["a"]
+    assert HEDGES.value(route="small", winner="hedge") == before + 1
+    assert provider.upstreams.upstreams[0].outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_falls_back_to_primary():
+    """Test that the primary response is used when the hedge fails."""
+    upstreams = Upstreams(a=(0.1, 200), b=(0.0, 503))
+    provider = make_provider(upstreams)
+
+    response = await provider.complete(small_request(), "req-2")
+
+    assert response.content[0].text == "hi"
+    assert upstreams.calls == ["a", "b"]
+    assert upstreams.cancelled == []
+
+
+@pytest.mark.asyncio
+async def test_budget_limits_hedges():
+    """Test that slow requests wait for the primary once the hedge budget is spent."""
+    upstreams = Upstreams(a=(0.2, 200), b=(0.2, 200))
+    provider = make_provider(upstreams, budget_ratio=0.0)
+    provider.hedger.budgets["small"]._tokens = 1.0
+    before = HEDGES_SUPPRESSED.value(route="small")
+
+    await asyncio.gather(
+        provider.complete(small_request(), "req-3"),
+        provider.complete(small_request(), "req-4"),
+    )
+
+    assert len(upstreams.calls) == 3
+    assert HEDGES_SUPPRESSED.value(route="small") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_other_routes_are_not_hedged():
+    """Test that requests on routes without hedging are sent once."""
+    upstreams = Upstreams(a=(0.05, 200), b=(0.0, 200))
+    provider = make_provider(upstreams)
+    request = small_request()
+    request.model = "claude-3-5-sonnet-20241022"
+
+    await provider.complete(request, "req-5")
+
+    assert upstreams.calls == ["a"]
@@ -0,0 +1,125 @@
+"""Tests for the non-blocking log pipeline."""
+
+import json
+import logging
+import threading
+
+import pytest
+
+from src.claude_proxy.log_pipeline import JsonFormatter, LogPipeline, build_formatter, build_log_pipeline
+
+
+class BlockingHandler(logging.Handler):
+    """Handler that collects records, optionally stalling until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.gate = threading.Event()
+
+    def emit(self, record):
+        self.gate.wait(timeout=5)
+        self.records.append(self.format(record))
+
+
+@pytest.fixture
+def make_logger():
+    """Create an isolated logger writing through a pipeline."""
+    loggers = []
+
+    def factory(pipeline):
+        logger = logging.getLogger(f"test_log_pipeline.{len(loggers)}")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(pipeline.handler)
+        loggers.append(logger)
+        return logger
+
+    yield factory
+    for logger in loggers:
+        logger.handlers.clear()
+
+
+def test_slow_writer_does_not_block_callers(make_logger):
+    """Test that log calls return while the writer is stalled, and stop flushes them."""
+    sink = BlockingHandler()
+    pipeline = LogPipeline([sink], queue_size=100)
+    pipeline.start()
+    logger = make_logger(pipeline)
+
+    for i in range(10):
+        logger.info("message %d", i)
+    assert pipeline.handler.enqueued == 10
+
+    sink.gate.set()
+    pipeline.stop()
+    assert sink.records == [f"message {i}" for i in range(10)]
+
+
+def test_overflow_drops_and_counts(make_logger):
+    """Test the drop-on-overflow policy and its counters."""
+    pipeline = LogPipeline([BlockingHandler()], queue_size=2)
+    logger = make_logger(pipeline)
+
+    logger.info("one")
+    logger.info("two")
+    logger.warning("three")
+
+    stats = pipeline.stats()
+    assert stats["enqueued"] == 2
+    assert stats["dropped"] == 1
+    assert stats["dropped_by_level"] == {"WARNING": 1}
+    assert stats["queued"] == 2
+
+
+def test_stop_with_full_queue():
+    """Test that stopping drains a full queue instead of failing on the sentinel."""
+    sink = BlockingHandler()
+    sink.gate.set()
+    pipeline = LogPipeline([sink], queue_size=1)
+    record = logging.makeLogRecord({"msg": "queued before start", "levelno": logging.INFO, "levelname": "INFO"})
+    pipeline.handler.handle(record)
+    pipeline.start()
+    pipeline.stop()
+
+    assert sink.records == ["queued before start"]
+
+
+def test_json_formatter_includes_extra_fields():
+    """Test JSON line output, including structured ``extra`` fields."""
+    record = logging.makeLogRecord({
+        "name": "claude_proxy.capture", "levelno": logging.DEBUG, "levelname": "DEBUG",
+        "msg": "captured %s", "args": ("payload",), "capture": {"stage": "openai_request"},
+    })
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "DEBUG"
+    assert entry["logger"] == "claude_proxy.capture"
+    assert entry["message"] == "captured payload"
+    assert entry["capture"] == {"stage": "openai_request"}
+    assert entry["timestamp"].endswith("+00:00")
+
+
+def test_exception_survives_queue(make_logger):
+    """Test that tracebacks are rendered before records cross the queue."""
+    sink = BlockingHandler()
+    sink.setFormatter(build_formatter("json"))
+    sink.gate.set()
+    pipeline = LogPipeline([sink], queue_size=10)
+    pipeline.start()
+    logger = make_logger(pipeline)
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    pipeline.stop()
+
+    entry = json.loads(sink.records[0])
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_queue_disabled():
+    """Test that a zero queue size means synchronous logging."""
+    assert build_log_pipeline(logging.NullHandler(), 0) is None
+    assert isinstance(build_formatter("text"), logging.Formatter)
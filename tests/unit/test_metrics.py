@@ -0,0 +1,84 @@
+"""Tests for in-process metrics."""
+
+import pytest
+
+from src.claude_proxy.metrics import MetricsRegistry
+
+
+def test_counter_labels():
+    """Test labelled counter increments and snapshot output."""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("route", "status"))
+    counter.inc(route="big", status="200")
+    counter.inc(2, route="big", status="200")
+    counter.inc(route="small", status="429")
+
+    assert counter.value(route="big", status="200") == 3
+    assert counter.value(route="small", status="500") == 0
+    assert registry.snapshot() == {
+        "requests_total": {"route=big,status=200": 3, "route=small,status=429": 1}
+    }
+
+
+def test_counter_rejects_wrong_labels():
+    """Test that label names must match the declaration."""
+    counter = MetricsRegistry().counter("errors_total", "Errors", ("reason",))
+    with pytest.raises(ValueError):
+        counter.inc(kind="timeout")
+
+
+def test_registry_returns_existing_counter():
+    """Test that registering a name twice returns the same counter."""
+    registry = MetricsRegistry()
+    assert registry.counter("x_total", "X") is registry.counter("x_total", "X")
+
+
+def test_gauge_set_and_type_conflict():
+    """Test that gauges hold the last value and names cannot be reused for another type."""
+    registry = MetricsRegistry()
+    gauge = registry.gauge("state", "State", ("upstream",))
+    gauge.set(2, upstream="a")
+    gauge.set(0, upstream="a")
+
+    assert gauge.value(upstream="a") == 0
+    with pytest.raises(ValueError):
+        registry.counter("state", "State", ("upstream",))
+
+
+def test_histogram_buckets_and_exposition():
+    """Test that histograms count observations per bucket and render cumulative Prometheus buckets."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="big")
+    histogram.observe(0.1, route="big")
+    histogram.observe(5, route="big")
+
+    assert histogram.count(route="big") == 3
+    assert histogram.sum(route="big") == pytest.approx(5.15)
+    assert histogram.count(route="small") == 0
+    assert registry.snapshot() == {"latency_seconds": {"route=big": 3}}
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="big",le="0.1"} 2',
+        'latency_seconds_bucket{route="big",le="1"} 2',
+        'latency_seconds_bucket{route="big",le="+Inf"} 3',
+        'latency_seconds_sum{route="big"} 5.15',
+        'latency_seconds_count{route="big"} 3',
+    ]
+
+
+def test_render_counters_and_gauges():
+    """Test the Prometheus text format for counters and gauges, including label escaping."""
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(2)
+    registry.gauge("state", "State", ("upstream",)).set(1.5, upstream='a"b')
+
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        "requests_total 2\n"
+        "# HELP state State\n"
+        "# TYPE state gauge\n"
+        'state{upstream="a\\"b"} 1.5\n'
+    )
@@ -0,0 +1,88 @@
+"""Tests for the bundled mock upstream."""
+
+import json
+
+import httpx
+import pytest
+
+from src.claude_proxy.mock_upstream import MockSettings, MockUpstream
+from src.claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest
+from src.claude_proxy.providers.openai import OpenAIProvider
+
+TOOLS = [{"type": "function", "function": {"name": "write_file", "parameters": {"type": "object"}}}]
+
+
+def client(**settings) -> httpx.AsyncClient:
+    """Client sending requests to a mock upstream configured with ``settings``."""
+    mock = MockUpstream(MockSettings(chunk_delay=0, **settings))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=mock), base_url="http://mock")
+
+
+def stream_data(body: bytes):
+    """Decoded ``data:`` payloads of an SSE body, without ``[DONE]``."""
+    return [
+        json.loads(line[6:]) for line in body.decode().splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+
+
+def test_settings_from_environment(monkeypatch):
+    """Test that MOCK_* environment variables configure the mock and tokens_per_second sets the pace."""
+    monkeypatch.setenv("MOCK_CHUNKS", "7")
+    monkeypatch.setenv("MOCK_TOKENS_PER_SECOND", "100")
+    monkeypatch.setenv("MOCK_CHUNK_TOKENS", "4")
+
+    settings = MockSettings()
+
+    assert settings.chunks == 7
+    assert settings.token_interval == pytest.approx(0.04)
+
+
+@pytest.mark.asyncio
+async def test_stream_with_tool_calls_and_usage():
+    """Test a streamed response with text chunks, a tool call split over chunks and usage on the last chunk."""
+    async with client(chunks=3, chunk_tokens=2, tool_calls=1, tool_argument_bytes=100) as http:
+        response = await http.post("/v1/chat/completions", json={
+            "model": "gpt-4o", "stream": True, "tools": TOOLS, "messages": [{"role": "user", "content": "hi"}],
+        })
+
+    chunks = stream_data(response.content)
+    deltas = [chunk["choices"][0]["delta"] for chunk in chunks]
+    assert [delta.get("content") for delta in deltas[1:4]] == ["token token "] * 3
+    assert deltas[4]["tool_calls"][0]["function"]["name"] == "write_file"
+    arguments = "".join(delta["tool_calls"][0]["function"]["arguments"] for delta in deltas[5:-1])
+    assert json.loads(arguments)["path"] == "src/module_0.py"
+    assert chunks[-1]["choices"][0]["finish_reason"] == "tool_calls"
+    assert chunks[-1]["usage"]["completion_tokens"] == 6 + len(arguments) // 4
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_and_dropped_streams():
+    """Test error injection with Retry-After, and streams cut off before [DONE]."""
+    async with client(error_rate=1, error_status=429, retry_after=2) as http:
+        response = await http.post("/v1/chat/completions", json={"model": "gpt-4o"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+
+    async with client(drop_rate=1, chunks=10) as http:
+        with pytest.raises(ConnectionAbortedError):
+            await http.post("/v1/chat/completions", json={"model": "gpt-4o", "stream": True})
+
+
+@pytest.mark.asyncio
+async def test_proxy_converts_mock_stream():
+    """Test that the OpenAI provider turns the mock's tool-call stream into Claude events."""
+    provider = OpenAIProvider("sk-test", "http://mock/v1", client=client(chunks=2, tool_calls=1))
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=100,
+        stream=True,
+        messages=[ClaudeMessage(role="user", content="Write a file")],
+        tools=[{"name": "write_file", "description": "Write a file", "input_schema": {"type": "object"}}],
+    )
+
+    events = b"".join([event async for event in provider.stream_complete(request, "req-1")])
+
+    assert b'"name": "write_file"' in events
+    assert b'"stop_reason": "tool_use"' in events
+    assert b"event: message_stop" in events
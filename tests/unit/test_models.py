@@ -153,4 +153,108 @@ def test_temperature_validation():
             max_tokens=100,
             messages=[ClaudeMessage(role="user", content="Test")],
             temperature=2.0  # Too high for Claude API
-        )
\ No newline at end of file
+        )
+
+def test_raw_messages_request_attributes():
+    """Test the dict-backed request exposes the same attributes as the Pydantic model."""
+    from src.claude_proxy.models.claude import RawMessagesRequest
+    
+    data = {
+        "model": "claude-3-haiku",
+        "max_tokens": 100,
+        "messages": [{"role": "user", "content": "Hello"}],
+        "system": "Be brief",
+    }
+    request = RawMessagesRequest(data)
+    
+    assert request.model == "claude-3-haiku"
+    assert request.max_tokens == 100
+    assert request.messages[0]["content"] == "Hello"
+    assert request.system == "Be brief"
+    assert request.stream is False
+    assert request.tools is None
+    assert request.model_dump() is data
+
+
+def test_check_raw_messages_request():
+    """Test lightweight structural validation of raw request bodies."""
+    from src.claude_proxy.models.claude import check_raw_messages_request
+    
+    valid = {
+        "model": "claude-3-haiku",
+        "max_tokens": 100,
+        "messages": [
+            {"role": "user", "content": "Hello"},
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}]},
+        ],
+        "stream": True,
+    }
+    assert check_raw_messages_request(valid) == []
+    
+    errors = check_raw_messages_request({
+        "model": "claude-3-haiku",
+        "max_tokens": "100",
+        "messages": [{"role": "user", "content": [{"text": "missing type"}]}, "bad"],
+        "temperature": 1.5,
+    })
+    locs = [error["loc"] for error in errors]
+    assert ("body", "max_tokens") in locs
+    assert ("body", "messages", 0, "content", 0) in locs
+    assert ("body", "messages", 1) in locs
+    assert ("body", "temperature") in locs
+    
+    assert check_raw_messages_request([])[0]["type"] == "dict_type"
+
+
+MALFORMED_BLOCKS = [
+    {"type": "image", "source": "x"},
+    {"type": "tool_use", "id": "t1", "name": "Read", "input": ["not", "a", "dict"]},
+    {"type": "tool_use", "name": "Read", "input": {}},
+    {"type": "tool_result", "tool_use_id": "t1", "content": ["not a block"]},
+    {"type": "text", "text": 42},
+]
+
+
+@pytest.mark.parametrize("block", MALFORMED_BLOCKS)
+def test_check_raw_messages_request_block_fields(block):
+    """Test that block fields the converter reads are type-checked like the Pydantic models do."""
+    from src.claude_proxy.models.claude import check_raw_messages_request
+    
+    body = {"model": "claude-3-haiku", "max_tokens": 10, "messages": [{"role": "user", "content": [block]}]}
+    
+    assert check_raw_messages_request(body)
+    with pytest.raises(ValidationError):
+        ClaudeMessagesRequest(**body)
+
+
+@pytest.mark.parametrize("fast_path", [False, True])
+@pytest.mark.parametrize("block", MALFORMED_BLOCKS[:2])
+def test_malformed_blocks_return_422(block, fast_path):
+    """Test that malformed content blocks are rejected with 422 on both validation paths."""
+    import importlib
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    
+    main_module = importlib.import_module("src.claude_proxy.main")
+    with patch.object(main_module.settings, "fast_path", fast_path):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-haiku-20241022",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": [block]}],
+        })
+    
+    assert response.status_code == 422
+
+
+def test_messages_request_schema_in_openapi():
+    """Test that /v1/messages documents ClaudeMessagesRequest although the handler reads the raw body."""
+    import importlib
+    from fastapi.testclient import TestClient
+    
+    main_module = importlib.import_module("src.claude_proxy.main")
+    schema = TestClient(main_module.app).get("/openapi.json").json()
+    
+    body = schema["paths"]["/v1/messages"]["post"]["requestBody"]
+    assert body["content"]["application/json"]["schema"]["$ref"] == "#/components/schemas/ClaudeMessagesRequest"
+    assert "ClaudeMessage" in schema["components"]["schemas"]
+    assert "messages" in schema["components"]["schemas"]["ClaudeMessagesRequest"]["properties"]
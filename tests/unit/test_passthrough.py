@@ -0,0 +1,165 @@
+"""Tests for the raw Anthropic passthrough route."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+import importlib
+main_module = importlib.import_module('src.claude_proxy.main')
+from src.claude_proxy.providers.anthropic import AnthropicProvider
+from src.claude_proxy.upstream import Upstream, UpstreamPool
+
+
+SSE_BODY = (
+    b'event: message_start\r\ndata: {"type":"message_start"}\r\n\r\n'
+    b'event: message_stop\r\ndata: {"type":"message_stop"}\r\n\r\n'
+)
+
+
+async def stream_body(data: bytes):
+    """Yield a body in two parts like a real network stream."""
+    yield data[:10]
+    yield data[10:]
+
+
+def make_upstream(captured):
+    """Create a mock Anthropic upstream that records requests."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        captured.append(request)
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(
+                200, content=stream_body(SSE_BODY), headers={"content-type": "text/event-stream"}
+            )
+        return httpx.Response(
+            200,
+            content=stream_body(b'{"id": "msg_1", "type": "message", "content": []}'),
+            headers={"content-type": "application/json", "request-id": "req_123"},
+        )
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_send_raw_forwards_body_and_headers():
+    """Test that the raw body is forwarded unchanged with Anthropic headers."""
+    captured = []
+    provider = AnthropicProvider(api_key="sk-ant", base_url="https://anthropic.test/", client=make_upstream(captured))
+    body = b'{"model": "claude-3-haiku", "max_tokens": 1, "messages": []}'
+
+    response = await provider.send_raw(body, {"anthropic-beta": "tools-2024", "x-other": "dropped"})
+    await response.aread()
+    await response.aclose()
+
+    request = captured[0]
+    assert str(request.url) == "https://anthropic.test/v1/messages"
+    assert request.content == body
+    assert request.headers["x-api-key"] == "sk-ant"
+    assert request.headers["anthropic-version"] == "2023-06-01"
+    assert request.headers["anthropic-beta"] == "tools-2024"
+    assert "x-other" not in request.headers
+
+
+@pytest.mark.asyncio
+async def test_streaming_relay_releases_upstream_on_client_disconnect():
+    """Test that a client disconnecting mid-stream still closes the upstream response."""
+    client = make_upstream([])
+    pool = UpstreamPool([Upstream("https://anthropic.test", 1)], lambda base_url: client)
+    provider = AnthropicProvider(api_key="sk-ant", base_url="https://anthropic.test", client=client, upstreams=pool)
+    body = b'{"model":"claude-sonnet-4-20250514","max_tokens":10,"stream":true,"messages":[]}'
+    http_request = main_module.Request({"type": "http", "headers": []})
+
+    response = await main_module.passthrough_message(body, http_request, provider, stream=True)
+    assert pool.upstreams[0].outstanding == 1
+
+    chunks = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message)
+            if len(chunks) == 2:
+                raise OSError("client went away")
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}, "method": "POST", "headers": []}
+    disconnected = False
+    try:
+        await response(scope, receive, send)
+    except ClientDisconnect:
+        disconnected = True
+    # The server drops the response afterwards, which finalizes the abandoned relay
+    del response
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert disconnected
+
+    assert pool.upstreams[0].outstanding == 0
+
+
+class TestPassthroughRoute:
+    """Test /v1/messages routing to the Anthropic backend."""
+
+    def _settings(self, mock_settings):
+        mock_settings.auth_key = None
+        mock_settings.openai_api_key = None
+        mock_settings.anthropic_api_key = "sk-ant-server"
+        mock_settings.anthropic_base_url = "https://anthropic.test"
+        mock_settings.request_timeout = 30
+        mock_settings.big_model_backend = "anthropic"
+        mock_settings.small_model_backend = "openai"
+
+    def test_streaming_bytes_relayed_unchanged(self):
+        """Test that upstream SSE bytes reach the client untouched."""
+        captured = []
+        with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module.client_pool, 'get_client', return_value=make_upstream(captured)):
+            self._settings(mock_settings)
+            body = b'{"model":"claude-sonnet-4-20250514","max_tokens":10,"stream":true,"messages":[{"role":"user","content":"hi"}]}'
+
+            response = TestClient(main_module.app).post(
+                "/v1/messages", content=body, headers={"content-type": "application/json"}
+            )
+
+        assert response.status_code == 200
+        assert response.content == SSE_BODY
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert captured[0].content == body
+
+    def test_non_streaming_relayed(self):
+        """Test non-streaming passthrough relays status, body and request-id."""
+        captured = []
+        with patch.object(main_module, 'settings') as mock_settings, \
+             patch.object(main_module.client_pool, 'get_client', return_value=make_upstream(captured)):
+            self._settings(mock_settings)
+
+            response = TestClient(main_module.app).post("/v1/messages", json={
+                "model": "claude-opus-4-1-20250805",
+                "max_tokens": 10,
+                "messages": [{"role": "user", "content": "hi"}],
+            })
+
+        assert response.status_code == 200
+        assert response.json()["id"] == "msg_1"
+        assert response.headers["request-id"] == "req_123"
+
+    def test_route_backend_selection(self):
+        """Test that backends are chosen per model route."""
+        with patch.object(main_module, 'settings') as mock_settings:
+            self._settings(mock_settings)
+
+            assert main_module.get_route_backend("claude-sonnet-4-20250514") == "anthropic"
+            assert main_module.get_route_backend("claude-3-5-haiku-20241022") == "openai"
+
+    def test_invalid_json_rejected(self):
+        """Test that malformed bodies return a validation error."""
+        response = TestClient(main_module.app).post(
+            "/v1/messages", content=b"{not json", headers={"content-type": "application/json"}
+        )
+
+        assert response.status_code == 422
@@ -0,0 +1,124 @@
+"""Tests for the shared upstream connection pool."""
+
+import pytest
+
+from src.claude_proxy.config import Settings
+from src.claude_proxy.pool import UpstreamClientPool
+from src.claude_proxy.providers.openai import OpenAIProvider
+
+
+@pytest.fixture
+def pool():
+    """Connection pool with small limits."""
+    settings = Settings(
+        CLAUDE_PROXY_POOL_MAX_CONNECTIONS=10,
+        CLAUDE_PROXY_POOL_MAX_KEEPALIVE_CONNECTIONS=5,
+        CLAUDE_PROXY_POOL_KEEPALIVE_EXPIRY=12.5,
+    )
+    return UpstreamClientPool(settings)
+
+
+def test_host_key():
+    """Test that pool keys ignore the URL path."""
+    assert UpstreamClientPool.host_key("https://api.openai.com/v1") == "https://api.openai.com"
+    assert UpstreamClientPool.host_key("http://localhost:11434/v1") == "http://localhost:11434"
+
+
+def test_client_shared_per_host(pool):
+    """Test that the same host reuses one client and different hosts do not."""
+    first = pool.get_client("https://api.openai.com/v1")
+    second = pool.get_client("https://api.openai.com/v2")
+    other = pool.get_client("http://localhost:11434/v1")
+
+    assert first is second
+    assert first is not other
+
+
+@pytest.mark.asyncio
+async def test_aclose_and_recreate(pool):
+    """Test that closing the pool closes clients and later use reopens them."""
+    client = pool.get_client("https://api.openai.com/v1")
+    await pool.aclose()
+
+    assert client.is_closed
+    assert pool.get_client("https://api.openai.com/v1") is not client
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_provider_does_not_close_pooled_client(pool):
+    """Test that exiting a provider context leaves the shared client open."""
+    client = pool.get_client("https://api.openai.com/v1")
+    async with OpenAIProvider(api_key="test-key", base_url="https://api.openai.com/v1", client=client):
+        pass
+
+    assert not client.is_closed
+    await pool.aclose()
+
+
+def test_stats(pool):
+    """Test pool statistics reporting."""
+    pool.get_client("https://api.openai.com/v1")
+    stats = pool.stats()
+
+    assert stats["limits"]["max_connections_per_host"] == 10
+    assert stats["limits"]["max_keepalive_connections_per_host"] == 5
+    assert stats["limits"]["keepalive_expiry"] == 12.5
+    assert stats["hosts"]["https://api.openai.com"]["requests"] == 0
+    assert stats["hosts"]["https://api.openai.com"]["connections"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_limited_transport_holds_slot_until_closed():
+    """Test that a stream slot is held until the response body is closed."""
+    import httpx
+    from src.claude_proxy.pool import StreamLimitedTransport
+
+    async def body():
+        yield b"data: {}\n\n"
+
+    inner = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    transport = StreamLimitedTransport(inner, max_streams=2)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "http://upstream/v1") as response:
+            assert transport.active_streams == 1
+            await response.aread()
+        assert transport.active_streams == 0
+
+        await client.get("http://upstream/v1")
+        assert transport.active_streams == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_limited_transport_honours_pool_timeout():
+    """Test that a request waiting for a stream slot fails with PoolTimeout, then gets a freed slot."""
+    import httpx
+    from src.claude_proxy.pool import StreamLimitedTransport
+
+    async def body():
+        yield b"data: {}\n\n"
+
+    inner = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    transport = StreamLimitedTransport(inner, max_streams=1)
+
+    async with httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(5.0, pool=0.05)) as client:
+        async with client.stream("GET", "http://upstream/v1"):
+            with pytest.raises(httpx.PoolTimeout):
+                await client.get("http://upstream/v1")
+            assert transport.active_streams == 1
+        assert (await client.get("http://upstream/v1")).status_code == 200
+        assert transport.active_streams == 0
+
+
+def test_http2_stats(pool):
+    """Test that HTTP/2 settings are reported when enabled."""
+    from src.claude_proxy.pool import HTTP2_AVAILABLE
+
+    settings = Settings(CLAUDE_PROXY_HTTP2=True, CLAUDE_PROXY_HTTP2_MAX_CONCURRENT_STREAMS=32)
+    http2_pool = UpstreamClientPool(settings)
+
+    assert http2_pool.http2 is HTTP2_AVAILABLE
+    if HTTP2_AVAILABLE:
+        http2_pool.get_client("https://api.openai.com/v1")
+        assert http2_pool.stats()["limits"]["http2_max_concurrent_streams"] == 32
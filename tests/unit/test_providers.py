@@ -170,6 +170,7 @@ async def test_openai_complete_error(openai_provider, claude_request):
     with patch.object(openai_provider.client, 'post') as mock_post:
         mock_response = AsyncMock()
         mock_response.status_code = 401
+        mock_response.headers = httpx.Headers()
         mock_post.side_effect = httpx.HTTPStatusError(
             "Unauthorized",
             request=AsyncMock(),
@@ -179,4 +180,66 @@ async def test_openai_complete_error(openai_provider, claude_request):
         with pytest.raises(Exception) as exc_info:
             await openai_provider.complete(claude_request, "test-id")
         
-        assert "Invalid API key" in str(exc_info.value)
\ No newline at end of file
+        assert "Invalid API key" in str(exc_info.value)
+
+def test_openai_request_conversion_tool_blocks(openai_provider):
+    """Test tool_use, tool_result and image blocks are converted in one pass."""
+    claude_request = ClaudeMessagesRequest(
+        model="claude-3-sonnet",
+        max_tokens=100,
+        messages=[
+            ClaudeMessage(role="user", content=[
+                {"type": "text", "text": "What is in this image?"},
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "AAAA"}},
+            ]),
+            ClaudeMessage(role="assistant", content=[
+                {"type": "text", "text": "Let me check."},
+                {"type": "tool_use", "id": "toolu_1", "name": "Read", "input": {"path": "a.py"}},
+            ]),
+            ClaudeMessage(role="user", content=[
+                {"type": "tool_result", "tool_use_id": "toolu_1", "content": [
+                    {"type": "text", "text": "line 1\n"},
+                    {"type": "text", "text": "line 2"},
+                ]},
+                {"type": "tool_result", "tool_use_id": "toolu_2"},
+            ]),
+        ]
+    )
+    
+    messages = openai_provider.convert_request(claude_request)["messages"]
+    
+    assert messages[0]["content"] == [
+        {"type": "text", "text": "What is in this image?"},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+    ]
+    assert messages[1]["content"] == "Let me check."
+    assert messages[1]["tool_calls"][0]["function"] == {"name": "Read", "arguments": '{"path": "a.py"}'}
+    assert messages[2] == {"role": "tool", "content": "line 1\nline 2", "tool_call_id": "toolu_1"}
+    assert messages[3] == {"role": "tool", "content": "", "tool_call_id": "toolu_2"}
+
+
+def test_raw_request_conversion_matches_model(openai_provider):
+    """Test that the raw fast path converts exactly like the Pydantic request."""
+    from src.claude_proxy.models.claude import RawMessagesRequest
+    
+    data = {
+        "model": "claude-3-5-sonnet-20241022",
+        "max_tokens": 256,
+        "system": [{"type": "text", "text": "You are helpful."}],
+        "temperature": 0.5,
+        "messages": [
+            {"role": "user", "content": "List files"},
+            {"role": "assistant", "content": [
+                {"type": "tool_use", "id": "toolu_1", "name": "Bash", "input": {"command": "ls"}},
+            ]},
+            {"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": "toolu_1", "content": "a.py\nb.py"},
+            ]},
+        ],
+        "tools": [{"name": "Bash", "description": "Run a command", "input_schema": {"type": "object"}}],
+    }
+    
+    raw = openai_provider.convert_request(RawMessagesRequest(data))
+    validated = openai_provider.convert_request(ClaudeMessagesRequest(**data))
+    
+    assert raw == validated
@@ -0,0 +1,90 @@
+"""Tests for per-key rate limiting."""
+
+import importlib
+from unittest.mock import patch
+
+import pytest
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from src.claude_proxy.ratelimit import RATE_LIMITED, RateLimiter, RateLimitError
+
+main_module = importlib.import_module("src.claude_proxy.main")
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_request_rate_allows_burst_then_refills():
+    """Test that a key may send its burst at once and then one request per 1/rate seconds."""
+    clock = Clock()
+    limiter = RateLimiter(requests_per_second=2, burst=3, clock=clock)
+    for _ in range(3):
+        limiter.acquire("a")
+
+    with pytest.raises(RateLimitError) as exc_info:
+        limiter.acquire("a")
+    assert exc_info.value.retry_after == 0.5
+
+    limiter.acquire("b")
+    clock.now = 0.5
+    limiter.acquire("a")
+
+
+def test_input_token_rate():
+    """Test that estimated input tokens are limited per minute and rejected requests are not charged."""
+    clock = Clock()
+    limiter = RateLimiter(tokens_per_minute=600, clock=clock)
+    before = RATE_LIMITED.value(limit="input_tokens")
+    limiter.acquire("a", 500)
+
+    with pytest.raises(RateLimitError) as exc_info:
+        limiter.acquire("a", 200)
+    assert exc_info.value.retry_after == 10.0
+    assert RATE_LIMITED.value(limit="input_tokens") == before + 1
+
+    limiter.acquire("a", 100)
+    clock.now = 60
+    # Larger than the whole bucket: accepted once the bucket is full
+    limiter.acquire("a", 5000)
+
+
+def test_idle_keys_are_evicted_once_refilled():
+    """Test that per-key state is dropped after the buckets would have refilled."""
+    clock = Clock()
+    limiter = RateLimiter(requests_per_second=1, burst=5, clock=clock)
+    limiter.acquire("a")
+    assert len(limiter.keys) == 1
+
+    clock.now = 6
+    limiter.acquire("b")
+    assert len(limiter.keys) == 1
+    assert "a" not in limiter.keys
+
+
+def test_rate_limited_request_gets_429_rate_limit_error():
+    """Test that the endpoint rejects a key over its limit with a Claude rate_limit_error and Retry-After."""
+    limiter = RateLimiter(requests_per_second=0.1, burst=1)
+    client = TestClient(main_module.app)
+    request = {
+        "model": "claude-3-5-sonnet-20241022",
+        "max_tokens": 10,
+        "messages": [{"role": "user", "content": "Hello"}],
+    }
+
+    with patch.object(main_module, "rate_limiter", limiter), \
+            patch.object(main_module, "dispatch_message", return_value=Response(status_code=200)):
+        first = client.post("/v1/messages", json=request, headers={"x-api-key": "sk-client"})
+        second = client.post("/v1/messages", json=request, headers={"x-api-key": "sk-client"})
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "10"
+    assert second.json()["error"]["type"] == "rate_limit_error"
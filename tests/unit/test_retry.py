@@ -0,0 +1,254 @@
+"""Tests for upstream retries."""
+
+import importlib
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest
+from src.claude_proxy.providers.base import UpstreamError
+from src.claude_proxy.providers.openai import OpenAIProvider
+from src.claude_proxy.retry import (
+    RETRIES,
+    RETRIES_SUPPRESSED,
+    Retrier,
+    RetryBudget,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+main_module = importlib.import_module("src.claude_proxy.main")
+
+
+class Upstream:
+    """Mock upstream answering with a scripted sequence of responses or errors."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def make_retrier(max_retries=2, max_delay=8.0, budget=None):
+    """Retrier for route "big" that records sleeps instead of sleeping."""
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    budgets = {"big": budget} if budget is not None else {}
+    retrier = Retrier({"big": RetryPolicy(max_retries, 0.5, max_delay)}, budgets, sleep=sleep)
+    return retrier, sleeps
+
+
+async def post(client):
+    return await client.post("https://upstream.test/v1/chat/completions", json={})
+
+
+@pytest.mark.asyncio
+async def test_retries_server_error_then_succeeds():
+    """Test that a 503 is retried after a jittered backoff."""
+    upstream = Upstream(httpx.Response(503), httpx.Response(200, json={"ok": True}))
+    retrier, sleeps = make_retrier()
+    before = RETRIES.value(route="big", reason="503")
+
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+
+    assert response.status_code == 200
+    assert upstream.calls == 2
+    assert len(sleeps) == 1 and 0 <= sleeps[0] <= 0.5
+    assert RETRIES.value(route="big", reason="503") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_honors_retry_after():
+    """Test that Retry-After replaces the backoff delay."""
+    upstream = Upstream(httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200))
+    retrier, sleeps = make_retrier()
+
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+
+    assert response.status_code == 200
+    assert sleeps == [2.0]
+
+
+@pytest.mark.asyncio
+async def test_long_retry_after_is_not_waited_for():
+    """Test that a Retry-After longer than the maximum delay returns the response."""
+    upstream = Upstream(httpx.Response(429, headers={"Retry-After": "60"}))
+    retrier, sleeps = make_retrier()
+    before = RETRIES_SUPPRESSED.value(route="big", cause="retry_after")
+
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+
+    assert response.status_code == 429
+    assert upstream.calls == 1
+    assert sleeps == []
+    assert RETRIES_SUPPRESSED.value(route="big", cause="retry_after") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    """Test that a 400 is returned without retrying."""
+    upstream = Upstream(httpx.Response(400))
+    retrier, sleeps = make_retrier()
+
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+
+    assert response.status_code == 400
+    assert upstream.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_connect_errors_are_retried_then_raised():
+    """Test that connection errors are retried up to the limit and then raised."""
+    upstream = Upstream(httpx.ConnectError("refused"))
+    retrier, sleeps = make_retrier(max_retries=2)
+
+    async with upstream.client() as client:
+        with pytest.raises(httpx.ConnectError):
+            await retrier.send("big", lambda: post(client))
+
+    assert upstream.calls == 3
+    assert len(sleeps) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_errors_are_only_retried_when_enabled():
+    """Test that errors after the request was sent are raised at once unless read retries are enabled."""
+    for error in (httpx.ReadError("reset"), httpx.RemoteProtocolError("disconnected")):
+        upstream = Upstream(error, httpx.Response(200))
+        retrier, sleeps = make_retrier()
+
+        async with upstream.client() as client:
+            with pytest.raises(type(error)):
+                await retrier.send("big", lambda: post(client))
+        assert upstream.calls == 1 and sleeps == []
+
+    upstream = Upstream(httpx.ReadError("reset"), httpx.Response(200))
+    retrier, sleeps = make_retrier()
+    retrier.retry_read_errors = True
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+    assert response.status_code == 200
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_budget_limits_retries():
+    """Test that retries stop once the route's budget is spent."""
+    clock = [0.0]
+    budget = RetryBudget(ratio=0.0, min_per_second=0.0, capacity=1.0, clock=lambda: clock[0])
+    upstream = Upstream(httpx.Response(503))
+    retrier, sleeps = make_retrier(max_retries=5, budget=budget)
+    before = RETRIES_SUPPRESSED.value(route="big", cause="budget")
+
+    async with upstream.client() as client:
+        response = await retrier.send("big", lambda: post(client))
+
+    assert response.status_code == 503
+    assert upstream.calls == 2
+    assert RETRIES_SUPPRESSED.value(route="big", cause="budget") == before + 1
+
+
+def test_budget_refills():
+    """Test that requests and elapsed time refill the budget up to its capacity."""
+    clock = [0.0]
+    budget = RetryBudget(ratio=0.5, min_per_second=1.0, capacity=2.0, clock=lambda: clock[0])
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+    clock[0] = 10.0
+    assert budget.tokens == 2.0
+
+
+def test_parse_retry_after():
+    """Test seconds, milliseconds and HTTP-date Retry-After values."""
+    assert parse_retry_after(httpx.Headers({"Retry-After": "3"})) == 3.0
+    assert parse_retry_after(httpx.Headers({"retry-after-ms": "250"})) == 0.25
+    date = httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:10 GMT"})
+    assert parse_retry_after(date, now=1445412480.0) == 10.0
+    assert parse_retry_after(httpx.Headers({"Retry-After": "soon"})) is None
+    assert parse_retry_after(httpx.Headers()) is None
+
+
+@pytest.fixture
+def claude_request():
+    """Sample Claude request on the big route."""
+    return ClaudeMessagesRequest(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=10,
+        messages=[ClaudeMessage(role="user", content="Hello")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_complete_raises_upstream_error_with_status(claude_request):
+    """Test that an exhausted 429 surfaces as an UpstreamError carrying the status."""
+    upstream = Upstream(httpx.Response(429, headers={"Retry-After": "1"}))
+    retrier, sleeps = make_retrier(max_retries=1)
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", client=upstream.client(), retrier=retrier)
+
+    with pytest.raises(UpstreamError) as exc_info:
+        await provider.complete(claude_request, "req-1")
+
+    assert upstream.calls == 2
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.client_status_code == 429
+    assert exc_info.value.retry_after == 1.0
+    assert exc_info.value.error_type == "rate_limit_error"
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_byte(claude_request):
+    """Test that a stream rejected by the upstream is retried before anything is relayed."""
+    chunk = {"choices": [{"index": 0, "delta": {"content": "Hi"}, "finish_reason": "stop"}]}
+    body = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode()
+    upstream = Upstream(
+        httpx.Response(502),
+        httpx.Response(200, content=body, headers={"content-type": "text/event-stream"}),
+    )
+    retrier, sleeps = make_retrier()
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", client=upstream.client(), retrier=retrier)
+
+    events = [event async for event in provider.stream_complete(claude_request, "req-2")]
+
+    assert upstream.calls == 2
+    assert b"event: error" not in b"".join(events)
+    assert b'"text_delta", "text": "Hi"' in b"".join(events)
+
+
+def test_upstream_rate_limit_returns_429_to_client():
+    """Test that the endpoint relays an upstream 429 and its Retry-After."""
+    upstream = Upstream(httpx.Response(429, headers={"Retry-After": "30"}))
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", client=upstream.client())
+
+    with patch.object(main_module, "get_provider", return_value=provider):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
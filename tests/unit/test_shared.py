@@ -0,0 +1,177 @@
+"""Tests for state shared across worker processes."""
+
+import os
+
+import pytest
+
+from src.claude_proxy.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.claude_proxy.metrics import MetricsRegistry
+from src.claude_proxy.ratelimit import RateLimiter, RateLimitError
+from src.claude_proxy.shared import SharedState, SharedTable
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def add(amount):
+    """Update function adding ``amount`` to a one-field record and returning the new value."""
+    def update(record):
+        value = (record[0] if record else 0.0) + amount
+        return (value,), value
+    return update
+
+
+def test_tables_on_the_same_file_share_records(tmp_path):
+    """Test that two mappings of one file see each other's updates."""
+    path = str(tmp_path / "table.bin")
+    first = SharedTable(path, 1, slots=16)
+    second = SharedTable(path, 1, slots=16)
+
+    first.update("a", add(2))
+    assert second.update("a", add(3)) == 5
+    assert first.get("a") == (5.0,)
+    assert first.get("missing") is None
+    assert dict(second.items()) == {"a": (5.0,)}
+
+
+def test_full_slots_evict_the_oldest_record(tmp_path):
+    """Test that a full probe window replaces the record with the smallest eviction field."""
+    table = SharedTable(str(tmp_path / "table.bin"), 1, slots=2, probe=2, evict_field=0)
+    table.update("old", lambda record: ((1.0,), None))
+    table.update("new", lambda record: ((2.0,), None))
+
+    table.update("newest", lambda record: ((3.0,), None))
+
+    assert table.get("old") is None
+    assert table.get("new") == (2.0,)
+    assert table.get("newest") == (3.0,)
+
+    strict = SharedTable(str(tmp_path / "strict.bin"), 1, slots=1)
+    strict.update("a", add(1))
+    with pytest.raises(OverflowError):
+        strict.update("b", add(1))
+    assert strict.overflows == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_counters_sum_across_processes(tmp_path):
+    """Test that a shared counter reports the increments of every process."""
+    path = str(tmp_path / "metrics.bin")
+    registry = MetricsRegistry()
+    registry.share(SharedTable(path, 1, slots=64, key_size=128))
+    counter = registry.counter("requests_total", "Requests", ("route",))
+
+    children = []
+    for _ in range(3):
+        pid = os.fork()
+        if pid == 0:
+            # Child: map the file afresh, as a gunicorn worker would
+            child = MetricsRegistry()
+            child.share(SharedTable(path, 1, slots=64, key_size=128))
+            child_counter = child.counter("requests_total", "Requests", ("route",))
+            for _ in range(100):
+                child_counter.inc(route="big")
+            child.flush()
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        assert os.waitpid(pid, 0)[1] == 0
+    counter.inc(route="small")
+
+    assert counter.value(route="big") == 300
+    assert sorted(counter.samples()) == [(("big",), 300.0), (("small",), 1.0)]
+
+
+def test_counter_increments_are_buffered_until_flush(tmp_path):
+    """Test that increments reach the shared table only when flushed."""
+    table = SharedTable(str(tmp_path / "metrics.bin"), 1, slots=16, key_size=128)
+    registry = MetricsRegistry()
+    registry.share(table)
+    counter = registry.counter("requests_total", "Requests")
+
+    counter.inc()
+    counter.inc()
+    assert table.get("requests_total") is None
+
+    registry.flush()
+    assert table.get("requests_total") == (2.0,)
+    assert counter.value() == 2
+
+
+def test_deployment_state_is_recreated_and_stale_state_removed(tmp_path):
+    """Test that the first process of a deployment starts from empty tables and exited deployments are cleaned up."""
+    directory = str(tmp_path)
+    old = SharedState(directory, "old", rate_limit_keys=16)
+    old.metrics.update("requests_total", add(5))
+    second = SharedState(directory, "old", rate_limit_keys=16)
+    assert second.metrics.get("requests_total") == (5.0,)
+    old.close()
+    second.close()
+
+    restarted = SharedState(directory, "old", rate_limit_keys=16)
+    assert restarted.metrics.get("requests_total") is None
+    restarted.metrics.update("requests_total", add(1))
+    restarted.close()
+
+    current = SharedState(directory, "new", rate_limit_keys=16)
+    assert sorted(os.listdir(directory)) == [
+        "breakers-new.bin", "deployment-new.lock", "metrics-new.bin", "ratelimit-new.bin",
+    ]
+    assert current.stats()["overflows"] == {"metrics": 0, "ratelimit": 0, "breakers": 0}
+    current.close()
+
+
+def test_rate_limit_is_shared_between_limiters(tmp_path):
+    """Test that limiters on one table draw from the same bucket per key."""
+    clock = Clock()
+    path = str(tmp_path / "ratelimit.bin")
+    workers = [
+        RateLimiter(requests_per_second=1, burst=3, clock=clock, table=SharedTable(path, 3, evict_field=2))
+        for _ in range(2)
+    ]
+    workers[0].acquire("a")
+    workers[1].acquire("a")
+    workers[0].acquire("a")
+
+    with pytest.raises(RateLimitError) as exc_info:
+        workers[1].acquire("a")
+    assert exc_info.value.retry_after == 1.0
+
+    clock.now = 1.0
+    workers[1].acquire("a")
+
+
+def test_breaker_state_is_shared_between_workers(tmp_path):
+    """Test that a breaker opened by one worker is open for the others, and a probe result closes it for all."""
+    clock = Clock()
+    path = str(tmp_path / "breakers.bin")
+    first, second = (
+        CircuitBreaker(
+            "http://upstream", consecutive_failures=2, open_seconds=10, clock=clock,
+            table=SharedTable(path, 3, key_size=128),
+        )
+        for _ in range(2)
+    )
+    first.record(False)
+    first.record(False)
+
+    assert first.state == OPEN
+    assert not second.available()
+    assert second.state == OPEN and second.retry_after() == 10
+
+    clock.now = 10
+    assert second.available()
+    assert second.state == HALF_OPEN
+    first.available()
+    assert first.state == HALF_OPEN
+
+    second.on_start()
+    second.record(True)
+    assert first.available() and first.state == CLOSED
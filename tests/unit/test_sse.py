@@ -0,0 +1,125 @@
+"""Tests for Claude SSE event encoding."""
+
+import json
+
+import pytest
+
+from src.claude_proxy import sse
+
+
+def legacy(event_type, data):
+    """Encoding used before the byte templates (f-string over json.dumps)."""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+TEXTS = ["hello", "", 'quote " and \\ backslash', "line\nbreak\ttab", "unicode 你好 🚀", " \x00"]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_text_delta_matches_json_dumps(text):
+    """Test text_delta output is byte-identical to json.dumps of the event dict."""
+    expected = legacy("content_block_delta", {
+        "type": "content_block_delta", "index": 1, "delta": {"type": "text_delta", "text": text}
+    })
+    assert sse.text_delta(1, text) == expected
+
+
+@pytest.mark.parametrize("partial_json", ['{"path": "/tmp/a b"}', '"\\n', ""])
+def test_input_json_delta_matches_json_dumps(partial_json):
+    """Test input_json_delta output is byte-identical to json.dumps of the event dict."""
+    expected = legacy("content_block_delta", {
+        "type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": partial_json}
+    })
+    assert sse.input_json_delta(0, partial_json) == expected
+
+
+def test_block_events_match_json_dumps():
+    """Test block start/stop events."""
+    assert sse.text_block_start(0) == legacy("content_block_start", {
+        "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+    })
+    assert sse.tool_block_start(1, "call_1", "get_weather") == legacy("content_block_start", {
+        "type": "content_block_start", "index": 1,
+        "content_block": {"type": "tool_use", "id": "call_1", "name": "get_weather", "input": {}},
+    })
+    assert sse.block_stop(2) == legacy("content_block_stop", {"type": "content_block_stop", "index": 2})
+
+
+@pytest.mark.parametrize("stop_reason,output_tokens", [("end_turn", 42), ("tool_use", 0), (None, None)])
+def test_message_delta_matches_json_dumps(stop_reason, output_tokens):
+    """Test the final message_delta event, including null fields."""
+    expected = legacy("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+        "usage": {"output_tokens": output_tokens},
+    })
+    assert sse.message_delta(stop_reason, output_tokens) == expected
+
+
+def test_message_stop_and_error():
+    """Test constant and error events."""
+    assert sse.MESSAGE_STOP == legacy("message_stop", {"type": "message_stop"})
+    assert sse.error_event("Rate limit exceeded") == legacy("error", {
+        "type": "error", "error": {"type": "api_error", "message": "Rate limit exceeded"}
+    })
+
+
+def feed_all(parser, stream, size):
+    """Feed ``stream`` to ``parser`` in ``size``-byte chunks and collect event data."""
+    events = []
+    for i in range(0, len(stream), size):
+        events.extend(parser.feed(stream[i:i + size]))
+    return events + parser.flush()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_parser_handles_split_chunks_and_line_endings(size):
+    """Test LF, CRLF and CR line endings with events split at every boundary."""
+    stream = (
+        b'data: {"a": 1}\n\n'
+        b'data: {"b": 2}\r\n\r\n'
+        b'data: {"c": 3}\r\r'
+        b": keep-alive comment\n\n"
+        b"event: completion\nid: 7\ndata:no-space\n\n"
+        b"data: [DONE]\n\n"
+    )
+    assert feed_all(sse.SSEParser(), stream, size) == [
+        b'{"a": 1}', b'{"b": 2}', b'{"c": 3}', b"no-space", b"[DONE]"
+    ]
+
+
+def test_parser_joins_multiline_data():
+    """Test that multiple data lines in one event are joined with newlines."""
+    parser = sse.SSEParser()
+    assert parser.feed(b"data: first\r\ndata: second\r\n") == []
+    assert parser.feed(b"\r\n") == [b"first\nsecond"]
+
+
+def test_parser_flushes_unterminated_event():
+    """Test that a final event without a trailing blank line is not lost."""
+    parser = sse.SSEParser()
+    assert parser.feed(b"data: last") == []
+    assert parser.flush() == [b"last"]
+    assert parser.flush() == []
+
+
+@pytest.mark.asyncio
+async def test_aiter_sse_data():
+    """Test the async iterator over a byte stream."""
+    async def chunks():
+        yield b"data: one\n"
+        yield b"\ndata: tw"
+        yield b"o\n\n"
+
+    assert [data async for data in sse.aiter_sse_data(chunks())] == [b"one", b"two"]
+
+
+def test_split_and_merge_deltas():
+    """Test that merging escaped payloads equals encoding the concatenated text."""
+    parts = ['say "hi"', "\n", "你好 🚀", "\\end"]
+    splits = [sse.split_delta(sse.text_delta(2, part)) for part in parts]
+
+    assert len({head for head, _ in splits}) == 1
+    assert sse.merge_deltas(splits[0][0], [payload for _, payload in splits]) == sse.text_delta(2, "".join(parts))
+    assert sse.split_delta(sse.block_stop(0)) is None
+    assert sse.split_delta(sse.input_json_delta(1, "{}"))[0] != sse.split_delta(sse.text_delta(1, "{}"))[0]
@@ -0,0 +1,204 @@
+"""Tests for request and stage latency metrics."""
+
+import importlib
+import json
+import logging
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from src.claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest
+from src.claude_proxy.providers.openai import OpenAIProvider
+from src.claude_proxy.telemetry import (
+    INTER_TOKEN_GAP,
+    PROXY_TTFT_OVERHEAD,
+    REQUEST_DURATION,
+    REQUESTS,
+    STREAM_DURATION,
+    STREAM_TOKENS_PER_SECOND,
+    TIME_TO_FIRST_EVENT,
+    UPSTREAM_CONNECT_DURATION,
+    UPSTREAM_TTFT,
+    StreamTimer,
+    trace_connect,
+)
+
+main_module = importlib.import_module("src.claude_proxy.main")
+
+
+class Provider:
+    """Fake provider streaming two events."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def stream_complete(self, request, request_id):
+        yield b"event: ping\ndata: {}\n\n"
+        yield b"event: message_stop\ndata: {}\n\n"
+
+
+def test_requests_are_counted_and_timed_by_route_and_status():
+    """Test that /v1/messages requests are labelled with their route, target model and status."""
+    labels = {"route": "big", "model": main_module.settings.big_model, "status": "201"}
+    before = REQUESTS.value(**labels)
+    durations = REQUEST_DURATION.count(route="big", stream="false")
+
+    with patch.object(main_module, "dispatch_message", return_value=Response(status_code=201)):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 201
+    assert REQUESTS.value(**labels) == before + 1
+    assert REQUEST_DURATION.count(route="big", stream="false") == durations + 1
+
+
+def test_streams_record_time_to_first_event():
+    """Test that a streaming request records its time to first SSE event and stream duration."""
+    first_events = TIME_TO_FIRST_EVENT.count(route="small")
+    streams = STREAM_DURATION.count(route="small")
+
+    with patch.object(main_module, "get_provider", return_value=Provider()):
+        response = TestClient(main_module.app).post("/v1/messages", json={
+            "model": "claude-3-5-haiku-20241022",
+            "max_tokens": 10,
+            "stream": True,
+            "messages": [{"role": "user", "content": "Hello"}],
+        })
+
+    assert response.status_code == 200
+    assert TIME_TO_FIRST_EVENT.count(route="small") == first_events + 1
+    assert STREAM_DURATION.count(route="small") == streams + 1
+    assert REQUEST_DURATION.count(route="small", stream="true") >= 1
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    """Test that /metrics returns every metric family in the Prometheus text format."""
+    response = TestClient(main_module.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE claude_proxy_request_duration_seconds histogram" in response.text
+    assert "# TYPE claude_proxy_upstream_ttfb_seconds histogram" in response.text
+
+
+@pytest.mark.asyncio
+async def test_connect_trace_times_new_connections():
+    """Test that the connect trace observes TCP connect plus TLS handshake for https upstreams."""
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    trace_connect(request, "https://api.example.com")
+    before = UPSTREAM_CONNECT_DURATION.count(upstream="https://api.example.com")
+
+    trace = request.extensions["trace"]
+    await trace("connection.connect_tcp.started", {})
+    await trace("connection.connect_tcp.complete", {})
+    assert UPSTREAM_CONNECT_DURATION.count(upstream="https://api.example.com") == before
+    await trace("connection.start_tls.complete", {})
+
+    assert UPSTREAM_CONNECT_DURATION.count(upstream="https://api.example.com") == before + 1
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stream_timer_splits_ttft_and_measures_token_gaps(caplog):
+    """Test upstream TTFT, proxy overhead, inter-token gaps and output rate of one stream."""
+    clock = Clock()
+    ttft = UPSTREAM_TTFT.sum(route="timer")
+    timer = StreamTimer("req-1", "timer", clock=clock)
+
+    clock.now = 0.2
+    timer.chunk()
+    clock.now = 0.2005
+    timer.delta()
+    for _ in range(4):
+        clock.now += 0.05
+        timer.chunk()
+        timer.delta()
+    with caplog.at_level(logging.INFO, logger="src.claude_proxy.telemetry"):
+        timer.finish(9)
+        timer.finish(9)
+
+    assert UPSTREAM_TTFT.sum(route="timer") == pytest.approx(ttft + 0.2)
+    assert PROXY_TTFT_OVERHEAD.sum(route="timer") == pytest.approx(0.0005)
+    assert INTER_TOKEN_GAP.count(route="timer") == 4
+    # Eight tokens after the first, generated over 0.2 seconds
+    assert STREAM_TOKENS_PER_SECOND.sum(route="timer") == pytest.approx(40)
+    assert (
+        "Stream req-1 timing: route=timer deltas=5 upstream_ttft_ms=200.0 proxy_overhead_ms=0.500 "
+        "gap_mean_ms=50.0 gap_max_ms=50.0 tokens_per_second=40.0 output_tokens=9"
+    ) in caplog.text
+    assert caplog.text.count("Stream req-1 timing") == 1
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_records_token_timings():
+    """Test that converting an OpenAI stream records one TTFT and a gap per later token."""
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"role": "assistant"}}]},
+        {"choices": [{"index": 0, "delta": {"content": "Hel"}}]},
+        {"choices": [{"index": 0, "delta": {"content": "lo"}}]},
+        {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": {"completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks).encode()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+    ))
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", client=client)
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-haiku-20241022",
+        max_tokens=10,
+        stream=True,
+        messages=[ClaudeMessage(role="user", content="Hello")],
+    )
+    ttfts = UPSTREAM_TTFT.count(route="small")
+    gaps = INTER_TOKEN_GAP.count(route="small")
+
+    events = [event async for event in provider.stream_complete(request, "req-2")]
+
+    assert b"message_stop" in b"".join(events)
+    assert UPSTREAM_TTFT.count(route="small") == ttfts + 1
+    assert INTER_TOKEN_GAP.count(route="small") == gaps + 1
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_without_finish_reason_records_summary(caplog):
+    """Test that a stream ending on [DONE] without a finish_reason still records its timings."""
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"content": "Hel"}}]},
+        {"choices": [{"index": 0, "delta": {"content": "lo"}}]},
+    ]
+    body = ("".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n").encode()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+    ))
+    provider = OpenAIProvider("sk-test", "https://upstream.test/v1", client=client)
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-haiku-20241022",
+        max_tokens=10,
+        stream=True,
+        messages=[ClaudeMessage(role="user", content="Hello")],
+    )
+    ttfts = UPSTREAM_TTFT.count(route="small")
+
+    with caplog.at_level(logging.INFO, logger="src.claude_proxy.telemetry"):
+        events = [event async for event in provider.stream_complete(request, "req-3")]
+
+    assert b"message_stop" not in b"".join(events)
+    assert UPSTREAM_TTFT.count(route="small") == ttfts + 1
+    assert caplog.text.count("Stream req-3 timing: route=small deltas=2") == 1
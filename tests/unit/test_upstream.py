@@ -0,0 +1,190 @@
+"""Tests for multi-upstream load balancing."""
+
+from collections import Counter
+
+import httpx
+import pytest
+
+from src.claude_proxy.breaker import CircuitBreaker, CircuitOpenError
+from src.claude_proxy.models.claude import ClaudeMessage, ClaudeMessagesRequest
+from src.claude_proxy.providers.openai import OpenAIProvider
+from src.claude_proxy.upstream import Upstream, UpstreamPool, parse_upstreams
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_pool(*urls, strategy="least_outstanding", handler=None, clock=None, **breaker_options):
+    """Pool over mock upstreams served by ``handler`` (200 OK by default)."""
+    clock = clock or Clock()
+    transport = httpx.MockTransport(handler or (lambda request: httpx.Response(200, json={})))
+    clients = {}
+
+    def get_client(base_url):
+        return clients.setdefault(base_url, httpx.AsyncClient(transport=transport))
+
+    upstreams = [
+        Upstream(url, weight, CircuitBreaker(url, clock=clock, **breaker_options))
+        for url, weight in parse_upstreams(",".join(urls))
+    ]
+    return UpstreamPool(upstreams, get_client, strategy=strategy, clock=clock)
+
+
+def test_parse_upstreams():
+    """Test parsing of url|weight lists."""
+    assert parse_upstreams("http://a/v1|3, http://b/v1/ ,") == [("http://a/v1", 3.0), ("http://b/v1", 1.0)]
+    with pytest.raises(ValueError):
+        parse_upstreams("http://a/v1|0")
+
+
+def test_unknown_strategy_is_rejected():
+    """Test that a misspelled strategy fails at startup."""
+    with pytest.raises(ValueError):
+        make_pool("http://a", strategy="fastest")
+
+
+def test_round_robin_follows_weights():
+    """Test that smooth weighted round robin splits picks by weight."""
+    pool = make_pool("http://a|3", "http://b|1", strategy="round_robin")
+    picks = Counter(pool.pick().base_url for _ in range(8))
+    assert picks == {"http://a": 6, "http://b": 2}
+
+
+def test_least_outstanding_avoids_busy_upstream():
+    """Test that in-flight requests steer new ones to the idle upstream."""
+    pool = make_pool("http://a", "http://b")
+    pool.upstreams[0].outstanding = 5
+    assert {pool.pick().base_url for _ in range(4)} == {"http://b"}
+
+
+def test_least_outstanding_spreads_ties():
+    """Test that idle upstreams share picks evenly."""
+    pool = make_pool("http://a", "http://b", "http://c")
+    picks = Counter(pool.pick().base_url for _ in range(9))
+    assert set(picks.values()) == {3}
+
+
+def test_ewma_prefers_faster_upstream():
+    """Test that EWMA balancing favours the upstream with lower latency."""
+    pool = make_pool("http://a", "http://b", strategy="ewma")
+    pool.upstreams[0].ewma = 0.5
+    pool.upstreams[1].ewma = 0.1
+    assert pool.pick().base_url == "http://b"
+    pool.upstreams[1].outstanding = 10
+    assert pool.pick().base_url == "http://a"
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_counts_until_closed():
+    """Test that a streamed response keeps its upstream busy until the body is closed."""
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"data: [DONE]\n\n"
+
+    pool = make_pool("http://a", handler=lambda request: httpx.Response(200, stream=Body()))
+    upstream = pool.upstreams[0]
+
+    response = await pool.send(lambda base_url, client: client.send(
+        client.build_request("POST", f"{base_url}/chat/completions"), stream=True
+    ))
+    assert upstream.outstanding == 1
+    await response.aclose()
+    assert upstream.outstanding == 0
+    assert upstream.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_over():
+    """Test that requests skip an upstream whose circuit opened."""
+    clock = Clock()
+
+    def handler(request):
+        return httpx.Response(503 if request.url.host == "a" else 200)
+
+    pool = make_pool("http://a", "http://b", handler=handler, clock=clock, consecutive_failures=2, open_seconds=10)
+    a = pool.upstreams[0]
+
+    async def post(base_url, client):
+        return await client.post(f"{base_url}/chat/completions")
+
+    for _ in range(6):
+        await pool.send(post)
+    assert a.failures == 2
+    assert a.breaker.state == "open"
+    assert pool.stats()["upstreams"]["http://a"]["circuit"]["state"] == "open"
+
+    clock.now = 11
+    pool.upstreams[1].outstanding = 1
+    await pool.send(post)
+    assert a.failures == 3
+    assert a.breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_all_circuits_open_fails_fast():
+    """Test that a request is rejected without contacting an upstream when every circuit is open."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused")
+
+    async def post(base_url, client):
+        return await client.post(f"{base_url}/chat/completions")
+
+    pool = make_pool("http://a", handler=handler, consecutive_failures=1, open_seconds=10)
+    with pytest.raises(httpx.ConnectError):
+        await pool.send(post)
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await pool.send(post)
+
+    assert len(calls) == 1
+    assert exc_info.value.retry_after == 10
+
+
+@pytest.mark.asyncio
+async def test_connection_errors_count_as_failures():
+    """Test that a transport error is recorded against the upstream and re-raised."""
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    pool = make_pool("http://a", handler=handler)
+    with pytest.raises(httpx.ConnectError):
+        await pool.send(lambda base_url, client: client.post(f"{base_url}/chat/completions"))
+    assert pool.upstreams[0].failures == 1
+    assert pool.upstreams[0].outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_provider_sends_to_pool_upstreams():
+    """Test that the OpenAI provider spreads requests across the pool."""
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1",
+            "model": "gpt-4o",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+        })
+
+    pool = make_pool("http://a/v1", "http://b/v1", handler=handler)
+    provider = OpenAIProvider("sk-test", "http://unused/v1", upstreams=pool)
+    request = ClaudeMessagesRequest(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=10,
+        messages=[ClaudeMessage(role="user", content="Hello")],
+    )
+
+    for _ in range(4):
+        await provider.complete(request, "req")
+
+    assert sorted(seen) == ["http://a/v1/chat/completions"] * 2 + ["http://b/v1/chat/completions"] * 2